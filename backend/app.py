@@ -13,7 +13,9 @@ from .routes.ai_assistant import ai_assistant_bp
 from .models.user import User
 from .models.dataset import Dataset
 from .models.conversion import ConversionTask, ConvertedDataset
-from .models import user, dataset, conversion, analysis
+from .models import user, dataset, conversion, analysis, aggregate, stats, upload, weather
+# Registers the session listener that keeps the dashboard counters current
+from .services import dashboard_stats
 
 def create_app():
     setup_logging()
@@ -72,6 +74,9 @@ def create_app():
     from .routes.weather import weather_bp
     app.register_blueprint(weather_bp, url_prefix='/api/weather')
 
+    from .routes.events import events_bp
+    app.register_blueprint(events_bp, url_prefix='/api/events')
+
     # --- Root Route ---
     @app.route('/')
     def index():
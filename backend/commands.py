@@ -3,6 +3,7 @@ from flask.cli import with_appcontext
 from .extensions import db
 from .models.user import User
 from .models.dataset import Dataset
+from .models.conversion import ConversionTask
 # from .models.analysis import AnalysisTask # This model is removed
 
 @click.command('init-db')
@@ -12,8 +13,58 @@ def init_db_command():
     db.create_all()
     click.echo('Initialized the database.')
 
+@click.command('rebuild-aggregates')
+@with_appcontext
+def rebuild_aggregates_command():
+    """Cache partial aggregates of all converted datasets and fold them into the per-building aggregates."""
+    from .services.aggregate_service import update_building_aggregate, build_dataset_aggregate
+    from .services.usage_aggregate import read_usage_csv
+
+    tasks = ConversionTask.query.filter_by(status='completed').order_by(ConversionTask.created_at).all()
+    for task in tasks:
+        for converted in task.converted_datasets:
+            df = read_usage_csv(converted.file_path)
+            build_dataset_aggregate(converted, df=df)
+            added = update_building_aggregate(converted.name, converted.file_path, task_id=task.id, df=df)
+            click.echo(f'{converted.name}: +{added} records (task {task.id})')
+    db.session.commit()
+    click.echo('Rebuilt dataset and building aggregates.')
+
+@click.command('rebuild-dashboard-stats')
+@with_appcontext
+def rebuild_dashboard_stats_command():
+    """Recount the materialized dashboard counters from the users, datasets and conversion tasks tables."""
+    from .services.dashboard_stats import rebuild_dashboard_stats
+
+    counts = rebuild_dashboard_stats()
+    click.echo(f'Rebuilt dashboard counters: {counts}')
+
+@click.command('backfill-weather')
+@click.argument('areacodes', nargs=-1)
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day (default: DAYS before --end).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Day after the last one (default: today).')
+@click.option('--days', default=7, show_default=True, help='Days filled when --start is omitted.')
+@with_appcontext
+def backfill_weather_command(areacodes, start, end, days):
+    """Fill observed hourly weather of AREACODES (default: WEATHER_AREACODES) into the local weather store."""
+    from datetime import date, datetime, timedelta
+    from flask import current_app
+    from .services.weather_history import backfill_weather
+
+    areacodes = areacodes or current_app.config.get('WEATHER_AREACODES')
+    if not areacodes:
+        raise click.UsageError('No areacodes given and WEATHER_AREACODES is empty.')
+    end = end or datetime.combine(date.today(), datetime.min.time())
+    start = start or end - timedelta(days=days)
+    summary = backfill_weather(areacodes, start, end, transport=current_app.config.get('WEATHER_BACKFILL_TRANSPORT'))
+    for areacode, counts in summary.items():
+        click.echo(f'{areacode}: {counts}')
+
 def init_app(app):
     """Register database functions with the Flask app. This is called by
     the application factory.
     """
-    app.cli.add_command(init_db_command) 
\ No newline at end of file
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rebuild_aggregates_command)
+    app.cli.add_command(rebuild_dashboard_stats_command)
+    app.cli.add_command(backfill_weather_command) 
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import json
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -9,12 +10,65 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max-limit
+    # Larger files use the chunked upload protocol; each chunk must fit MAX_CONTENT_LENGTH
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+    # Unfinished chunked uploads are discarded after this many hours
+    UPLOAD_SESSION_TTL_HOURS = 48
+    GENERATED_FILES_FOLDER = os.path.join(basedir, 'generated_files')
     
     # For weather API
     API_SPACES_API_KEY = os.environ.get('API_SPACES_API_KEY') or 'jt9waq8f5rmk0jd0jon5s9rtshsjydqr'
+    WEATHER_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+    # Seconds weather answers are cached for
+    WEATHER_HOURLY_TTL = 600
+    WEATHER_SEARCH_TTL = 24 * 3600
+    # Replaces the APISpace upstream, e.g. with a stub object in tests
+    WEATHER_UPSTREAM = None
+    # Weather history backfill: areacodes fetched by default, requests in flight, request starts per second
+    WEATHER_AREACODES = [a for a in os.environ.get('WEATHER_AREACODES', '').split(',') if a]
+    # Observed hours come from the Open-Meteo archive, which is queried by coordinates:
+    # {"<areacode>": [latitude, longitude]}, e.g. {"101010100": [39.90, 116.41]}
+    WEATHER_AREA_COORDINATES = json.loads(os.environ.get('WEATHER_AREA_COORDINATES') or '{}')
+    WEATHER_ARCHIVE_URL = 'https://archive-api.open-meteo.com/v1/archive'
+    # Timezone the archive reports hours in; stored hours are area-local
+    WEATHER_ARCHIVE_TIMEZONE = 'Asia/Shanghai'
+    WEATHER_BACKFILL_CONCURRENCY = 4
+    WEATHER_BACKFILL_RATE = 5.0
+    WEATHER_BACKFILL_MAX_AREACODES = 200
+    # httpx transport for the backfill, e.g. httpx.MockTransport serving a fake upstream in tests
+    WEATHER_BACKFILL_TRANSPORT = None
     
+    # Progress event streams: open streams at once (each holds a server thread), seconds a
+    # stream stays open before the client reconnects, and lifetime of a ?token= stream token
+    EVENTS_MAX_STREAMS = 8
+    EVENTS_STREAM_MAX_SECONDS = 300
+    EVENTS_TOKEN_MAX_AGE = 60
+
     # For Alibaba Bailian/Tongyi Qianwen LLM
     BAILIAN_API_KEY = os.environ.get('BAILIAN_API_KEY')
     
     # 支持中文字体
-    FONT_PATH = "c:/Windows/Fonts/simsun.ttc" 
\ No newline at end of file
+    FONT_PATH = "c:/Windows/Fonts/simsun.ttc"
+
+    # Analysis task limits enforced by core.task_runner (timeout in seconds, memory in MB)
+    ANALYSIS_DEFAULT_LIMITS = {'timeout': 600, 'max_memory_mb': 2048}
+    ANALYSIS_TASK_LIMITS = {
+        'correlation_analysis': {'timeout': 120, 'max_memory_mb': 1024},
+        'time_series_forecast': {'timeout': 600, 'max_memory_mb': 2048},
+        'clustering': {'timeout': 300, 'max_memory_mb': 2048},
+        'water_habit': {'timeout': 900, 'max_memory_mb': 3072},
+        # Usage reports of POST /api/analysis/ and /api/analysis/buildings
+        'usage_report': {'timeout': 900, 'max_memory_mb': 3072},
+    }
+
+    # joblib workers POST /api/analysis/forecast may use; it fits in the request thread
+    FORECAST_N_JOBS = 2
+
+    # CSVs larger than this are correlated in chunks (rows per chunk) instead of loaded whole
+    CORRELATION_STREAMING_THRESHOLD_MB = 100
+    CORRELATION_CHUNK_ROWS = 100000
+    CORRELATION_SAMPLE_ROWS = 10000
+
+    # Clustering switches to MiniBatchKMeans above this many rows
+    CLUSTERING_MINIBATCH_THRESHOLD = 100000
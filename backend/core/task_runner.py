@@ -0,0 +1,285 @@
+"""
+Runs analysis functions in a child process with a wall-clock timeout, a memory ceiling
+and cooperative cancellation, and reports the resources the child used.
+
+Children are started from a forkserver (or spawned where that is unavailable), never forked
+from the server itself: the server runs many threads, and a child forked while another thread
+holds a lock (logging handlers, the SQLAlchemy pool) can deadlock on it. A child therefore
+builds its own application from the parent's app factory, and targets and their arguments
+must be picklable, module-level callables.
+"""
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import logging
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from ..extensions import db
+
+# Set inside the child process so that long-running code can poll for cancellation.
+_cancel_event = None
+# Per-thread progress sink (and cancel event, when running without a child process) of the
+# running task, see report_progress().
+_progress = threading.local()
+_preload_lock = threading.Lock()
+_preloaded = False
+# Cancellation events of the jobs running under cancellable() in this process, keyed by job ID.
+_running_jobs = {}
+_running_jobs_lock = threading.Lock()
+
+class TaskRunnerError(Exception):
+    """Base class for failures of a governed task. Carries the resource usage collected so far."""
+    def __init__(self, message, resource_usage=None, child_traceback=None):
+        super().__init__(message)
+        self.resource_usage = resource_usage or {}
+        self.child_traceback = child_traceback
+
+class TaskTimeoutError(TaskRunnerError):
+    pass
+
+class TaskMemoryError(TaskRunnerError):
+    pass
+
+class TaskCancelledError(TaskRunnerError):
+    pass
+
+class TaskFailedError(TaskRunnerError):
+    pass
+
+class JobConflictError(Exception):
+    """Raised by cancellable() when a job with the same ID is already running."""
+
+def raise_if_cancelled():
+    """Cooperative cancellation point for code running under run_governed()."""
+    cancel_event = getattr(_progress, 'cancel_event', None) or _cancel_event
+    if cancel_event is not None and cancel_event.is_set():
+        raise TaskCancelledError("Task was cancelled.")
+
+def report_progress(stage, progress):
+    """
+    Reports a progress step of the running task to the ``progress_callback`` of run_governed().
+    Each step is also a cancellation point.
+    """
+    raise_if_cancelled()
+    sink = getattr(_progress, 'sink', None)
+    if sink is not None:
+        sink(stage, progress)
+
+def _process_context():
+    for method in ('forkserver', 'spawn'):
+        try:
+            return multiprocessing.get_context(method)
+        except ValueError:
+            continue
+    return None
+
+def _preload_app_module(ctx, app):
+    """
+    Has the forkserver import the application once, so children don't re-import pandas etc.
+    The forkserver starts with the server's environment but not its sys.path, so the folder the
+    application package was imported from is put on its PYTHONPATH; otherwise children could
+    only import the application when the server runs from that folder.
+    """
+    global _preloaded
+    if ctx.get_start_method() != 'forkserver':
+        return
+    with _preload_lock:
+        if not _preloaded:
+            package = importlib.import_module(app.import_name.split('.')[0])
+            package_root = os.path.dirname(os.path.dirname(os.path.abspath(package.__file__)))
+            paths = [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p]
+            if package_root not in paths:
+                os.environ['PYTHONPATH'] = os.pathsep.join([package_root] + paths)
+            ctx.set_forkserver_preload([app.import_name])
+            _preloaded = True
+
+def new_cancel_event():
+    """Creates an event that can be passed to run_governed() and set to request cancellation."""
+    ctx = _process_context()
+    return ctx.Event() if ctx else threading.Event()
+
+@contextmanager
+def cancellable(job_id):
+    """
+    Registers a new cancel event for ``job_id`` while the block runs, so that cancel_job() can
+    stop the job. Pass the yielded event to run_governed().
+
+    Raises:
+        JobConflictError: If a job with this ID is already running.
+    """
+    cancel_event = new_cancel_event()
+    with _running_jobs_lock:
+        if job_id in _running_jobs:
+            raise JobConflictError(f"A job with ID {job_id} is already running.")
+        _running_jobs[job_id] = cancel_event
+    try:
+        yield cancel_event
+    finally:
+        with _running_jobs_lock:
+            _running_jobs.pop(job_id, None)
+
+def cancel_job(job_id):
+    """
+    Requests cancellation of a job started under cancellable().
+    Returns False if no such job is running in this process.
+    """
+    with _running_jobs_lock:
+        cancel_event = _running_jobs.get(job_id)
+    if cancel_event is None:
+        return False
+    cancel_event.set()
+    return True
+
+def _own_usage():
+    if resource is None:
+        return {}
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'cpu_user_s': round(usage.ru_utime, 3),
+        'cpu_system_s': round(usage.ru_stime, 3),
+        'max_rss_mb': round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is in KB on Linux
+    }
+
+def _child_main(app_module, target, args, max_memory_bytes, cancel_event, conn):
+    global _cancel_event
+    _cancel_event = cancel_event
+    _progress.sink = lambda stage, progress: conn.send(('progress', (stage, progress)))
+    if resource is not None and max_memory_bytes:
+        # RLIMIT_RSS is not enforced by Linux; capping the address space is the effective ceiling.
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+
+    try:
+        app = importlib.import_module(app_module).create_app()
+    except Exception as e:
+        conn.send(('error', f"Could not create the application in the task process: {e}", traceback.format_exc(), _own_usage()))
+        conn.close()
+        return
+
+    with app.app_context():
+        try:
+            result = target(*args)
+            conn.send(('ok', result, None, _own_usage()))
+        except MemoryError:
+            conn.send(('memory', "Task exceeded its memory limit.", traceback.format_exc(), _own_usage()))
+        except TaskCancelledError as e:
+            conn.send(('cancelled', str(e), None, _own_usage()))
+        except Exception as e:
+            conn.send(('error', str(e), traceback.format_exc(), _own_usage()))
+        finally:
+            conn.close()
+
+def get_task_limits(config, task_type):
+    """The runner limits of ``task_type``: ANALYSIS_DEFAULT_LIMITS overridden by its ANALYSIS_TASK_LIMITS entry."""
+    limits = dict(config.get('ANALYSIS_DEFAULT_LIMITS', {}))
+    limits.update(config.get('ANALYSIS_TASK_LIMITS', {}).get(task_type, {}))
+    return limits
+
+def run_governed(app, target, args=(), timeout=None, max_memory_mb=None, cancel_event=None,
+                 progress_callback=None, poll_interval=0.5, cancel_grace=5):
+    """
+    Runs ``target(*args)`` inside an app context in a child process.
+
+    Args:
+        app: The Flask application. The child creates its own instance with the ``create_app``
+            factory of the module the application was created in.
+        target: Module-level callable to execute. Its arguments and return value must be picklable.
+        timeout (float): Wall-clock limit in seconds. The child is killed when it is exceeded.
+        max_memory_mb (int): Address-space ceiling for the child, in MB.
+        cancel_event: Event from new_cancel_event(). Once set, the child is expected to stop at its
+            next raise_if_cancelled() call, and is killed after ``cancel_grace`` seconds otherwise.
+        progress_callback: Called in the calling thread as ``progress_callback(stage, progress)``
+            for each report_progress() call of the target.
+
+    Returns:
+        tuple[object, dict]: (result, resource_usage)
+
+    Raises:
+        TaskTimeoutError, TaskMemoryError, TaskCancelledError, TaskFailedError
+    """
+    ctx = _process_context()
+    if ctx is None or resource is None:
+        logging.warning("Process isolation is unavailable on this platform; running task without resource limits.")
+        start = time.monotonic()
+        _progress.sink, _progress.cancel_event = progress_callback, cancel_event
+        try:
+            result = target(*args)
+        finally:
+            _progress.sink, _progress.cancel_event = None, None
+        return result, {'wall_time_s': round(time.monotonic() - start, 3), 'governed': False}
+
+    _preload_app_module(ctx, app)
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    if cancel_event is None:
+        cancel_event = ctx.Event()
+    max_memory_bytes = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+
+    process = ctx.Process(
+        target=_child_main,
+        args=(app.import_name, target, args, max_memory_bytes, cancel_event, child_conn),
+        daemon=True
+    )
+    start = time.monotonic()
+    process.start()
+    child_conn.close()
+
+    message = None
+    outcome = None
+    cancel_deadline = None
+    while True:
+        if parent_conn.poll(poll_interval):
+            try:
+                message = parent_conn.recv()
+            except EOFError:
+                break
+            if message[0] == 'progress':
+                if progress_callback is not None:
+                    progress_callback(*message[1])
+                message = None
+                continue
+            break
+        if not process.is_alive():
+            break
+        now = time.monotonic()
+        if timeout and now - start > timeout:
+            outcome = 'timeout'
+            break
+        if cancel_event.is_set():
+            cancel_deadline = cancel_deadline or now + cancel_grace
+            if now > cancel_deadline:
+                outcome = 'cancelled'
+                break
+
+    if outcome is not None and process.is_alive():
+        process.kill()
+    process.join()
+    parent_conn.close()
+
+    usage = dict(message[3]) if message else {}
+    usage['wall_time_s'] = round(time.monotonic() - start, 3)
+    usage['governed'] = True
+    usage['timeout_s'] = timeout
+    usage['max_memory_mb'] = max_memory_mb
+
+    if outcome == 'timeout':
+        raise TaskTimeoutError(f"Task exceeded its time limit of {timeout} seconds.", usage)
+    if outcome == 'cancelled':
+        raise TaskCancelledError("Task was cancelled.", usage)
+    if message is None:
+        raise TaskFailedError(f"Task process exited unexpectedly with code {process.exitcode}.", usage)
+
+    status, payload, child_traceback, _ = message
+    if status == 'ok':
+        return payload, usage
+    if status == 'memory':
+        raise TaskMemoryError(f"{payload} ({max_memory_mb} MB)", usage, child_traceback)
+    if status == 'cancelled':
+        raise TaskCancelledError(payload, usage)
+    raise TaskFailedError(payload, usage, child_traceback)
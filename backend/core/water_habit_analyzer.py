@@ -9,6 +9,8 @@ import glob
 from sklearn.cluster import KMeans
 import zipfile
 
+from .task_runner import report_progress
+
 # --- Matplotlib and Seaborn Configuration ---
 def configure_matplotlib(font_path=None):
     plt.rcParams['axes.unicode_minus'] = False
@@ -26,19 +28,29 @@ def configure_matplotlib(font_path=None):
         print("Warning: Custom font not found. Using default fonts. Chinese characters may not display correctly.")
 
 class WaterHabitAnalyzer:
-    def __init__(self, input_file_path, results_folder, font_path=None):
+    def __init__(self, input_file_path, bundle, font_path=None):
+        """
+        Args:
+            input_file_path (str): Path to the input CSV file.
+            bundle (zipfile.ZipFile): Open, writable archive that receives every chart and the report.
+            font_path (str): Path to the TTF font file for matplotlib.
+        """
         self.input_file_path = input_file_path
-        self.results_folder = results_folder
+        self.bundle = bundle
         self.building_name = os.path.basename(input_file_path).replace('.csv', '')
         self.data = None
         self.analysis_results = {}
         
-        if not os.path.exists(self.results_folder):
-            os.makedirs(self.results_folder)
-        
         configure_matplotlib(font_path)
         print(f"WaterHabitAnalyzer initialized for {self.building_name}")
-        print(f"Results will be saved to: {self.results_folder}")
+
+    def _save_figure(self, fig, name):
+        # PNGs are already compressed, so store them instead of deflating them again
+        info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with self.bundle.open(info, 'w') as f:
+            fig.savefig(f, format='png', dpi=300)
+        plt.close(fig)
 
     def load_and_preprocess_data(self):
         print("\n" + "="*50)
@@ -47,6 +59,8 @@ class WaterHabitAnalyzer:
         
         try:
             df = pd.read_csv(self.input_file_path, encoding='utf-8')
+            if '用水量' in df.columns and '水流量' not in df.columns:
+                df = df.rename(columns={'用水量': '水流量'})
             
             # --- Data Preprocessing ---
             df['日期'] = pd.to_datetime(df['日期'], format='%Y%m%d')
@@ -88,8 +102,7 @@ class WaterHabitAnalyzer:
         ax.legend()
         ax.grid(axis='y', linestyle='--', alpha=0.7)
         plt.tight_layout()
-        plt.savefig(os.path.join(self.results_folder, 'hourly_patterns.png'), dpi=300)
-        plt.close(fig)
+        self._save_figure(fig, 'hourly_patterns.png')
         print("✓ Hourly patterns analyzed and plot saved.")
 
     def analyze_weekly_patterns(self):
@@ -107,8 +120,7 @@ class WaterHabitAnalyzer:
         ax.legend(title='类型')
         ax.grid(True, linestyle='--', alpha=0.7)
         plt.tight_layout()
-        plt.savefig(os.path.join(self.results_folder, 'weekly_patterns.png'), dpi=300)
-        plt.close(fig)
+        self._save_figure(fig, 'weekly_patterns.png')
         print("✓ Weekly patterns analyzed and plot saved.")
 
     def perform_clustering(self):
@@ -136,7 +148,7 @@ class WaterHabitAnalyzer:
         for i in range(optimal_k):
             cluster_data = daily_profiles[daily_profiles['cluster'] == i].drop('cluster', axis=1)
             axes[i].plot(cluster_data.mean(axis=0), label=f'模式 {i+1} (共 {len(cluster_data)} 天)', marker='o')
-            axes[i].fill_between(cluster_data.columns, 
+            axes[i].fill_between(pd.to_numeric(cluster_data.columns), 
                                cluster_data.min(axis=0), 
                                cluster_data.max(axis=0), 
                                alpha=0.2)
@@ -146,8 +158,7 @@ class WaterHabitAnalyzer:
         
         axes[-1].set_xlabel('小时')
         plt.tight_layout(rect=[0, 0, 1, 0.96])
-        plt.savefig(os.path.join(self.results_folder, 'clustering_patterns.png'), dpi=300)
-        plt.close(fig)
+        self._save_figure(fig, 'clustering_patterns.png')
         print(f"✓ Clustering complete with {optimal_k} clusters. Plot saved.")
 
     def generate_report_text(self):
@@ -199,63 +210,47 @@ class WaterHabitAnalyzer:
         report_lines.append("2. **错峰用水宣传**: 可以在高峰时段前通过公告等形式，鼓励用户（尤其是在用水量大的楼栋）适当错峰用水。")
         report_lines.append("3. **供水系统维护**: 聚类分析出的异常低用量日可能对应节假日或设备故障，可结合实际情况进行核对。")
         
-        report_path = os.path.join(self.results_folder, 'analysis_report.txt')
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(report_lines))
+        self.bundle.writestr('analysis_report.txt', "\n".join(report_lines), compress_type=zipfile.ZIP_DEFLATED)
         
-        print(f"✓ Analysis report text saved to {report_path}")
+        print("✓ Analysis report text added to the results bundle")
+
+    def analysis_steps(self):
+        """The analysis stages, in order. Each one writes its artifacts into the bundle."""
+        return [
+            self.analyze_hourly_patterns,
+            self.analyze_weekly_patterns,
+            self.perform_clustering,
+            self.generate_report_text,
+        ]
 
     def run_complete_analysis(self):
         if not self.load_and_preprocess_data():
-            return None, "数据加载或预处理失败"
-        
-        self.analyze_hourly_patterns()
-        self.analyze_weekly_patterns()
-        self.perform_clustering()
-        self.generate_report_text()
+            return "数据加载或预处理失败"
         
-        # --- Create a Zip file of all results ---
-        zip_path = os.path.join(os.path.dirname(self.results_folder), f"{self.building_name}_analysis_results.zip")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(self.results_folder):
-                for file in files:
-                    zipf.write(os.path.join(root, file), arcname=file)
+        for step in self.analysis_steps():
+            step()
         
         print("\n" + "="*50)
-        print(f"分析完成！所有结果图表和报告已打包到: {zip_path}")
+        print("分析完成！所有结果图表和报告已写入结果压缩包。")
         print("="*50)
-        return zip_path, None
+        return None
 
 
-def run_water_habit_analysis(input_file_path: str, output_dir: str, font_path: str) -> (str, str):
+def write_water_habit_analysis(input_file_path: str, bundle_path: str, font_path: str = None):
     """
-    Callable function to run the water habit analysis.
-
-    Args:
-        input_file_path (str): Path to the input CSV file.
-        output_dir (str): Directory to save the results.
-        font_path (str): Path to the TTF font file for matplotlib.
+    Runs the water habit analysis, writing every chart and the report straight into the zip
+    archive at ``bundle_path``; no intermediate folder is created. Under core.task_runner each
+    stage reports progress and is a cancellation point.
 
     Returns:
-        tuple[str, str]: A tuple containing (path_to_zip_file, error_message).
-                         If successful, error_message is None.
-                         If failed, path_to_zip_file is None.
+        str: An error message if the data could not be loaded, otherwise None.
     """
-    try:
-        # Create a specific sub-folder for this analysis run to avoid conflicts
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        results_folder = os.path.join(output_dir, f"results_{timestamp}")
-        
-        analyzer = WaterHabitAnalyzer(
-            input_file_path=input_file_path, 
-            results_folder=results_folder,
-            font_path=font_path
-        )
-        zip_path, error = analyzer.run_complete_analysis()
-        if error:
-            return None, error
-        return zip_path, None
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return None, str(e) 
\ No newline at end of file
+    with zipfile.ZipFile(bundle_path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        analyzer = WaterHabitAnalyzer(input_file_path=input_file_path, bundle=bundle, font_path=font_path)
+        if not analyzer.load_and_preprocess_data():
+            return "数据加载或预处理失败"
+        steps = analyzer.analysis_steps()
+        for index, step in enumerate(steps):
+            report_progress(step.__name__, round(index / len(steps), 3))
+            step()
+    return None
@@ -1,5 +1,6 @@
 import logging
 import logging.config
+import multiprocessing
 import json
 from pythonjsonlogger import jsonlogger
 import os
@@ -16,7 +17,10 @@ class CustomJsonFormatter(jsonlogger.JsonFormatter):
 
 def setup_logging():
     log_dir = 'backend/logs'
-    if not os.path.exists(log_dir):
+    # Task processes started by core.task_runner log to the console only: a second
+    # RotatingFileHandler on app.log would rotate the file under the server's handler.
+    file_logging = multiprocessing.parent_process() is None
+    if file_logging and not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
     config = {
@@ -56,4 +60,8 @@ def setup_logging():
             }
         }
     }
+    if not file_logging:
+        del config['handlers']['file']
+        for logger in config['loggers'].values():
+            logger['handlers'].remove('file')
     logging.config.dictConfig(config) 
\ No newline at end of file
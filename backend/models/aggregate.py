@@ -0,0 +1,32 @@
+import datetime
+from ..extensions import db
+
+class BuildingAggregate(db.Model):
+    __tablename__ = 'building_aggregates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    building = db.Column(db.String(255), nullable=False, unique=True, index=True) # e.g., '校内1栋'
+    # Path of the persisted UsageAggregate (.npz) file
+    file_path = db.Column(db.String(255), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    start_date = db.Column(db.Date, nullable=True)
+    end_date = db.Column(db.Date, nullable=True)
+
+    # The latest conversion task merged into this aggregate
+    last_task_id = db.Column(db.Integer, db.ForeignKey('conversion_tasks.id'), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BuildingAggregate {self.building}>'
+
+    def to_dict(self):
+        return {
+            'building': self.building,
+            'row_count': self.row_count,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'last_task_id': self.last_task_id,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
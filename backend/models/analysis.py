@@ -3,6 +3,10 @@ from ..extensions import db
 
 class AnalysisResult(db.Model):
     __tablename__ = 'analysis_results'
+    __table_args__ = (
+        # Keyset pagination of the history list orders by (created_at, id)
+        db.Index('ix_analysis_results_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True)
     name = db.Column(db.String(255), nullable=False, default='未命名分析')
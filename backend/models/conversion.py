@@ -4,14 +4,19 @@ import uuid
 
 class ConversionTask(db.Model):
     __tablename__ = 'conversion_tasks'
+    __table_args__ = (
+        # Listings filter by status and page by creation time
+        db.Index('ix_conversion_tasks_status_created_at', 'status', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     
     # Foreign Key to the original uploaded dataset
     original_dataset_id = db.Column(db.String(36), db.ForeignKey('datasets.id'), nullable=False)
     
-    status = db.Column(db.String(64), default='pending')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # active_history loads the previous status on change, for the dashboard status counters
+    status = db.column_property(db.Column(db.String(64), default='pending'), active_history=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship to the generated CSV datasets
@@ -24,6 +29,7 @@ class ConversionTask(db.Model):
             'original_dataset_id': self.original_dataset_id,
             'status': self.status,
             'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'converted_datasets': [d.to_dict() for d in self.converted_datasets]
         }
 
@@ -34,10 +40,12 @@ class ConvertedDataset(db.Model):
     name = db.Column(db.String(255), nullable=False) # e.g., building name like '1栋'
     file_path = db.Column(db.String(255), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
+    # Cached partial UsageAggregate (.npz) of this file, merged when analyzing building selections
+    aggregate_path = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Foreign Key to the conversion task
-    task_id = db.Column(db.Integer, db.ForeignKey('conversion_tasks.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('conversion_tasks.id'), nullable=False, index=True)
     
     # Relationship
     task = db.relationship('ConversionTask', back_populates='converted_datasets')
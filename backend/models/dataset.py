@@ -9,6 +9,12 @@ class Dataset(db.Model):
     name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(255), nullable=False) # Should store the unique filename, e.g., UUID.csv
     file_size = db.Column(db.Integer, nullable=False)
+    encoding = db.Column(db.String(32), nullable=True) # Detected at upload for CSV files
+    delimiter = db.Column(db.String(4), nullable=True)
+    # SHA-256 of the file content
+    content_hash = db.Column(db.String(64), nullable=True)
+    # Columns, dtypes, row count and Excel sheet dimensions, computed once at upload
+    profile = db.Column(db.JSON, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
 
@@ -22,5 +28,9 @@ class Dataset(db.Model):
             'id': self.id,
             'name': self.name,
             'file_size': self.file_size,
+            'encoding': self.encoding,
+            'delimiter': self.delimiter,
+            'content_hash': self.content_hash,
+            'row_count': self.profile.get('row_count') if self.profile else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         } 
\ No newline at end of file
@@ -0,0 +1,15 @@
+from ..extensions import db
+
+class DashboardCounter(db.Model):
+    """
+    Materialized dashboard counters, kept current by services.dashboard_stats as users,
+    datasets and conversion tasks are flushed. Keys are 'users', 'datasets', 'tasks' and
+    'tasks:<status>', plus the '_version' marker written when the counters are rebuilt.
+    """
+    __tablename__ = 'dashboard_counters'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DashboardCounter {self.key}={self.value}>'
@@ -0,0 +1,42 @@
+from ..extensions import db
+from datetime import datetime
+import uuid
+
+class UploadSession(db.Model):
+    """An in-progress chunked upload. Chunks are appended in order to a partial file."""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    # Bytes written so far; always a whole number of chunks until the last one arrives
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    # Optional SHA-256 supplied by the client, checked on completion
+    expected_sha256 = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def total_chunks(self):
+        return max(-(-self.total_size // self.chunk_size), 1)
+
+    @property
+    def received_chunks(self):
+        if self.received_size >= self.total_size:
+            return self.total_chunks
+        return self.received_size // self.chunk_size
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'total_chunks': self.total_chunks,
+            'received_chunks': self.received_chunks,
+            'received_size': self.received_size,
+            'complete': self.received_size >= self.total_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
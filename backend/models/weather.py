@@ -0,0 +1,39 @@
+from ..extensions import db
+from datetime import datetime
+
+class WeatherHourly(db.Model):
+    """
+    One hour of weather for an APISpace areacode, in the area's local time. ``source`` is
+    'observed' for hours from the weather archive; rows stored by earlier backfills from the
+    APISpace forecast are marked 'forecast'.
+    """
+    __tablename__ = 'weather_hourly'
+    __table_args__ = (
+        # Deduplicates backfills and serves range queries per areacode
+        db.UniqueConstraint('areacode', 'timestamp', name='uq_weather_hourly_areacode_timestamp'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    areacode = db.Column(db.String(32), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    temperature = db.Column(db.Float, nullable=True)
+    humidity = db.Column(db.Float, nullable=True)
+    precipitation = db.Column(db.Float, nullable=True)
+    text = db.Column(db.String(64), nullable=True)
+    wind_dir = db.Column(db.String(32), nullable=True)
+    wind_class = db.Column(db.String(32), nullable=True)
+    source = db.Column(db.String(16), nullable=False, default='observed')
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'areacode': self.areacode,
+            'timestamp': self.timestamp.isoformat(),
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'precipitation': self.precipitation,
+            'text': self.text,
+            'wind_dir': self.wind_dir,
+            'wind_class': self.wind_class,
+            'source': self.source,
+        }
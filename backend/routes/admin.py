@@ -4,11 +4,15 @@ from ..models.user import User
 from ..models.dataset import Dataset
 from ..utils.decorators import admin_required
 from flask_jwt_extended import get_jwt_identity
+from ..services.log_query import LogFilter, LogQueryError, query_logs, log_files, parse_time
 import os
 import logging
 
 admin_bp = Blueprint('admin', __name__)
 
+LOGS_PAGE_SIZE = 200
+LOGS_MAX_PAGE_SIZE = 1000
+
 @admin_bp.route('/users', methods=['GET'])
 @admin_required()
 def get_users():
@@ -133,20 +137,35 @@ def delete_dataset(dataset_id):
 @admin_bp.route('/logs', methods=['GET'])
 @admin_required()
 def get_logs():
+    """
+    Returns log lines, newest first, from app.log and its rotated backups.
+    Query params: limit (default 200, at most 1000), level (comma-separated), logger,
+    since/until (ISO 8601 or epoch seconds), q (case-insensitive substring) and cursor
+    (the next_cursor of the previous page).
+    """
     log_file_path = os.path.join(current_app.root_path, 'logs', 'app.log')
-    try:
-        if not os.path.exists(log_file_path):
-            return jsonify({"logs": [], "message": "Log file does not exist."})
-
-        with open(log_file_path, 'r', encoding='utf-8') as f:
-            # Read lines, reverse them to get the most recent logs first
-            log_lines = f.readlines()
-            # We will return the last 200 lines to avoid large payloads
-            recent_logs = log_lines[-200:]
-            recent_logs.reverse()
-            return jsonify({"logs": recent_logs})
+    limit = request.args.get('limit', LOGS_PAGE_SIZE, type=int)
+    if not 1 <= limit <= LOGS_MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {LOGS_MAX_PAGE_SIZE}"}), 400
 
+    try:
+        levels = [level for level in request.args.get('level', '').split(',') if level]
+        log_filter = LogFilter(
+            levels=levels,
+            logger=request.args.get('logger'),
+            since=parse_time(request.args.get('since')),
+            until=parse_time(request.args.get('until')),
+            text=request.args.get('q')
+        )
+        if not log_files(log_file_path):
+            return jsonify({"logs": [], "next_cursor": None, "message": "Log file does not exist."})
+
+        logs, next_cursor = query_logs(log_file_path, log_filter, limit=limit, cursor=request.args.get('cursor'))
+        return jsonify({"logs": logs, "next_cursor": next_cursor})
+
+    except LogQueryError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         user_id = get_jwt_identity() # We can get the user id if needed for logging
         logging.error(f"Admin user (ID: {user_id}) failed to read log file: {e}", exc_info=True)
-        return jsonify({"error": "Could not read log file."}), 500 
\ No newline at end of file
+        return jsonify({"error": "Could not read log file."}), 500
@@ -1,21 +1,130 @@
-from flask import Blueprint, jsonify, current_app, request, Response
+from flask import Blueprint, jsonify, current_app, request, Response, url_for
 from flask_jwt_extended import jwt_required
+from sqlalchemy import or_, and_
 import os
 import uuid
+import tempfile
+import base64
+import binascii
+from datetime import datetime
+import pandas as pd
 from urllib.parse import quote
 
 from ..extensions import db
 from ..models.conversion import ConvertedDataset, ConversionTask
 from ..models.analysis import AnalysisResult, AnalysisChart
+from ..models.aggregate import BuildingAggregate
 from ..services.water_habit_analysis import WaterHabitAnalyzer
+from ..services.aggregate_service import load_building_aggregates, load_dataset_aggregates
+from ..services.usage_aggregate import read_usage_csv
+from ..services.forecast_service import forecast_many, file_fingerprint, hourly_usage_series
+from ..services.demand_forecast import forecast_next_day
+from ..services.clustering_service import load_cluster_labels_page, MAX_LABELS_PAGE
+from ..core.water_habit_analyzer import write_water_habit_analysis
+from ..core.task_runner import (
+    run_governed, report_progress, get_task_limits, cancellable, cancel_job, JobConflictError, TaskCancelledError
+)
+from ..utils.validation import bounded_int
+from ..utils.http_cache import make_etag, is_fresh, not_modified, cached_json, cached_response
+from ..services.progress_events import publish_analysis_progress
+from ..services.weather_history import load_temperature_frame
 
 analysis_bp = Blueprint('analysis', __name__)
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+DATASETS_PAGE_SIZE = 100
+DATASETS_MAX_PAGE_SIZE = 500
+# Charts of a stored result never change
+CHART_MAX_AGE = 24 * 3600
+# Bounds of the ARIMA forecast horizon and fitting window, in hours
+FORECAST_MAX_STEPS = 24 * 14
+FORECAST_MIN_HISTORY = 48
+FORECAST_MAX_HISTORY = 24 * 366
+# Largest p, d or q accepted in a fixed ARIMA order
+FORECAST_MAX_ORDER = 10
+# Bytes per chunk of a streamed analysis bundle
+BUNDLE_CHUNK_SIZE = 64 * 1024
+
+def _encode_history_cursor(created_at, result_id):
+    raw = f"{created_at.isoformat()}|{result_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_history_cursor(cursor):
+    """Returns (created_at, id) from a history cursor. Raises ValueError if it is malformed."""
+    try:
+        created_at, result_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(created_at), result_id
+    except (UnicodeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor.") from e
+
+def _progress_publisher(job_id):
+    """Progress callback for WaterHabitAnalyzer that publishes stage events for ``job_id``."""
+    return lambda stage, progress: publish_analysis_progress(job_id, 'running', stage=stage, progress=progress)
+
+def _analysis_weather(aggregates):
+    """
+    Stored observed hourly temperatures (filled by the weather archive backfill) covering the
+    aggregates' date range, for the areacode given as 'weather_areacode' in the request or the
+    first configured WEATHER_AREACODES entry. Returns None when no areacode is known, which
+    skips the temperature sensitivity stage; so does a store without observed hours.
+    """
+    areacode = request.json.get('weather_areacode') or next(iter(current_app.config.get('WEATHER_AREACODES') or []), None)
+    non_empty = [aggregate for aggregate in aggregates if len(aggregate.dates)]
+    if not areacode or not non_empty:
+        return None
+    start = min(aggregate.start_date for aggregate in non_empty)
+    end = max(aggregate.end_date for aggregate in non_empty) + pd.Timedelta(days=1)
+    return load_temperature_frame(areacode, start.to_pydatetime(), end.to_pydatetime())
+
+def _analyze_aggregates(aggregates, weather):
+    """Runs in the task process: the complete usage analysis of the given aggregates."""
+    analyzer = WaterHabitAnalyzer(building_aggregates=aggregates, weather=weather)
+    return analyzer.run_complete_analysis(progress_callback=report_progress)
+
+def _run_usage_report(aggregates, job_id):
+    """
+    Runs the usage analysis in a resource-limited child process (limits of 'usage_report'),
+    publishing its stage events for ``job_id``; POST /jobs/<job_id>/cancel stops it.
+    Returns the analyzer's {report, charts}.
+    """
+    limits = get_task_limits(current_app.config, 'usage_report')
+    with cancellable(job_id) as cancel_event:
+        results, resource_usage = run_governed(
+            current_app._get_current_object(), _analyze_aggregates, args=(aggregates, _analysis_weather(aggregates)),
+            timeout=limits.get('timeout'), max_memory_mb=limits.get('max_memory_mb'),
+            cancel_event=cancel_event, progress_callback=_progress_publisher(job_id)
+        )
+    current_app.logger.info(f"Usage analysis {job_id} finished in {resource_usage.get('wall_time_s')}s.")
+    return results
+
+def _store_analysis_result(task_id, analysis_name, results):
+    """Persists an analysis report and its charts, returning the new result ID. The caller commits."""
+    result_id = str(uuid.uuid4())
+    new_analysis_result = AnalysisResult(
+        id=result_id,
+        task_id=task_id,
+        name=analysis_name,
+        report_content=results['report']
+    )
+    db.session.add(new_analysis_result)
+
+    for chart in results['charts']:
+        new_chart = AnalysisChart(
+            result_id=result_id,
+            title=chart['title'],
+            chart_data=chart['image_base64']
+        )
+        db.session.add(new_chart)
+    return result_id
+
 @analysis_bp.route('/', methods=['POST'])
 @jwt_required()
 def run_analysis():
     """
     Runs analysis on one or more datasets, stores results in DB, and returns the result ID.
+    The analysis is assembled by merging each dataset's cached partial aggregate,
+    so overlapping building selections never re-read the CSVs.
     """
     dataset_ids = request.json.get('dataset_ids', [])
     if not dataset_ids:
@@ -30,70 +139,269 @@ def run_analysis():
     
     first_dataset = converted_datasets[0]
     task_id = first_dataset.task_id
-    data_folder = os.path.dirname(first_dataset.file_path)
     
     filenames = [os.path.basename(ds.file_path) for ds in converted_datasets]
+    job_id = request.json.get('job_id') or str(uuid.uuid4())
 
     try:
-        analyzer = WaterHabitAnalyzer(data_folder=data_folder, filenames=filenames)
-        results = analyzer.run_complete_analysis()
+        publish_analysis_progress(job_id, 'running', stage='start', progress=0.0)
+        aggregates = load_dataset_aggregates(converted_datasets)
+        results = _run_usage_report(aggregates, job_id)
         
-        result_id = str(uuid.uuid4())
         # The relationship should exist if the DB is consistent.
         original_file_name = first_dataset.task.original_dataset.name if first_dataset.task.original_dataset else "Unknown"
         analysis_name = f"分析报告 - {original_file_name} ({len(filenames)}个文件)"
 
-        new_analysis_result = AnalysisResult(
-            id=result_id,
-            task_id=task_id,
-            name=analysis_name,
-            report_content=results['report']
-        )
-        db.session.add(new_analysis_result)
-
-        for chart in results['charts']:
-            new_chart = AnalysisChart(
-                result_id=result_id,
-                title=chart['title'],
-                chart_data=chart['image_base64']
-            )
-            db.session.add(new_chart)
-            
+        result_id = _store_analysis_result(task_id, analysis_name, results)
         db.session.commit()
+        publish_analysis_progress(job_id, 'completed', progress=1.0, result_id=result_id)
         
-        return jsonify({"msg": "Analysis completed and results stored.", "result_id": result_id}), 201
+        return jsonify({"msg": "Analysis completed and results stored.", "result_id": result_id, "job_id": job_id}), 201
 
+    except JobConflictError as e:
+        return jsonify({"msg": str(e)}), 409
+    except TaskCancelledError:
+        db.session.rollback()
+        publish_analysis_progress(job_id, 'cancelled')
+        return jsonify({"msg": "Analysis was cancelled.", "job_id": job_id}), 409
     except Exception as e:
         db.session.rollback()
+        publish_analysis_progress(job_id, 'failed', error=str(e))
         current_app.logger.error(f"Failed to run analysis for datasets {dataset_ids}: {str(e)}", exc_info=True)
         return jsonify({"msg": "An unexpected error occurred during analysis.", "error": str(e)}), 500
 
 
+@analysis_bp.route('/buildings', methods=['GET'])
+@jwt_required()
+def get_building_aggregates():
+    """
+    Lists buildings that have a persisted usage aggregate, i.e. whose full history
+    can be analyzed without re-reading the converted CSVs.
+    """
+    records = BuildingAggregate.query.order_by(BuildingAggregate.building).all()
+    return jsonify([r.to_dict() for r in records])
+
+
+@analysis_bp.route('/buildings', methods=['POST'])
+@jwt_required()
+def run_building_analysis():
+    """
+    Regenerates statistics, peak hours, charts and the report for the full history of
+    the given buildings from their persisted aggregates, and stores the result.
+    """
+    buildings = request.json.get('buildings', [])
+    if not buildings:
+        return jsonify({"msg": "Please provide a list of building names."}), 400
+
+    job_id = request.json.get('job_id') or str(uuid.uuid4())
+    try:
+        aggregates, records, missing = load_building_aggregates(buildings)
+        if not aggregates:
+            return jsonify({"msg": "No stored aggregates found for the provided buildings"}), 404
+        if missing:
+            current_app.logger.warning(f"No stored aggregates for buildings: {missing}")
+
+        publish_analysis_progress(job_id, 'running', stage='start', progress=0.0)
+        results = _run_usage_report(aggregates, job_id)
+
+        task_id = max((r.last_task_id for r in records if r.last_task_id is not None), default=None)
+        if task_id is None:
+            return jsonify({"msg": "Stored aggregates are not linked to a conversion task."}), 409
+
+        analysis_name = f"累计分析报告 - {', '.join(sorted(r.building for r in records))}"
+        result_id = _store_analysis_result(task_id, analysis_name, results)
+        db.session.commit()
+        publish_analysis_progress(job_id, 'completed', progress=1.0, result_id=result_id)
+
+        return jsonify({"msg": "Analysis completed and results stored.", "result_id": result_id, "job_id": job_id, "missing_buildings": missing}), 201
+
+    except JobConflictError as e:
+        return jsonify({"msg": str(e)}), 409
+    except TaskCancelledError:
+        db.session.rollback()
+        publish_analysis_progress(job_id, 'cancelled')
+        return jsonify({"msg": "Analysis was cancelled.", "job_id": job_id}), 409
+    except Exception as e:
+        db.session.rollback()
+        publish_analysis_progress(job_id, 'failed', error=str(e))
+        current_app.logger.error(f"Failed to run aggregate analysis for buildings {buildings}: {str(e)}", exc_info=True)
+        return jsonify({"msg": "An unexpected error occurred during analysis.", "error": str(e)}), 500
+
+
+@analysis_bp.route('/jobs/<string:job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_analysis_job(job_id):
+    """
+    Requests cancellation of a running analysis job by the job_id it was started with. The job
+    stops at its next progress step, or is killed once the runner's grace period has passed.
+    Jobs are tracked per server process, so the request has to reach the process running it.
+    """
+    if not cancel_job(job_id):
+        return jsonify({"msg": "No running job with this ID."}), 404
+    publish_analysis_progress(job_id, 'cancelling')
+    return jsonify({"msg": "Cancellation requested.", "job_id": job_id}), 202
+
+
+@analysis_bp.route('/forecast', methods=['POST'])
+@jwt_required()
+def forecast_buildings():
+    """
+    Forecasts hourly water usage of the given converted datasets with ARIMA. Orders are
+    searched by AIC (or fixed via 'order'), buildings are fitted concurrently, and fitted
+    models are cached so repeat or longer-horizon forecasts skip fitting.
+    """
+    dataset_ids = request.json.get('dataset_ids', [])
+    if not dataset_ids:
+        return jsonify({"msg": "Please provide a list of dataset IDs."}), 400
+
+    converted_datasets = ConvertedDataset.query.filter(ConvertedDataset.id.in_(dataset_ids)).all()
+    if not converted_datasets:
+        return jsonify({"msg": "No valid converted datasets found for the provided IDs"}), 404
+
+    try:
+        steps = bounded_int(request.json.get('steps', 24), 'steps', 1, FORECAST_MAX_STEPS)
+        history = request.json.get('history', 24 * 28)
+        # null uses the full series
+        if history is not None:
+            history = bounded_int(history, 'history', FORECAST_MIN_HISTORY, FORECAST_MAX_HISTORY)
+        order = request.json.get('order')
+        # null searches the order by AIC
+        if order is not None:
+            if not isinstance(order, list) or len(order) != 3:
+                raise ValueError("'order' must be a list of three integers [p, d, q].")
+            order = tuple(bounded_int(value, 'order', 0, FORECAST_MAX_ORDER) for value in order)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    try:
+        series_map, dataset_hashes = {}, {}
+        for ds in converted_datasets:
+            series_map[ds.name] = hourly_usage_series(read_usage_csv(ds.file_path))
+            dataset_hashes[ds.name] = file_fingerprint(ds.file_path)
+
+        forecasts = forecast_many(
+            series_map, steps, dataset_hashes, order=order, history=history,
+            n_jobs=current_app.config['FORECAST_N_JOBS']
+        )
+        return jsonify({"steps": steps, "forecasts": forecasts})
+
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Failed to forecast datasets {dataset_ids}: {str(e)}", exc_info=True)
+        return jsonify({"msg": "An unexpected error occurred during forecasting."}), 500
+
+
+@analysis_bp.route('/forecast/next-day', methods=['POST'])
+@jwt_required()
+def forecast_next_day_demand():
+    """
+    Predicts tomorrow's hourly water usage for every selected building in one call, using
+    a gradient-boosted model over the extractor's lag features. Trained models are reused
+    until the underlying datasets change.
+    """
+    dataset_ids = request.json.get('dataset_ids', [])
+    if not dataset_ids:
+        return jsonify({"msg": "Please provide a list of dataset IDs."}), 400
+
+    converted_datasets = ConvertedDataset.query.filter(ConvertedDataset.id.in_(dataset_ids)).all()
+    if not converted_datasets:
+        return jsonify({"msg": "No valid converted datasets found for the provided IDs"}), 404
+
+    try:
+        frames, hashes = {}, {}
+        for ds in sorted(converted_datasets, key=lambda d: d.file_path):
+            # Datasets of the same building from different conversions are forecast as one series.
+            frames.setdefault(ds.name, []).append(read_usage_csv(ds.file_path))
+            hashes.setdefault(ds.name, []).append(file_fingerprint(ds.file_path))
+        frames = {name: pd.concat(parts, ignore_index=True) for name, parts in frames.items()}
+        hashes = {name: ','.join(parts) for name, parts in hashes.items()}
+
+        result = forecast_next_day(frames, hashes, mode=request.json.get('mode', 'global'))
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Failed to run next-day forecast for datasets {dataset_ids}: {str(e)}", exc_info=True)
+        return jsonify({"msg": "An unexpected error occurred during forecasting.", "error": str(e)}), 500
+
+
+@analysis_bp.route('/jobs/<string:job_id>/clusters/labels', methods=['GET'])
+@jwt_required()
+def get_cluster_labels(job_id):
+    """
+    Returns one page of the per-row cluster labels of a clustering job
+    (POST /api/datasets/<id>/clustering).
+    Query params: offset (default 0), limit (default 1000, at most 10000).
+    """
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 1000, type=int)
+    if offset < 0 or not 1 <= limit <= MAX_LABELS_PAGE:
+        return jsonify({"msg": f"offset must be >= 0 and limit between 1 and {MAX_LABELS_PAGE}."}), 400
+
+    page = load_cluster_labels_page(job_id, offset, limit)
+    if page is None:
+        return jsonify({"msg": "Cluster labels not found for this job"}), 404
+
+    total, labels = page
+    next_offset = offset + len(labels)
+    return jsonify({
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < total else None,
+        "labels": labels
+    })
+
+
 @analysis_bp.route('/results/<string:result_id>', methods=['GET'])
 @jwt_required()
 def get_analysis_result(result_id):
     """
-    Retrieves a stored analysis result, including the report and chart data.
+    Retrieves a stored analysis result: the report plus chart descriptors. Chart images are
+    fetched separately from each descriptor's URL, so clients can load them in parallel.
+    Stored results never change, so the response carries an ETag and repeat requests get 304.
     """
-    result = AnalysisResult.query.get(result_id)
+    result = db.session.query(AnalysisResult.id, AnalysisResult.created_at).filter_by(id=result_id).first()
     if not result:
         return jsonify({"msg": "Analysis result not found"}), 404
-        
-    charts = []
-    for chart in result.charts:
-        charts.append({
-            'id': chart.id,
-            'title': chart.title,
-            'image_base64': f"data:image/png;base64,{chart.chart_data}"
-        })
 
-    return jsonify({
+    charts = db.session.query(AnalysisChart.id, AnalysisChart.title) \
+        .filter_by(result_id=result_id).order_by(AnalysisChart.id).all()
+    etag = make_etag(result.id, result.created_at.isoformat(), *(c.id for c in charts))
+    if is_fresh(etag):
+        return not_modified(etag)
+
+    name, report_content = db.session.query(AnalysisResult.name, AnalysisResult.report_content) \
+        .filter_by(id=result_id).one()
+    return cached_json({
         "id": result.id,
-        "name": result.name,
-        "report": result.report_content,
-        "charts": charts,
+        "name": name,
+        "report": report_content,
+        "charts": [{
+            'id': chart.id,
+            'title': chart.title,
+            'url': url_for('analysis.get_analysis_chart', result_id=result_id, chart_id=chart.id)
+        } for chart in charts],
         "created_at": result.created_at.isoformat()
-    })
+    }, etag)
+
+
+@analysis_bp.route('/results/<string:result_id>/charts/<int:chart_id>', methods=['GET'])
+@jwt_required()
+def get_analysis_chart(result_id, chart_id):
+    """Returns one chart of an analysis result as a PNG image."""
+    etag = make_etag(result_id, chart_id)
+    exists = db.session.query(AnalysisChart.id).filter_by(id=chart_id, result_id=result_id).first()
+    if not exists:
+        return jsonify({"msg": "Chart not found"}), 404
+    if is_fresh(etag):
+        return not_modified(etag, max_age=CHART_MAX_AGE)
+
+    chart_data = db.session.query(AnalysisChart.chart_data).filter_by(id=chart_id).scalar()
+    # PNG data is already compressed, so it is not gzipped again.
+    return cached_response(base64.b64decode(chart_data), etag, 'image/png', max_age=CHART_MAX_AGE, compress=False)
 
 @analysis_bp.route('/results/<string:result_id>/report', methods=['GET'])
 @jwt_required()
@@ -141,15 +449,50 @@ def download_report(result_id):
 @jwt_required()
 def get_history():
     """
-    Retrieves a list of all past analysis results.
+    Retrieves past analysis results, newest first, one page at a time.
+    Query params: limit (default 20, at most 100), cursor (next_cursor of the previous page),
+    task_id, name (case-insensitive substring).
+    Pages are located with a (created_at, id) keyset, so every page costs the same
+    regardless of how many results exist.
     """
-    results = AnalysisResult.query.order_by(AnalysisResult.created_at.desc()).all()
-    history_list = [{
-        "id": r.id,
-        "name": r.name,
-        "created_at": r.created_at.isoformat()
-    } for r in results]
-    return jsonify(history_list)
+    limit = request.args.get('limit', HISTORY_PAGE_SIZE, type=int)
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+        return jsonify({"msg": f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}."}), 400
+
+    # Select only the listed columns so report bodies are never loaded.
+    query = db.session.query(AnalysisResult.id, AnalysisResult.name, AnalysisResult.task_id, AnalysisResult.created_at)
+
+    task_id = request.args.get('task_id', type=int)
+    if task_id is not None:
+        query = query.filter(AnalysisResult.task_id == task_id)
+    name = request.args.get('name')
+    if name:
+        query = query.filter(AnalysisResult.name.icontains(name, autoescape=True))
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = _decode_history_cursor(cursor)
+        except ValueError:
+            return jsonify({"msg": "Invalid cursor."}), 400
+        query = query.filter(or_(
+            AnalysisResult.created_at < cursor_created_at,
+            and_(AnalysisResult.created_at == cursor_created_at, AnalysisResult.id < cursor_id)
+        ))
+
+    rows = query.order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "items": [{
+            "id": r.id,
+            "name": r.name,
+            "task_id": r.task_id,
+            "created_at": r.created_at.isoformat()
+        } for r in rows],
+        "next_cursor": _encode_history_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    })
 
 
 @analysis_bp.route('/results/<string:result_id>', methods=['DELETE'])
@@ -175,17 +518,102 @@ def delete_result(result_id):
 @analysis_bp.route('/datasets', methods=['GET'])
 @jwt_required()
 def get_analysis_datasets():
-    tasks = ConversionTask.query.filter_by(status='completed').order_by(ConversionTask.created_at.desc()).all()
-    
-    datasets_for_analysis = []
-    for task in tasks:
-        # Ensure relationships are loaded to prevent errors
-        if task.converted_datasets:
-            datasets_for_analysis.extend([{
-                'id': ds.id,
-                'name': ds.name,
-                'task_id': task.id,
-                'created_at': ds.created_at.isoformat()
-            } for ds in task.converted_datasets])
-            
-    return jsonify(datasets_for_analysis)
\ No newline at end of file
+    """
+    Lists converted datasets of completed conversion tasks, newest task first, one page at a
+    time. Optional query params: limit (default DATASETS_PAGE_SIZE, at most
+    DATASETS_MAX_PAGE_SIZE), offset. 'next_offset' is null on the last page.
+    """
+    limit = request.args.get('limit', DATASETS_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0 or not 1 <= limit <= DATASETS_MAX_PAGE_SIZE:
+        return jsonify({"msg": f"offset must be >= 0 and limit between 1 and {DATASETS_MAX_PAGE_SIZE}"}), 400
+
+    query = db.session.query(
+        ConvertedDataset.id, ConvertedDataset.name, ConvertedDataset.task_id, ConvertedDataset.created_at
+    ).join(ConversionTask, ConvertedDataset.task_id == ConversionTask.id) \
+        .filter(ConversionTask.status == 'completed')
+    total = query.count()
+    rows = query.order_by(ConversionTask.created_at.desc(), ConversionTask.id.desc(), ConvertedDataset.created_at, ConvertedDataset.name) \
+        .offset(offset).limit(limit).all()
+
+    return jsonify({
+        'items': [{
+            'id': ds.id,
+            'name': ds.name,
+            'task_id': ds.task_id,
+            'created_at': ds.created_at.isoformat()
+        } for ds in rows],
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'next_offset': offset + limit if offset + limit < total else None
+    })
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _iter_file(path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(BUNDLE_CHUNK_SIZE), b''):
+            yield chunk
+
+@analysis_bp.route('/datasets/<string:dataset_id>/bundle', methods=['GET'])
+@jwt_required()
+def download_analysis_bundle(dataset_id):
+    """
+    Runs the single-building analysis on a converted dataset in a resource-limited child process
+    (limits of 'water_habit') and streams the resulting ZIP bundle (charts + text report) back as
+    a chunked download. The child writes the charts and report straight into one temporary
+    archive, which is removed once the download ends.
+    Optional query param: job_id, for progress events and POST /jobs/<job_id>/cancel.
+    """
+    dataset = ConvertedDataset.query.get(dataset_id)
+    if not dataset:
+        return jsonify({"msg": "Converted dataset not found"}), 404
+    if not os.path.exists(dataset.file_path):
+        return jsonify({"msg": "File not found on server"}), 404
+
+    job_id = request.args.get('job_id') or str(uuid.uuid4())
+    font_path = os.path.join(current_app.root_path, 'fonts', 'SourceHanSansCN-Regular.ttf')
+    limits = get_task_limits(current_app.config, 'water_habit')
+    fd, bundle_path = tempfile.mkstemp(prefix='analysis_bundle_', suffix='.zip')
+    os.close(fd)
+    try:
+        publish_analysis_progress(job_id, 'running', stage='start', progress=0.0)
+        with cancellable(job_id) as cancel_event:
+            error, resource_usage = run_governed(
+                current_app._get_current_object(), write_water_habit_analysis,
+                args=(dataset.file_path, bundle_path, font_path),
+                timeout=limits.get('timeout'), max_memory_mb=limits.get('max_memory_mb'),
+                cancel_event=cancel_event, progress_callback=_progress_publisher(job_id)
+            )
+    except JobConflictError as e:
+        _remove_file(bundle_path)
+        return jsonify({"msg": str(e)}), 409
+    except TaskCancelledError:
+        _remove_file(bundle_path)
+        publish_analysis_progress(job_id, 'cancelled')
+        return jsonify({"msg": "Analysis was cancelled.", "job_id": job_id}), 409
+    except Exception as e:
+        _remove_file(bundle_path)
+        publish_analysis_progress(job_id, 'failed', error=str(e))
+        current_app.logger.error(f"Failed to build the analysis bundle of dataset {dataset_id}: {str(e)}", exc_info=True)
+        return jsonify({"msg": "An unexpected error occurred during analysis.", "error": str(e)}), 500
+
+    if error:
+        _remove_file(bundle_path)
+        publish_analysis_progress(job_id, 'failed', error=error)
+        return jsonify({"msg": error}), 422
+
+    publish_analysis_progress(job_id, 'completed', progress=1.0)
+    current_app.logger.info(f"Analysis bundle {job_id} finished in {resource_usage.get('wall_time_s')}s.")
+    filename = f"{dataset.name}_analysis_results.zip"
+    response = Response(_iter_file(bundle_path), mimetype='application/zip')
+    response.headers['Content-Length'] = str(os.path.getsize(bundle_path))
+    response.headers['Content-Disposition'] = f"attachment; filename=\"analysis_results.zip\"; filename*=UTF-8''{quote(filename)}"
+    response.call_on_close(lambda: _remove_file(bundle_path))
+    return response
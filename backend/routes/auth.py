@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from ..extensions import db
 from ..models.user import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required
+from ..utils.decorators import get_current_user, role_claims
 import datetime
 import logging
 
@@ -10,8 +11,7 @@ auth_bp = Blueprint('auth', __name__)
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_me():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_current_user()
     if not user:
         return jsonify({"msg": "User not found"}), 404
     
@@ -75,7 +75,7 @@ def login():
     if user and user.check_password(password):
         user.last_login = datetime.datetime.now(datetime.timezone.utc)
         db.session.commit()
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=role_claims(user))
         logging.info(f"User '{username}' logged in successfully.")
         return jsonify(access_token=access_token)
 
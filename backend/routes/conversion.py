@@ -1,14 +1,23 @@
 import os
 from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta
 
 from ..extensions import db
 from ..models.dataset import Dataset
 from ..models.conversion import ConversionTask, ConvertedDataset
 from ..services.conversion_service import start_conversion_task
+from ..services.aggregate_service import remove_dataset_aggregate
+from ..utils.http_cache import make_etag, is_fresh, not_modified, cached_json
 
 conversion_bp = Blueprint('conversion', __name__)
 
+TASKS_PAGE_SIZE = 20
+TASKS_MAX_PAGE_SIZE = 100
+SINCE_OVERLAP = timedelta(seconds=5)
+
 @conversion_bp.route('/run/<string:dataset_id>', methods=['POST'])
 @jwt_required()
 def run_conversion(dataset_id):
@@ -28,9 +37,64 @@ def run_conversion(dataset_id):
 @conversion_bp.route('/tasks', methods=['GET'])
 @jwt_required()
 def get_conversion_tasks():
-    """Returns a list of all conversion tasks and their generated datasets."""
-    tasks = ConversionTask.query.order_by(ConversionTask.created_at.desc()).all()
-    return jsonify([task.to_dict() for task in tasks]), 200
+    """
+    Returns one page of conversion tasks, newest first, with their generated datasets.
+    Query params: page (default 1), per_page (default 20, at most 100), status.
+    Datasets are loaded for the whole page in one query, so the endpoint issues a fixed
+    number of queries regardless of page size or history.
+
+    With ``since`` (the 'since' value of a previous response), only tasks updated after that
+    point are returned, for cheap status polling. 'reset' is true when too many tasks changed
+    and the client should reload the list instead. Responses carry a list-level ETag, so
+    polling an unchanged list is answered with 304 after a single aggregate query.
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', TASKS_PAGE_SIZE, type=int)
+    if page < 1 or not 1 <= per_page <= TASKS_MAX_PAGE_SIZE:
+        return jsonify({"error": f"page must be >= 1 and per_page between 1 and {TASKS_MAX_PAGE_SIZE}"}), 400
+
+    since_arg = request.args.get('since')
+    since = None
+    if since_arg:
+        try:
+            since = datetime.fromisoformat(since_arg)
+        except ValueError:
+            return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+
+    query = ConversionTask.query
+    status = request.args.get('status')
+    if status:
+        query = query.filter(ConversionTask.status == status)
+
+    total, last_updated = query.with_entities(func.count(ConversionTask.id), func.max(ConversionTask.updated_at)).one()
+    cursor = last_updated.isoformat() if last_updated else None
+    etag = make_etag('conversion-tasks', total, cursor, page, per_page, status, since_arg)
+    if is_fresh(etag):
+        return not_modified(etag)
+
+    query = query.options(selectinload(ConversionTask.converted_datasets))
+    if since is not None:
+        # Overlap the window slightly: updated_at is stamped before commit, so a task committed
+        # just after the previous poll can carry an earlier timestamp. Clients merge by id.
+        changed = query.filter(ConversionTask.updated_at > since - SINCE_OVERLAP) \
+            .order_by(ConversionTask.updated_at.desc()).limit(TASKS_MAX_PAGE_SIZE + 1).all()
+        return cached_json({
+            "items": [task.to_dict() for task in changed[:TASKS_MAX_PAGE_SIZE]],
+            "total": total,
+            "since": cursor or since_arg,
+            "reset": len(changed) > TASKS_MAX_PAGE_SIZE
+        }, etag)
+
+    tasks = query.order_by(ConversionTask.created_at.desc(), ConversionTask.id.desc()) \
+        .offset((page - 1) * per_page).limit(per_page).all()
+
+    return cached_json({
+        "items": [task.to_dict() for task in tasks],
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "since": cursor
+    }, etag)
 
 @conversion_bp.route('/datasets/<string:dataset_id>', methods=['GET'])
 @jwt_required()
@@ -67,6 +131,9 @@ def delete_converted_dataset(dataset_id):
         # Delete the physical file
         if os.path.exists(dataset.file_path):
             os.remove(dataset.file_path)
+        remove_dataset_aggregate(dataset)
+        # Touch the parent task so pollers using ?since= see the change
+        dataset.task.updated_at = datetime.utcnow()
         
         # Delete the database record
         db.session.delete(dataset)
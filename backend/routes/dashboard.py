@@ -1,9 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
 from flask_jwt_extended import jwt_required
-from ..extensions import db
-from ..models.user import User
-from ..models.dataset import Dataset
-from ..models.conversion import ConversionTask
+from ..services.dashboard_stats import get_dashboard_stats
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -12,33 +9,12 @@ dashboard_bp = Blueprint('dashboard', __name__)
 def get_stats():
     """
     Provides key statistics for the dashboard.
+    Served from the materialized counters in dashboard_counters, so the cost does not grow
+    with the number of users, datasets or tasks.
     """
     try:
-        user_count = db.session.query(User.id).count()
-        dataset_count = db.session.query(Dataset.id).count()
-        task_count = db.session.query(ConversionTask.id).count()
-
-        tasks_by_status = db.session.query(ConversionTask.status, db.func.count(ConversionTask.status)).group_by(ConversionTask.status).all()
-        
-        status_counts = {
-            'pending': 0,
-            'processing': 0,
-            'completed': 0,
-            'failed': 0,
-        }
-        for status, count in tasks_by_status:
-            if status in status_counts:
-                status_counts[status] = count
-
-        stats = {
-            'users': user_count,
-            'datasets': dataset_count,
-            'total_tasks': task_count,
-            'tasks_by_status': status_counts
-        }
-        
-        return jsonify(stats)
+        return jsonify(get_dashboard_stats())
 
     except Exception as e:
-        # Log the exception e
-        return jsonify({"msg": "An error occurred while fetching dashboard stats"}), 500 
\ No newline at end of file
+        current_app.logger.error(f"Failed to fetch dashboard stats: {e}", exc_info=True)
+        return jsonify({"msg": "An error occurred while fetching dashboard stats"}), 500
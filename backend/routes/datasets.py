@@ -1,21 +1,60 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
 from ..models.dataset import Dataset
-from ..models.user import User
+from ..models.upload import UploadSession
+from ..utils.decorators import get_current_user, get_current_role
+from ..services.dataset_ingestion import (
+    profile_dataset, ensure_dataset_profile, read_dataset
+)
+from ..services.chunked_upload import (
+    create_upload, append_chunk, complete_upload, abort_upload, purge_stale_uploads, file_sha256,
+    UploadError, MIN_CHUNK_SIZE
+)
+from ..services.dataset_analysis import correlate_dataset, cluster_dataset, is_numeric_dtype
+from ..services.clustering_service import MAX_CLUSTERS
+from ..utils.validation import bounded_int
+from ..services.progress_events import publish_analysis_progress
+from ..core.task_runner import run_governed, get_task_limits, cancellable, JobConflictError, TaskCancelledError
 import os
 import uuid
-import pandas as pd
 import logging
 
 datasets_bp = Blueprint('datasets', __name__)
 
 ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx'}
+PREVIEW_DEFAULT_ROWS = 20
+PREVIEW_MAX_ROWS = 500
+CLUSTERING_MAX_BATCH_SIZE = 1_000_000
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _register_dataset(original_filename, unique_filename, content_hash):
+    """Creates the Dataset row for a file saved in the upload folder, detecting its format and profile."""
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+    new_dataset = Dataset(
+        id=str(uuid.uuid4()),
+        name=original_filename,
+        file_path=unique_filename, # Store unique name, not full path
+        file_size=os.path.getsize(file_path),
+        content_hash=content_hash,
+        user_id=get_jwt_identity()
+    )
+    try:
+        # One pass detects a CSV's encoding and delimiter and profiles it
+        profile_dataset(new_dataset, file_path)
+    except Exception as e:
+        # Keep the upload; the format and profile are computed again on first use.
+        logging.warning(f"Could not profile uploaded file '{original_filename}': {e}")
+    db.session.add(new_dataset)
+    db.session.commit()
+
+    current_user = get_current_user()
+    logging.info(f"User '{current_user.username}' uploaded dataset '{new_dataset.name}' (ID: {new_dataset.id})")
+    return new_dataset
+
 @datasets_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_file():
@@ -38,48 +77,123 @@ def upload_file():
         
         try:
             file.save(file_path)
-            file_size = os.path.getsize(file_path)
         except Exception as e:
             logging.error(f"Failed to save uploaded file: {e}")
             return jsonify({"msg": "Error saving file on server."}), 500
 
-        current_user_id = get_jwt_identity()
-        
-        new_dataset = Dataset(
-            id=str(uuid.uuid4()),
-            name=original_filename,
-            file_path=unique_filename, # Store unique name, not full path
-            file_size=file_size,
-            user_id=current_user_id
-        )
-        db.session.add(new_dataset)
-        db.session.commit()
-
-        current_user = User.query.get(current_user_id)
-        logging.info(f"User '{current_user.username}' uploaded dataset '{new_dataset.name}' (ID: {new_dataset.id})")
-
+        new_dataset = _register_dataset(original_filename, unique_filename, file_sha256(file_path).hexdigest())
         return jsonify(new_dataset.to_dict()), 201
     
     return jsonify({"msg": "File type not allowed"}), 400
 
+def _get_upload_session(upload_id):
+    return UploadSession.query.filter_by(id=upload_id, user_id=get_jwt_identity()).first()
+
+def _upload_error(e):
+    return jsonify({"msg": str(e), **e.details}), e.status
+
+@datasets_bp.route('/uploads', methods=['POST'])
+@jwt_required()
+def init_chunked_upload():
+    """
+    Starts a chunked upload for files too large for a single request.
+    Body: {"filename", "size", "chunk_size" (optional), "sha256" (optional, checked on completion)}.
+    The client then PUTs each chunk's raw bytes to /uploads/<upload_id>/chunks/<index>, in order,
+    and finishes with POST /uploads/<upload_id>/complete. After a disconnect, GET
+    /uploads/<upload_id> reports the received chunks to resume from.
+    """
+    data = request.get_json() or {}
+    filename = data.get('filename')
+    size = data.get('size')
+    max_chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+    chunk_size = data.get('chunk_size') or max_chunk_size
+
+    if not filename or not allowed_file(filename):
+        return jsonify({"msg": "File type not allowed"}), 400
+    if not isinstance(size, int) or not 0 < size <= current_app.config['UPLOAD_MAX_SIZE']:
+        return jsonify({"msg": f"size must be between 1 and {current_app.config['UPLOAD_MAX_SIZE']} bytes"}), 400
+    if not isinstance(chunk_size, int) or not MIN_CHUNK_SIZE <= chunk_size <= max_chunk_size:
+        return jsonify({"msg": f"chunk_size must be between {MIN_CHUNK_SIZE} and {max_chunk_size} bytes"}), 400
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    purge_stale_uploads(upload_folder, current_app.config['UPLOAD_SESSION_TTL_HOURS'])
+    upload = create_upload(get_jwt_identity(), filename, size, upload_folder, chunk_size, data.get('sha256'))
+    db.session.commit()
+    return jsonify(upload.to_dict()), 201
+
+@datasets_bp.route('/uploads/<string:upload_id>', methods=['GET'])
+@jwt_required()
+def get_chunked_upload(upload_id):
+    """Reports how many chunks of an upload have been stored, for resuming."""
+    upload = _get_upload_session(upload_id)
+    if not upload:
+        return jsonify({"msg": "Upload not found"}), 404
+    return jsonify(upload.to_dict())
+
+@datasets_bp.route('/uploads/<string:upload_id>/chunks/<int:index>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id, index):
+    """
+    Stores chunk ``index`` (0-based) from the raw request body. The body is streamed to disk,
+    so memory use does not depend on the chunk or file size.
+    """
+    upload = _get_upload_session(upload_id)
+    if not upload:
+        return jsonify({"msg": "Upload not found"}), 404
+    if request.content_length is None:
+        return jsonify({"msg": "Content-Length is required"}), 411
+
+    try:
+        stored = append_chunk(upload, index, request.stream, request.content_length, current_app.config['UPLOAD_FOLDER'])
+    except UploadError as e:
+        return _upload_error(e)
+    return jsonify({**upload.to_dict(), 'duplicate': not stored})
+
+@datasets_bp.route('/uploads/<string:upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_chunked_upload(upload_id):
+    """Verifies the assembled file and registers it as a Dataset."""
+    upload = _get_upload_session(upload_id)
+    if not upload:
+        return jsonify({"msg": "Upload not found"}), 404
+
+    original_filename = upload.filename
+    try:
+        unique_filename, digest = complete_upload(upload, current_app.config['UPLOAD_FOLDER'])
+    except UploadError as e:
+        db.session.commit()
+        return _upload_error(e)
+
+    new_dataset = _register_dataset(original_filename, unique_filename, digest)
+    return jsonify(new_dataset.to_dict()), 201
+
+@datasets_bp.route('/uploads/<string:upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_chunked_upload(upload_id):
+    """Cancels an upload and discards the chunks received so far."""
+    upload = _get_upload_session(upload_id)
+    if not upload:
+        return jsonify({"msg": "Upload not found"}), 404
+    abort_upload(upload, current_app.config['UPLOAD_FOLDER'])
+    db.session.commit()
+    return jsonify({"msg": "Upload cancelled"})
+
 @datasets_bp.route('/<string:dataset_id>/columns', methods=['GET'])
 @jwt_required()
 def get_dataset_columns(dataset_id):
+    """Returns the dataset's columns and their dtypes from the profile stored at upload."""
     dataset = Dataset.query.get_or_404(dataset_id)
     
     try:
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], dataset.file_path)
         file_ext = os.path.splitext(dataset.name)[1].lower()
-
-        if file_ext == '.csv':
-            df = pd.read_csv(file_path)
-        elif file_ext in ['.xls', '.xlsx']:
-            df = pd.read_excel(file_path)
-        else:
+        if file_ext != '.csv' and file_ext not in ['.xls', '.xlsx']:
             return jsonify({"msg": "Unsupported file type for reading columns."}), 400
-            
-        columns = df.columns.tolist()
-        return jsonify({'columns': columns})
+
+        profile, changed = ensure_dataset_profile(dataset, current_app.config['UPLOAD_FOLDER'])
+        if changed:
+            db.session.commit()
+
+        return jsonify({'columns': profile['columns'], 'dtypes': profile['dtypes']})
 
     except FileNotFoundError:
         return jsonify({"msg": "Dataset file not found on server."}), 404
@@ -87,13 +201,165 @@ def get_dataset_columns(dataset_id):
         logging.error(f"Error reading columns from dataset {dataset_id}: {e}")
         return jsonify({"msg": "Could not process the dataset file."}), 500
 
+@datasets_bp.route('/<string:dataset_id>/preview', methods=['GET'])
+@jwt_required()
+def preview_dataset(dataset_id):
+    """
+    Returns the first rows of a dataset. Query params: rows (default 20, at most 500) and,
+    for Excel files, sheet (name, default the first sheet).
+    Only the requested rows are parsed, using the format and row count stored at upload.
+    """
+    dataset = Dataset.query.get_or_404(dataset_id)
+    rows = request.args.get('rows', PREVIEW_DEFAULT_ROWS, type=int)
+    if not 1 <= rows <= PREVIEW_MAX_ROWS:
+        return jsonify({"msg": f"rows must be between 1 and {PREVIEW_MAX_ROWS}"}), 400
+
+    try:
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        profile, changed = ensure_dataset_profile(dataset, upload_folder)
+        if changed:
+            db.session.commit()
+
+        read_kwargs = {'nrows': rows}
+        total_rows = profile['row_count']
+        sheet = request.args.get('sheet')
+        if sheet is not None:
+            sheets = {s['name']: s for s in profile.get('sheets', [])}
+            if sheet not in sheets:
+                return jsonify({"msg": f"Sheet '{sheet}' not found in dataset."}), 404
+            read_kwargs['sheet_name'] = sheet
+            total_rows = max(sheets[sheet]['rows'] - 1, 0)
+
+        df = read_dataset(dataset, upload_folder, **read_kwargs)
+        # NaN/NaT are not valid JSON
+        df = df.astype(object).where(df.notna(), None)
+        return jsonify({
+            'columns': [str(c) for c in df.columns],
+            'data': df.to_dict(orient='records'),
+            'totalRows': total_rows,
+            'sampleRows': len(df)
+        })
+
+    except FileNotFoundError:
+        return jsonify({"msg": "Dataset file not found on server."}), 404
+    except Exception as e:
+        logging.error(f"Error previewing dataset {dataset_id}: {e}")
+        return jsonify({"msg": "Could not process the dataset file."}), 500
+
+def _numeric_columns(dataset, requested):
+    """
+    The columns a correlation or clustering job runs on: ``requested`` (a list of column names)
+    or, if empty, every numeric column of the dataset's stored profile.
+    Returns (columns, error message); columns is None when the request is invalid.
+    """
+    profile, changed = ensure_dataset_profile(dataset, current_app.config['UPLOAD_FOLDER'])
+    if changed:
+        db.session.commit()
+    dtypes = profile['dtypes']
+    if not requested:
+        return [column for column, dtype in dtypes.items() if is_numeric_dtype(dtype)], None
+    if not isinstance(requested, list) or not all(isinstance(column, str) for column in requested):
+        return None, "'columns' must be a list of column names."
+    missing = [column for column in requested if column not in dtypes]
+    if missing:
+        return None, f"The following specified columns were not found in the dataset: {', '.join(missing)}"
+    non_numeric = [column for column in requested if not is_numeric_dtype(dtypes[column])]
+    if non_numeric:
+        return None, f"The following specified columns are not numeric: {', '.join(non_numeric)}"
+    return list(dict.fromkeys(requested)), None
+
+def _run_dataset_job(task_type, target, args, job_id, **extra):
+    """
+    Runs ``target(*args)`` in a resource-limited child process with the limits of ``task_type``,
+    publishing its progress for ``job_id``; POST /api/analysis/jobs/<job_id>/cancel stops it.
+    Returns the JSON response of the job: its result plus ``extra`` fields.
+    """
+    limits = get_task_limits(current_app.config, task_type)
+    publish_analysis_progress(job_id, 'running', task_type=task_type, stage='start', progress=0.0)
+    try:
+        with cancellable(job_id) as cancel_event:
+            result, resource_usage = run_governed(
+                current_app._get_current_object(), target, args=args,
+                timeout=limits.get('timeout'), max_memory_mb=limits.get('max_memory_mb'), cancel_event=cancel_event,
+                progress_callback=lambda stage, progress: publish_analysis_progress(job_id, 'running', stage=stage, progress=progress)
+            )
+    except JobConflictError as e:
+        return jsonify({"msg": str(e)}), 409
+    except TaskCancelledError:
+        publish_analysis_progress(job_id, 'cancelled', task_type=task_type)
+        return jsonify({"msg": "Analysis was cancelled.", "job_id": job_id}), 409
+    except Exception as e:
+        publish_analysis_progress(job_id, 'failed', task_type=task_type, error=str(e))
+        logging.error(f"{task_type} job {job_id} failed: {e}", exc_info=True)
+        return jsonify({"msg": "An unexpected error occurred during analysis.", "error": str(e)}), 500
+
+    publish_analysis_progress(job_id, 'completed', task_type=task_type, progress=1.0)
+    return jsonify(dict(result, job_id=job_id, resource_usage=resource_usage, **extra))
+
+@datasets_bp.route('/<string:dataset_id>/correlation', methods=['POST'])
+@jwt_required()
+def correlate_dataset_columns(dataset_id):
+    """
+    Computes the Pearson correlation matrix of a dataset in a resource-limited child process
+    (limits of 'correlation_analysis'). Optional JSON body: columns (default every numeric
+    column), streaming (read CSVs in chunks; large CSVs always are), job_id.
+    """
+    dataset = Dataset.query.get_or_404(dataset_id)
+    params = request.get_json(silent=True) or {}
+    try:
+        columns, error = _numeric_columns(dataset, params.get('columns'))
+    except FileNotFoundError:
+        return jsonify({"msg": "Dataset file not found on server."}), 404
+    if error:
+        return jsonify({"msg": error}), 400
+    if len(columns) < 2:
+        return jsonify({"msg": "Correlation analysis requires at least two numeric columns."}), 400
+
+    job_id = params.get('job_id') or str(uuid.uuid4())
+    return _run_dataset_job(
+        'correlation_analysis', correlate_dataset, (dataset.id, columns, bool(params.get('streaming'))), job_id
+    )
+
+@datasets_bp.route('/<string:dataset_id>/clustering', methods=['POST'])
+@jwt_required()
+def cluster_dataset_rows(dataset_id):
+    """
+    Clusters the rows of a dataset in a resource-limited child process (limits of 'clustering').
+    Optional JSON body: columns (default every numeric column), n_clusters (default 3),
+    minibatch (default: automatic for large inputs), batch_size, job_id.
+    Returns centroids and counts; per-row labels are served from labels_url page by page.
+    """
+    dataset = Dataset.query.get_or_404(dataset_id)
+    params = request.get_json(silent=True) or {}
+    try:
+        columns, error = _numeric_columns(dataset, params.get('columns'))
+    except FileNotFoundError:
+        return jsonify({"msg": "Dataset file not found on server."}), 404
+    if error:
+        return jsonify({"msg": error}), 400
+    if not columns:
+        return jsonify({"msg": "Clustering requires at least one numeric column."}), 400
+    try:
+        n_clusters = bounded_int(params.get('n_clusters', 3), 'n_clusters', 2, MAX_CLUSTERS)
+        batch_size = bounded_int(params.get('batch_size', 4096), 'batch_size', 1, CLUSTERING_MAX_BATCH_SIZE)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    minibatch = params.get('minibatch')
+    if minibatch is not None and not isinstance(minibatch, bool):
+        return jsonify({"msg": "'minibatch' must be true, false or null."}), 400
+
+    job_id = params.get('job_id') or str(uuid.uuid4())
+    return _run_dataset_job(
+        'clustering', cluster_dataset, (dataset.id, job_id, columns, n_clusters, minibatch, batch_size), job_id,
+        labels_url=url_for('analysis.get_cluster_labels', job_id=job_id)
+    )
+
 @datasets_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_datasets():
     current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
 
-    if current_user and current_user.role == 'admin':
+    if get_current_role() == 'admin':
         # Admin gets to see all datasets
         datasets = Dataset.query.order_by(Dataset.created_at.desc()).all()
     else:
@@ -0,0 +1,122 @@
+import time
+import threading
+
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import verify_jwt_in_request
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+from ..models.user import User
+from ..services.progress_events import broker
+from ..utils.decorators import token_required
+
+events_bp = Blueprint('events', __name__)
+
+TOPICS = {'conversion', 'analysis', 'weather'}
+# Comment lines keep proxies and browsers from closing an idle stream.
+HEARTBEAT_SECONDS = 15
+STREAM_TOKEN_SALT = 'events-stream'
+
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
+def _token_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=STREAM_TOKEN_SALT)
+
+def _acquire_stream_slot():
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= current_app.config.get('EVENTS_MAX_STREAMS', 8):
+            return False
+        _open_streams += 1
+        return True
+
+def _release_stream_slot():
+    global _open_streams
+    with _open_streams_lock:
+        _open_streams -= 1
+
+def _stream_user_authorized():
+    """
+    True when the request carries an access token in the Authorization header or a valid,
+    unexpired stream token as ?token=.
+    """
+    token = request.args.get('token')
+    if token is None:
+        verify_jwt_in_request()
+        return True
+    try:
+        user_id = _token_serializer().loads(token, max_age=current_app.config.get('EVENTS_TOKEN_MAX_AGE', 60))
+    except (BadSignature, SignatureExpired):
+        return False
+    user = User.query.get(user_id)
+    return user is not None and user.is_active
+
+@events_bp.route('/token', methods=['POST'])
+@token_required
+def create_stream_token(current_user):
+    """
+    Issues a short-lived token that only opens /api/events/stream. EventSource cannot set
+    headers, and a token in the URL ends up in access logs, so the regular access token is
+    never accepted there.
+    """
+    max_age = current_app.config.get('EVENTS_TOKEN_MAX_AGE', 60)
+    return jsonify({"token": _token_serializer().dumps(current_user.id), "expires_in": max_age})
+
+@events_bp.route('/stream', methods=['GET'])
+def stream_events():
+    """
+    Server-sent events stream of conversion, analysis and weather backfill progress.
+    Authenticate with the Authorization header or ?token=<token from POST /api/events/token>.
+    Query params: topics (comma-separated, default all), task_id (only events of that task).
+
+    Each open stream holds a server thread, so at most EVENTS_MAX_STREAMS are served at once
+    (further requests get 503) and a stream ends after EVENTS_STREAM_MAX_SECONDS. Clients
+    reconnect, with a fresh stream token when using ?token=, and resume from the
+    Last-Event-ID header.
+    """
+    if not _stream_user_authorized():
+        return jsonify({"msg": "Invalid or expired stream token"}), 401
+
+    topics = {t for t in request.args.get('topics', '').split(',') if t} or TOPICS
+    unknown = topics - TOPICS
+    if unknown:
+        return jsonify({"msg": f"Unknown topics: {', '.join(sorted(unknown))}"}), 400
+    task_id = request.args.get('task_id')
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+
+    if not _acquire_stream_slot():
+        response = jsonify({"msg": "Too many open event streams, retry later"})
+        response.headers['Retry-After'] = str(HEARTBEAT_SECONDS)
+        return response, 503
+
+    try:
+        subscription = broker.subscribe(topics, last_event_id=last_event_id)
+    except Exception:
+        _release_stream_slot()
+        raise
+    deadline = time.monotonic() + current_app.config.get('EVENTS_STREAM_MAX_SECONDS', 300)
+
+    def generate():
+        # Sets the client's reconnect delay.
+        yield "retry: 3000\n\n"
+        while not subscription.overflowed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = subscription.get(timeout=min(HEARTBEAT_SECONDS, remaining))
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif task_id is None or str(event.data.get('task_id')) == task_id:
+                yield event.to_sse()
+
+    def close():
+        subscription.close()
+        _release_stream_slot()
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    # Runs when the server closes the response, whether or not the stream was ever read.
+    response.call_on_close(close)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
 from ..models.user import User
+from ..utils.decorators import get_current_user
 
 user_bp = Blueprint('user', __name__)
 
@@ -11,8 +12,7 @@ def get_profile():
     """
     Gets the profile information of the currently logged-in user.
     """
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = get_current_user()
 
     if not user:
         return jsonify({"msg": "User not found"}), 404
@@ -32,7 +32,7 @@ def update_profile():
     Updates the profile information of the currently logged-in user.
     """
     current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = get_current_user()
 
     if not user:
         return jsonify({"msg": "User not found"}), 404
@@ -62,8 +62,7 @@ def change_password():
     """
     Changes the password for the currently logged-in user.
     """
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = get_current_user()
 
     if not user:
         return jsonify({"msg": "User not found"}), 404
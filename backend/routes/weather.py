@@ -1,15 +1,16 @@
-import requests
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime, date, time, timedelta
 import logging
+import uuid
 
-from ..config import Config
-from ..utils.decorators import token_required
+from ..services.weather_client import get_weather_client, WeatherAPIError
+from ..services.weather_history import query_history, start_backfill_job
+from ..utils.decorators import token_required, admin_required
 
 weather_bp = Blueprint('weather', __name__, url_prefix='/api/weather')
 
-# Weather API URLs from APISpace
-HOURLY_WEATHER_URL = "https://eolink.o.apispace.com/456456/weather/v001/hour"
-CITY_SEARCH_URL = "https://eolink.o.apispace.com/456456/function/v001/city"
+MAX_FORECAST_HOURS = 168
+MAX_HISTORY_RANGE = timedelta(days=366)
 
 
 @weather_bp.route('/search', methods=['GET'])
@@ -19,75 +20,96 @@ def search_city(current_user):
     if not city_name:
         return jsonify({"error": "City parameter is required"}), 400
 
-    logging.info(f"--- Attempting to search for city: {city_name} ---")
-
     try:
-        headers = {
-            "X-APISpace-Token": Config.API_SPACES_API_KEY
-        }
-        params = {
-            "location": city_name,
-            "area": "china",
-            "items": 10
-        }
-        
-        logging.info(f"Requesting URL: {CITY_SEARCH_URL} with params: {params}")
-        response = requests.get(CITY_SEARCH_URL, headers=headers, params=params)
-        logging.info(f"External API response status: {response.status_code}")
-        logging.info(f"External API response body: {response.text}")
+        return jsonify(get_weather_client().search_city(city_name))
+    except WeatherAPIError as e:
+        logging.error(f"City search for '{city_name}' failed: {e}")
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        logging.error(f"An unexpected error occurred in search_city: {e}", exc_info=True)
+        return jsonify({"error": "An internal server error occurred"}), 500
 
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        data = response.json()
 
-        if data.get("status") == 0 and "areaList" in data:
-            logging.info("City search successful, returning area list.")
-            return jsonify(data["areaList"])
-        else:
-            # Look for potential error messages from the API
-            error_message = data.get("message", "Failed to find city.")
-            logging.error(f"External API returned a logical error: {error_message}")
-            return jsonify({"error": error_message}), 500
+@weather_bp.route('/hourly', methods=['GET'])
+@token_required
+def get_hourly_weather(current_user):
+    areacode = request.args.get('areacode')
+    hours = request.args.get('hours', 24, type=int)  # Default to 24 hours
+    if not areacode:
+        return jsonify({"error": "areacode parameter is required"}), 400
+    if hours is None or not 1 <= hours <= MAX_FORECAST_HOURS:
+        return jsonify({"error": f"hours must be between 1 and {MAX_FORECAST_HOURS}"}), 400
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Exception during request to external weather API: {e}")
-        return jsonify({"error": f"Error calling weather API: {e}"}), 502
+    try:
+        return jsonify(get_weather_client().hourly(areacode, hours))
+    except WeatherAPIError as e:
+        logging.error(f"Hourly weather for area {areacode} failed: {e}")
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        logging.error(f"An unexpected error occurred in search_city: {e}")
+        logging.error(f"An unexpected error occurred in get_hourly_weather: {e}", exc_info=True)
         return jsonify({"error": "An internal server error occurred"}), 500
 
 
-@weather_bp.route('/hourly', methods=['GET'])
+@weather_bp.route('/history', methods=['GET'])
 @token_required
-def get_hourly_weather(current_user):
+def get_weather_history(current_user):
+    """
+    Returns stored hourly weather of an areacode from the local store, oldest first.
+    Query params: areacode, start and end (ISO 8601, area-local time; end exclusive,
+    default now and start default 7 days before end). The upstream API is not called.
+    """
     areacode = request.args.get('areacode')
-    hours = request.args.get('hours', 24)  # Default to 24 hours
     if not areacode:
         return jsonify({"error": "areacode parameter is required"}), 400
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO 8601 timestamps"}), 400
+    if not start < end or end - start > MAX_HISTORY_RANGE:
+        return jsonify({"error": f"start must be before end, at most {MAX_HISTORY_RANGE.days} days apart"}), 400
 
-    headers = {
-        "X-APISpace-Token": Config.API_SPACES_API_KEY
-    }
-    params = {
+    records = query_history(areacode, start, end)
+    return jsonify({
         "areacode": areacode,
-        "hours": hours
-    }
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "hours": [record.to_dict() for record in records]
+    })
+
 
+@weather_bp.route('/history/backfill', methods=['POST'])
+@admin_required()
+def backfill_weather_history():
+    """
+    Starts a background job filling observed hourly weather of the given areacodes into the
+    local store from the weather archive. Only hours missing from the store are fetched.
+    Body: {"areacodes": [...], "start": ISO date, "end": ISO date (exclusive)}; end defaults
+    to today and start to 7 days before end. Every areacode needs coordinates in
+    WEATHER_AREA_COORDINATES. Progress is published on the 'weather' topic of
+    /api/events/stream under the returned job_id.
+    """
+    data = request.get_json() or {}
+    areacodes = data.get('areacodes') or current_app.config.get('WEATHER_AREACODES') or []
+    max_areacodes = current_app.config.get('WEATHER_BACKFILL_MAX_AREACODES', 200)
+    if not isinstance(areacodes, list) or not areacodes or not all(isinstance(a, str) and a for a in areacodes):
+        return jsonify({"error": "areacodes must be a non-empty list of strings"}), 400
+    if len(areacodes) > max_areacodes:
+        return jsonify({"error": f"At most {max_areacodes} areacodes per backfill"}), 400
+    coordinates = current_app.config.get('WEATHER_AREA_COORDINATES') or {}
+    unknown = sorted(set(areacodes) - set(coordinates))
+    if unknown:
+        return jsonify({"error": f"No coordinates configured in WEATHER_AREA_COORDINATES for: {', '.join(unknown)}"}), 400
     try:
-        response = requests.get(HOURLY_WEATHER_URL, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Check if the API call was successful and the 'result' key exists
-        if data.get("status") == 0 and "result" in data:
-            return jsonify(data["result"])
-        else:
-            # Forward the error from the external API if possible
-            error_message = data.get("message", "Failed to fetch weather data from external source.")
-            return jsonify({"error": error_message}), 500
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling hourly weather API: {e}")
-        return jsonify({"error": "Failed to fetch weather data"}), 502
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return jsonify({"error": "An internal server error occurred"}), 500
\ No newline at end of file
+        end = datetime.fromisoformat(data['end']) if data.get('end') else datetime.combine(date.today(), time.min)
+        start = datetime.fromisoformat(data['start']) if data.get('start') else end - timedelta(days=7)
+    except (TypeError, ValueError):
+        return jsonify({"error": "start and end must be ISO 8601 dates"}), 400
+    if not start < end or end - start > MAX_HISTORY_RANGE:
+        return jsonify({"error": f"start must be before end, at most {MAX_HISTORY_RANGE.days} days apart"}), 400
+
+    job_id = str(uuid.uuid4())
+    start_backfill_job(areacodes, start, end, job_id)
+    return jsonify({
+        "job_id": job_id, "areacodes": len(set(areacodes)), "start": start.isoformat(), "end": end.isoformat()
+    }), 202
@@ -0,0 +1,139 @@
+import os
+import uuid
+import logging
+import threading
+from flask import current_app
+
+from ..extensions import db
+from ..models.aggregate import BuildingAggregate
+from .usage_aggregate import UsageAggregate, read_usage_csv
+
+# Conversion tasks run in background threads; serialize read-modify-write of aggregate files.
+_aggregate_lock = threading.Lock()
+
+def get_aggregates_folder(kind='buildings'):
+    """Returns (and creates) the folder holding persisted aggregates of the given kind ('buildings' or 'datasets')."""
+    project_root = os.path.abspath(os.path.join(current_app.root_path, '..'))
+    folder = os.path.join(project_root, 'aggregates', kind)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def _dataset_building_name(converted_dataset):
+    return converted_dataset.name.replace('_水流量数据', '')
+
+def build_dataset_aggregate(converted_dataset, df=None):
+    """
+    Computes the partial aggregate of one ConvertedDataset and persists it next to the other
+    cached partials. The dataset must already have an ID; the caller commits the session.
+    """
+    if df is None:
+        df = read_usage_csv(converted_dataset.file_path)
+    aggregate = UsageAggregate.from_frame(df, _dataset_building_name(converted_dataset))
+    aggregate_path = os.path.join(get_aggregates_folder('datasets'), f"{converted_dataset.id}.npz")
+    aggregate.save(aggregate_path)
+    converted_dataset.aggregate_path = aggregate_path
+    return aggregate
+
+def load_dataset_aggregates(converted_datasets):
+    """
+    Returns the cached partial aggregates of the given ConvertedDatasets. Partials that are
+    missing (e.g. datasets converted before caching existed) are computed once and persisted;
+    the caller commits the session to keep their paths.
+    """
+    aggregates = []
+    for converted_dataset in converted_datasets:
+        if converted_dataset.aggregate_path and os.path.exists(converted_dataset.aggregate_path):
+            aggregates.append(UsageAggregate.load(converted_dataset.aggregate_path))
+        else:
+            logging.info(f"No cached aggregate for converted dataset {converted_dataset.id}, computing it from CSV.")
+            aggregates.append(build_dataset_aggregate(converted_dataset))
+    return aggregates
+
+def remove_dataset_aggregate(converted_dataset):
+    """Deletes the cached partial aggregate file of a ConvertedDataset, if any."""
+    if converted_dataset.aggregate_path and os.path.exists(converted_dataset.aggregate_path):
+        os.remove(converted_dataset.aggregate_path)
+
+def update_building_aggregate(building, csv_path, task_id=None, df=None):
+    """
+    Merges a newly converted building CSV into the building's persisted aggregate and commits
+    the session. Only the new CSV is read, and rows for (date, hour) cells already covered by
+    the aggregate are skipped, so the cost is proportional to the new data rather than the
+    full history.
+
+    The lock is held until the commit, so concurrent conversions of the same building neither
+    insert duplicate rows nor merge into a stale aggregate. Each update is written to a new file
+    once the row has been flushed; the previous file is removed after the commit and the new
+    one if anything fails, so no aggregate file is left without a row pointing to it.
+
+    Pass ``df`` when the CSV has already been read to avoid reading it again.
+
+    Returns:
+        int: Number of records added to the aggregate.
+    """
+    if df is None:
+        df = read_usage_csv(csv_path)
+
+    with _aggregate_lock:
+        record = BuildingAggregate.query.filter_by(building=building).first()
+        skipped = 0
+        if record and os.path.exists(record.file_path):
+            aggregate, added, skipped = UsageAggregate.load(record.file_path).append_frame(df)
+        else:
+            aggregate = UsageAggregate.from_frame(df, building)
+            added = aggregate.total_count
+
+        old_path = record.file_path if record else None
+        new_path = None
+        if record is None or added or not os.path.exists(record.file_path):
+            new_path = os.path.join(get_aggregates_folder(), f"{uuid.uuid4()}.npz")
+
+        try:
+            with db.session.begin_nested():
+                if record is None:
+                    record = BuildingAggregate(building=building, file_path=new_path)
+                    db.session.add(record)
+                elif new_path:
+                    record.file_path = new_path
+                record.row_count = aggregate.total_count
+                record.start_date = aggregate.start_date.date() if aggregate.start_date is not None else None
+                record.end_date = aggregate.end_date.date() if aggregate.end_date is not None else None
+                if task_id is not None:
+                    record.last_task_id = task_id
+                db.session.flush()
+                if new_path:
+                    aggregate.save(new_path)
+        except Exception:
+            if new_path and os.path.exists(new_path):
+                os.remove(new_path)
+            raise
+
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            if new_path and os.path.exists(new_path):
+                os.remove(new_path)
+            raise
+
+        if new_path and old_path and os.path.exists(old_path):
+            os.remove(old_path)
+
+    if skipped:
+        logging.warning(f"Building aggregate '{building}': skipped {skipped} rows of {csv_path} for hours already aggregated.")
+    logging.info(f"Building aggregate '{building}' updated with {added} new records from {csv_path}.")
+    return added
+
+def load_building_aggregates(buildings):
+    """
+    Loads persisted aggregates for the given building names.
+
+    Returns:
+        tuple[list[UsageAggregate], list[BuildingAggregate], list[str]]:
+            (aggregates, matching records, building names without a stored aggregate)
+    """
+    records = BuildingAggregate.query.filter(BuildingAggregate.building.in_(buildings)).all()
+    found = {r.building: r for r in records if os.path.exists(r.file_path)}
+    missing = [b for b in buildings if b not in found]
+    aggregates = [UsageAggregate.load(r.file_path) for r in found.values()]
+    return aggregates, list(found.values()), missing
@@ -0,0 +1,175 @@
+import os
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from ..extensions import db
+from ..models.upload import UploadSession
+
+# Chunks are streamed from the request to disk in blocks of this size.
+STREAM_BLOCK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+PARTIAL_FOLDER = '.partial'
+
+# Running SHA-256 of each upload as (hasher, bytes hashed). Lost on restart, in which case
+# the partial file is hashed once more before the next chunk is appended.
+_hashers = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+class UploadError(Exception):
+    """A chunked upload request that cannot be applied; ``status`` is the HTTP status to return."""
+    status = 400
+
+    def __init__(self, msg, **details):
+        super().__init__(msg)
+        self.details = details
+
+class ChunkOutOfOrder(UploadError):
+    status = 409
+
+def _lock_for(upload_id):
+    with _locks_guard:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+def _forget(upload_id):
+    with _locks_guard:
+        _locks.pop(upload_id, None)
+    _hashers.pop(upload_id, None)
+
+def partial_path(upload, upload_folder):
+    return os.path.join(upload_folder, PARTIAL_FOLDER, f'{upload.id}.part')
+
+def file_sha256(file_path, length=None):
+    """SHA-256 of a file, or of its first ``length`` bytes, read in blocks."""
+    hasher = hashlib.sha256()
+    remaining = length
+    with open(file_path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(STREAM_BLOCK_SIZE if remaining is None else min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return hasher
+
+def _running_hasher(upload, path):
+    state = _hashers.get(upload.id)
+    if state is None or state[1] != upload.received_size:
+        state = (file_sha256(path, upload.received_size), upload.received_size)
+        _hashers[upload.id] = state
+    return state[0]
+
+def create_upload(user_id, filename, total_size, upload_folder, chunk_size, expected_sha256=None):
+    """Registers a chunked upload and creates its empty partial file. The caller commits."""
+    upload = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        filename=filename,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        received_size=0,
+        expected_sha256=expected_sha256.lower() if expected_sha256 else None
+    )
+    path = partial_path(upload, upload_folder)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    _hashers[upload.id] = (hashlib.sha256(), 0)
+    db.session.add(upload)
+    return upload
+
+def append_chunk(upload, index, stream, length, upload_folder):
+    """
+    Streams chunk ``index`` from ``stream`` onto the end of the partial file, updating the
+    running hash. Chunks must arrive in order; re-sending an already stored chunk is a no-op,
+    so clients can retry after a dropped connection. Commits the session.
+
+    Returns:
+        bool: False if the chunk had already been received.
+    """
+    with _lock_for(upload.id):
+        # Another request may have stored chunks since this one loaded the row.
+        db.session.refresh(upload)
+        expected = upload.received_chunks
+        if index < expected:
+            return False
+        if index > expected or index >= upload.total_chunks:
+            raise ChunkOutOfOrder(f"Expected chunk {expected}, got {index}", expected_chunk=expected)
+
+        expected_length = min(upload.chunk_size, upload.total_size - upload.received_size)
+        if length != expected_length:
+            raise UploadError(f"Chunk {index} must be {expected_length} bytes, got {length}")
+
+        path = partial_path(upload, upload_folder)
+        if not os.path.exists(path):
+            raise UploadError("Upload data is missing on the server; start a new upload", expected_chunk=0)
+
+        hasher = _running_hasher(upload, path).copy()
+        written = 0
+        with open(path, 'r+b') as f:
+            f.seek(upload.received_size)
+            # Drops the tail of an earlier, interrupted attempt at this chunk.
+            f.truncate()
+            while written < length:
+                block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                written += len(block)
+            if written != length:
+                f.truncate(upload.received_size)
+                raise UploadError(f"Chunk {index} ended after {written} of {length} bytes", expected_chunk=index)
+
+        upload.received_size += length
+        db.session.commit()
+        _hashers[upload.id] = (hasher, upload.received_size)
+        return True
+
+def complete_upload(upload, upload_folder):
+    """
+    Verifies a fully received upload and moves it into the upload folder under a unique name.
+    Deletes the upload session (the caller commits).
+
+    Returns:
+        tuple[str, str]: (unique filename, SHA-256 hex digest)
+    """
+    with _lock_for(upload.id):
+        db.session.refresh(upload)
+        if upload.received_size < upload.total_size:
+            raise ChunkOutOfOrder(
+                f"Upload incomplete: {upload.received_chunks} of {upload.total_chunks} chunks received",
+                expected_chunk=upload.received_chunks
+            )
+        path = partial_path(upload, upload_folder)
+        digest = _running_hasher(upload, path).hexdigest()
+        if upload.expected_sha256 and digest != upload.expected_sha256:
+            abort_upload(upload, upload_folder)
+            raise UploadError("Checksum mismatch; the upload has been discarded", sha256=digest)
+
+        unique_filename = str(uuid.uuid4()) + os.path.splitext(upload.filename)[1]
+        os.replace(path, os.path.join(upload_folder, unique_filename))
+        db.session.delete(upload)
+    _forget(upload.id)
+    return unique_filename, digest
+
+def abort_upload(upload, upload_folder):
+    """Discards an upload's partial file and session row (the caller commits)."""
+    path = partial_path(upload, upload_folder)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.delete(upload)
+    _forget(upload.id)
+
+def purge_stale_uploads(upload_folder, ttl_hours):
+    """Discards uploads that have not received a chunk within ``ttl_hours`` (the caller commits)."""
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in stale:
+        abort_upload(upload, upload_folder)
+    if stale:
+        logging.info(f"Discarded {len(stale)} stale chunked uploads.")
+    return len(stale)
@@ -0,0 +1,83 @@
+import os
+import logging
+import numpy as np
+from flask import current_app
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+MAX_CLUSTERS = 50
+MAX_LABELS_PAGE = 10000
+
+def get_cluster_labels_path(task_id):
+    """Path of the label array written for a clustering job (or worker task)."""
+    folder = os.path.join(current_app.config['GENERATED_FILES_FOLDER'], 'clustering')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{os.path.basename(str(task_id))}_labels.npy")
+
+def run_clustering(df, columns, n_clusters=3, minibatch=None, batch_size=4096, random_state=42):
+    """
+    Clusters the rows of ``df`` on ``columns``.
+
+    MiniBatchKMeans is used when ``minibatch`` is set, or automatically for inputs larger than
+    CLUSTERING_MINIBATCH_THRESHOLD rows. Rows with missing values are not clustered and get label -1.
+
+    Returns:
+        tuple[np.ndarray, dict]: (int32 label per row, summary with centroids in original units and counts)
+    """
+    if not 2 <= n_clusters <= MAX_CLUSTERS:
+        raise ValueError(f"n_clusters must be between 2 and {MAX_CLUSTERS}.")
+
+    values = df[columns].to_numpy(dtype=np.float64)
+    complete = ~np.isnan(values).any(axis=1)
+    if complete.sum() < n_clusters:
+        raise ValueError("Not enough complete rows to form the requested number of clusters.")
+
+    if minibatch is None:
+        minibatch = len(values) > current_app.config.get('CLUSTERING_MINIBATCH_THRESHOLD', 100000)
+
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(values[complete])
+    if minibatch:
+        model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state, n_init='auto')
+    else:
+        model = KMeans(n_clusters=n_clusters, random_state=random_state, n_init='auto')
+    fitted_labels = model.fit_predict(scaled)
+
+    labels = np.full(len(values), -1, dtype=np.int32)
+    labels[complete] = fitted_labels
+    centroids = scaler.inverse_transform(model.cluster_centers_)
+    counts = np.bincount(fitted_labels, minlength=n_clusters)
+
+    summary = {
+        "algorithm": "MiniBatchKMeans" if minibatch else "KMeans",
+        "n_clusters": n_clusters,
+        "columns": list(columns),
+        "n_rows": int(len(values)),
+        "n_unlabeled": int((~complete).sum()),
+        "inertia": float(model.inertia_),
+        "centroids": [dict(zip(columns, map(float, center))) for center in centroids],
+        "counts": counts.tolist(),
+    }
+    logging.info(f"Clustered {complete.sum()} rows into {n_clusters} clusters with {summary['algorithm']}.")
+    return labels, summary
+
+def save_cluster_labels(task_id, labels):
+    """Writes the label array next to other generated files and returns its path."""
+    path = get_cluster_labels_path(task_id)
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, labels)
+    os.replace(tmp_path, path)
+    return path
+
+def load_cluster_labels_page(task_id, offset=0, limit=1000):
+    """
+    Reads one page of a clustering job's labels without loading the whole array.
+
+    Returns:
+        tuple[int, list[int]] | None: (total number of labels, labels in the page), or None if missing.
+    """
+    path = get_cluster_labels_path(task_id)
+    if not os.path.exists(path):
+        return None
+    labels = np.load(path, mmap_mode='r')
+    return len(labels), labels[offset:offset + limit].tolist()
@@ -1,12 +1,16 @@
 import os
 import sys
 import logging
+import uuid
 import threading
 from flask import current_app
 
 from ..extensions import db
 from ..models.conversion import ConversionTask, ConvertedDataset
 from ..data_extractor import extract_water_flow_data
+from .aggregate_service import update_building_aggregate, build_dataset_aggregate, remove_dataset_aggregate
+from .usage_aggregate import read_usage_csv
+from .progress_events import publish_conversion_progress
 
 def run_conversion_in_thread(app, task_id):
     """Worker function to run in a background thread."""
@@ -21,6 +25,7 @@ def run_conversion_in_thread(app, task_id):
             logging.error(f"Original dataset not found for ConversionTask {task_id}")
             task.status = 'failed'
             db.session.commit()
+            publish_conversion_progress(task, error="Original dataset not found")
             return
         
         # Define paths
@@ -37,6 +42,7 @@ def run_conversion_in_thread(app, task_id):
             
             task.status = 'processing'
             db.session.commit()
+            publish_conversion_progress(task, stage='extracting', progress=0.0)
 
             if not extract_water_flow_data:
                 raise RuntimeError("data_extractor module could not be imported.")
@@ -55,7 +61,10 @@ def run_conversion_in_thread(app, task_id):
             if not generated_files:
                 raise RuntimeError("No CSV files were generated by the script.")
 
-            for filename in generated_files:
+            for index, filename in enumerate(generated_files):
+                publish_conversion_progress(
+                    task, stage='aggregating', progress=round(0.5 + 0.5 * index / len(generated_files), 3), file=filename
+                )
                 file_path = os.path.join(output_dir, filename)
                 file_size = os.path.getsize(file_path)
                 
@@ -63,22 +72,46 @@ def run_conversion_in_thread(app, task_id):
                 dataset_name = os.path.splitext(filename)[0]
 
                 new_converted_dataset = ConvertedDataset(
+                    id=str(uuid.uuid4()),
                     name=dataset_name,
                     file_path=file_path,
                     file_size=file_size,
                     task_id=task.id
                 )
                 db.session.add(new_converted_dataset)
+
+                # Cache this file's partial aggregate. The cache is rebuilt on demand, so a failure
+                # here only drops the file instead of failing the conversion.
+                df = read_usage_csv(file_path)
+                try:
+                    build_dataset_aggregate(new_converted_dataset, df=df)
+                except Exception as e:
+                    logging.warning(f"Failed to cache the aggregate of '{dataset_name}': {e}", exc_info=True)
+                    remove_dataset_aggregate(new_converted_dataset)
+                    new_converted_dataset.aggregate_path = None
+                try:
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    remove_dataset_aggregate(new_converted_dataset)
+                    raise
+
+                # Fold the new rows into the building's persisted aggregate only once the dataset
+                # row is stored; update_building_aggregate commits on its own, and a failure there
+                # fails the task since the building aggregate would no longer match the datasets.
+                update_building_aggregate(dataset_name, file_path, task_id=task.id, df=df)
             
             task.status = 'completed'
             logging.info(f"Conversion task {task.id} completed successfully.")
 
         except Exception as e:
+            db.session.rollback()
             task.status = 'failed'
             logging.error(f"Conversion task {task.id} failed: {str(e)}", exc_info=True)
         
         finally:
             db.session.commit()
+            publish_conversion_progress(task, progress=1.0 if task.status == 'completed' else None)
 
 def start_conversion_task(dataset):
     """Creates a conversion task and starts it in a background thread."""
@@ -91,6 +124,7 @@ def start_conversion_task(dataset):
     try:
         db.session.add(new_task)
         db.session.commit()
+        publish_conversion_progress(new_task, original_dataset_id=dataset.id)
 
         app = current_app._get_current_object()
         thread = threading.Thread(target=run_conversion_in_thread, args=(app, new_task.id))
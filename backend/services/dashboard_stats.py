@@ -0,0 +1,122 @@
+import logging
+from collections import Counter
+from sqlalchemy import event, func, inspect, insert, update, select
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models.user import User
+from ..models.dataset import Dataset
+from ..models.conversion import ConversionTask
+from ..models.stats import DashboardCounter
+
+TASK_STATUSES = ('pending', 'processing', 'completed', 'failed')
+# Written by rebuild_dashboard_stats(). Counters without it (or with an older version) were not
+# seeded from the source tables, so they are recounted on the next read. Bump the version when
+# the set of counters changes.
+VERSION_KEY = '_version'
+COUNTERS_VERSION = 1
+
+_counters = DashboardCounter.__table__
+
+def _new_task_status(task):
+    # The column default is only applied by the INSERT itself
+    return task.status or ConversionTask.__table__.c.status.default.arg
+
+def _flush_deltas(session):
+    """Counter changes implied by the objects about to be flushed."""
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, User):
+            deltas['users'] += 1
+        elif isinstance(obj, Dataset):
+            deltas['datasets'] += 1
+        elif isinstance(obj, ConversionTask):
+            deltas['tasks'] += 1
+            deltas[f'tasks:{_new_task_status(obj)}'] += 1
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            deltas['users'] -= 1
+        elif isinstance(obj, Dataset):
+            deltas['datasets'] -= 1
+        elif isinstance(obj, ConversionTask):
+            deltas['tasks'] -= 1
+            deltas[f'tasks:{obj.status}'] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, ConversionTask) and obj not in session.deleted:
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                deltas[f'tasks:{history.deleted[0]}'] -= 1
+                deltas[f'tasks:{history.added[0]}'] += 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+@event.listens_for(Session, 'before_flush')
+def _apply_flush_deltas(session, flush_context, instances):
+    """
+    Applies counter changes on the flush's own connection, so they commit or roll back
+    together with the rows that caused them.
+    """
+    deltas = _flush_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for key, delta in deltas.items():
+        result = connection.execute(
+            update(_counters).where(_counters.c.key == key).values(value=_counters.c.value + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(_counters).values(key=key, value=delta))
+
+@event.listens_for(Session, 'do_orm_execute')
+def _invalidate_on_bulk_write(orm_execute_state):
+    """
+    Bulk DELETE and UPDATE statements (Query.delete(), session.execute(delete(...))) skip the
+    flush, so when they touch a counted model the version marker is dropped in the same
+    transaction and the next read recounts.
+    """
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    counted = (User, Dataset, ConversionTask) if orm_execute_state.is_delete else (ConversionTask,)
+    if issubclass(mapper.class_, counted):
+        orm_execute_state.session.connection().execute(
+            _counters.delete().where(_counters.c.key == VERSION_KEY)
+        )
+
+def _count_rows():
+    counts = {
+        'users': db.session.query(func.count(User.id)).scalar(),
+        'datasets': db.session.query(func.count(Dataset.id)).scalar(),
+        'tasks': db.session.query(func.count(ConversionTask.id)).scalar(),
+    }
+    for status in TASK_STATUSES:
+        counts[f'tasks:{status}'] = 0
+    for status, count in db.session.query(ConversionTask.status, func.count(ConversionTask.id)).group_by(ConversionTask.status):
+        counts[f'tasks:{status}'] = count
+    return counts
+
+def rebuild_dashboard_stats():
+    """Recounts every counter from the source tables. Commits the session."""
+    counts = _count_rows()
+    db.session.execute(_counters.delete())
+    rows = [{'key': key, 'value': value} for key, value in counts.items()]
+    db.session.execute(insert(_counters), rows + [{'key': VERSION_KEY, 'value': COUNTERS_VERSION}])
+    db.session.commit()
+    logging.info(f"Rebuilt dashboard counters: {counts}")
+    return counts
+
+def get_dashboard_stats():
+    """
+    Returns the dashboard statistics from the materialized counters with a single read of a
+    table holding a handful of rows. Counters missing the current version marker are rebuilt first.
+    """
+    counts = dict(db.session.execute(select(_counters.c.key, _counters.c.value)).all())
+    if counts.get(VERSION_KEY) != COUNTERS_VERSION:
+        counts = rebuild_dashboard_stats()
+    return {
+        'users': counts.get('users', 0),
+        'datasets': counts.get('datasets', 0),
+        'total_tasks': counts.get('tasks', 0),
+        'tasks_by_status': {status: counts.get(f'tasks:{status}', 0) for status in TASK_STATUSES}
+    }
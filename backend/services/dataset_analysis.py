@@ -0,0 +1,89 @@
+"""
+Correlation and clustering of uploaded datasets. These functions run inside core.task_runner child processes
+(see routes/datasets.py), so they take IDs and plain values and return JSON-ready results.
+"""
+import os
+import logging
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from ..extensions import db
+from ..models.dataset import Dataset
+from ..core.task_runner import report_progress
+from .dataset_ingestion import read_dataset, is_excel
+from .online_correlation import OnlineCorrelation
+from .clustering_service import run_clustering, save_cluster_labels
+
+def is_numeric_dtype(dtype_name):
+    """Whether a dtype name from a dataset profile is a numeric (or boolean) column type."""
+    try:
+        return np.issubdtype(np.dtype(dtype_name), np.number) or np.dtype(dtype_name) == np.bool_
+    except TypeError:
+        return False
+
+def _load_dataset(dataset_id):
+    dataset = db.session.get(Dataset, dataset_id)
+    if dataset is None:
+        raise FileNotFoundError(f"Dataset with ID {dataset_id} not found.")
+    return dataset
+
+def _json_matrix(matrix):
+    """A DataFrame as {column: {row: value}} with NaN as None, which JSON cannot represent."""
+    return matrix.astype(object).where(matrix.notna(), None).to_dict()
+
+def correlate_dataset(dataset_id, columns, streaming=False):
+    """
+    Computes the Pearson correlation matrix of ``columns`` of an uploaded dataset. Values that
+    do not parse as numbers count as missing, and pairs are compared over the rows where both
+    are present, as DataFrame.corr() does.
+
+    CSVs larger than CORRELATION_STREAMING_THRESHOLD_MB (or any CSV when ``streaming`` is set)
+    are read in CORRELATION_CHUNK_ROWS chunks and accumulated with OnlineCorrelation, so memory
+    depends on the number of columns rather than the number of rows. Each chunk reports
+    progress and is a cancellation point.
+    """
+    dataset = _load_dataset(dataset_id)
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    threshold = current_app.config.get('CORRELATION_STREAMING_THRESHOLD_MB', 100) * 1024 * 1024
+    streaming = not is_excel(dataset.name) and (
+        streaming or os.path.getsize(os.path.join(upload_folder, dataset.file_path)) > threshold
+    )
+
+    if streaming:
+        chunk_rows = current_app.config.get('CORRELATION_CHUNK_ROWS', 100000)
+        total_rows = (dataset.profile or {}).get('row_count')
+        accumulator = OnlineCorrelation(columns)
+        rows_read = 0
+        with read_dataset(dataset, upload_folder, usecols=columns, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                accumulator.update(chunk)
+                rows_read += len(chunk)
+                report_progress('correlating', round(min(rows_read / total_rows, 1.0), 3) if total_rows else None)
+        matrix = accumulator.result()
+        logging.info(f"Computed streaming correlation for {len(columns)} columns over {rows_read} rows of dataset {dataset_id}.")
+    else:
+        df = read_dataset(dataset, upload_folder, usecols=columns)
+        matrix = df[columns].apply(pd.to_numeric, errors='coerce').corr()
+
+    return {
+        "columns": list(columns),
+        "streaming": bool(streaming),
+        "correlation_matrix": _json_matrix(matrix),
+    }
+
+def cluster_dataset(dataset_id, job_id, columns, n_clusters=3, minibatch=None, batch_size=4096):
+    """
+    Clusters the rows of an uploaded dataset on ``columns`` (see clustering_service.run_clustering)
+    and writes the per-row labels to a file keyed by ``job_id``, served page by page. Values
+    that do not parse as numbers count as missing, so their rows get label -1.
+
+    Returns the clustering summary: algorithm, centroids in original units and counts.
+    """
+    dataset = _load_dataset(dataset_id)
+    df = read_dataset(dataset, current_app.config['UPLOAD_FOLDER'], usecols=columns)
+    report_progress('clustering', 0.5)
+    values = df[columns].apply(pd.to_numeric, errors='coerce')
+    labels, summary = run_clustering(values, columns, n_clusters=n_clusters, minibatch=minibatch, batch_size=batch_size)
+    save_cluster_labels(job_id, labels)
+    return summary
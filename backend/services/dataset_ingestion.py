@@ -0,0 +1,192 @@
+import io
+import os
+import csv
+import codecs
+import logging
+import pandas as pd
+from chardet.universaldetector import UniversalDetector
+
+EXCEL_EXTENSIONS = {'.xls', '.xlsx'}
+# Bytes fed to the incremental detector per step; it usually settles within the first chunk or two.
+DETECTION_CHUNK_SIZE = 64 * 1024
+SNIFF_SAMPLE_SIZE = 16 * 1024
+# Tried in order when neither a BOM, strict UTF-8 nor the detector gives a usable encoding.
+FALLBACK_ENCODINGS = ('gb18030', 'latin1')
+CANDIDATE_DELIMITERS = ',;\t|'
+# Column dtypes in a profile are inferred from this many leading rows.
+PROFILE_SAMPLE_ROWS = 1000
+
+def is_excel(filename):
+    return os.path.splitext(filename)[1].lower() in EXCEL_EXTENSIONS
+
+def _detect_encoding(file_path):
+    """Statistical detection fed from the file in DETECTION_CHUNK_SIZE reads until the detector is sure."""
+    detector = UniversalDetector()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DETECTION_CHUNK_SIZE), b''):
+            detector.feed(chunk)
+            if detector.done:
+                break
+    detector.close()
+    encoding, confidence = detector.result['encoding'], detector.result['confidence']
+    logging.info(f"Detected encoding: {encoding} with confidence: {confidence}")
+
+    # GB2312/GBK guesses are widened to their superset so rare characters still decode.
+    if encoding and encoding.lower().replace('-', '') in ('gb2312', 'gbk'):
+        encoding = 'gb18030'
+    return encoding
+
+def _candidate_encodings(file_path, head, preferred=None):
+    """
+    Encodings to try in order: ``preferred``, strict UTF-8 (with BOM if the file starts with
+    one), the statistical guess, then FALLBACK_ENCODINGS. The detector only runs once the
+    encodings before it have failed.
+    """
+    def candidates():
+        yield preferred
+        yield 'utf-8-sig' if head.startswith(codecs.BOM_UTF8) else 'utf-8'
+        yield _detect_encoding(file_path)
+        yield from FALLBACK_ENCODINGS
+
+    tried = set()
+    for encoding in candidates():
+        try:
+            # Canonical codec names, so 'GB18030' and 'gb18030' are tried once
+            encoding = codecs.lookup(encoding).name if encoding else None
+        except LookupError:
+            continue
+        if encoding and encoding not in tried:
+            tried.add(encoding)
+            yield encoding
+
+def _sniff_delimiter(text):
+    try:
+        return csv.Sniffer().sniff(text, delimiters=CANDIDATE_DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+def _scan_csv(file_path, encoding, delimiter):
+    """
+    Decodes the whole file once, in DETECTION_CHUNK_SIZE reads, and parses it with the csv
+    module. Returns the number of non-blank data rows and the text of the header plus the
+    first PROFILE_SAMPLE_ROWS rows. Raises UnicodeDecodeError at the first invalid byte.
+    """
+    sample_lines = []
+
+    def lines(text):
+        for line in text:
+            if len(sample_lines) <= PROFILE_SAMPLE_ROWS:
+                sample_lines.append(line)
+            yield line
+
+    records = 0
+    with open(file_path, encoding=encoding, newline='', buffering=DETECTION_CHUNK_SIZE) as text:
+        for row in csv.reader(lines(text), delimiter=delimiter):
+            # pandas skips blank lines too
+            if row:
+                records += 1
+    return max(records - 1, 0), ''.join(sample_lines)
+
+def scan_csv(file_path, encoding=None):
+    """
+    Detects the encoding and delimiter of a CSV and profiles it in a single streaming decode of
+    the file: the pass that proves the candidate encoding decodes every byte also counts the
+    rows and keeps the leading rows for dtype inference. Only when a candidate fails part-way
+    (a non-UTF-8 file) is the file decoded again with the next one. The delimiter is sniffed
+    from the first SNIFF_SAMPLE_SIZE bytes.
+
+    Returns:
+        dict: The CSV profile (columns, dtypes, row_count, encoding, delimiter).
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_SAMPLE_SIZE)
+    for candidate in _candidate_encodings(file_path, head, encoding):
+        # errors='replace' only guards a character cut off at the end of the head
+        delimiter = _sniff_delimiter(codecs.getincrementaldecoder(candidate)(errors='replace').decode(head))
+        try:
+            row_count, sample_text = _scan_csv(file_path, candidate, delimiter)
+        except UnicodeDecodeError:
+            logging.warning(f"Failed to decode with encoding '{candidate}', trying next.")
+            continue
+        try:
+            sample = pd.read_csv(io.StringIO(sample_text), sep=delimiter)
+        except pd.errors.EmptyDataError:
+            sample = pd.DataFrame()
+        return {
+            'format': 'csv',
+            'columns': [str(c) for c in sample.columns],
+            'dtypes': _column_types(sample),
+            'row_count': row_count,
+            'encoding': candidate,
+            'delimiter': delimiter,
+        }
+    raise ValueError("Could not determine the encoding of the file.")
+
+def _column_types(df):
+    return {str(column): str(dtype) for column, dtype in df.dtypes.items()}
+
+def _sheet_dimensions(excel):
+    """Rows and columns of every sheet, from the workbook's metadata where it has it."""
+    book = excel.book
+    if hasattr(book, 'sheets'):  # xlrd (.xls)
+        return [{'name': sheet.name, 'rows': sheet.nrows, 'columns': sheet.ncols} for sheet in book.sheets()]
+    dimensions = []
+    for sheet in book.worksheets:
+        if sheet.max_row is None:
+            # Read-only sheets written without a <dimension> tag have to be scanned once.
+            sheet.calculate_dimension(force=True)
+        dimensions.append({'name': sheet.title, 'rows': sheet.max_row or 0, 'columns': sheet.max_column or 0})
+    return dimensions
+
+def _profile_excel(file_path):
+    with pd.ExcelFile(file_path) as excel:
+        sheets = _sheet_dimensions(excel)
+        sample = excel.parse(sheet_name=0, nrows=PROFILE_SAMPLE_ROWS)
+    return {
+        'format': 'excel',
+        'columns': [str(c) for c in sample.columns],
+        'dtypes': _column_types(sample),
+        # pd.read_excel reads the first sheet, with its first row as the header
+        'row_count': max(sheets[0]['rows'] - 1, 0) if sheets else 0,
+        'sheets': sheets,
+    }
+
+def profile_dataset(dataset, file_path):
+    """
+    Computes the dataset's profile and stores it on ``dataset.profile``: columns, dtypes
+    (inferred from the first PROFILE_SAMPLE_ROWS rows) and row count, plus the encoding and
+    delimiter of CSVs (also stored on the row) or the sheet names and dimensions of Excel
+    workbooks. CSVs are profiled by scan_csv() in one streaming pass, so memory does not depend
+    on the file size. Raises ValueError when a CSV's encoding cannot be determined. The caller
+    commits.
+    """
+    if is_excel(dataset.name):
+        dataset.profile = _profile_excel(file_path)
+    else:
+        dataset.profile = scan_csv(file_path, dataset.encoding)
+        dataset.encoding, dataset.delimiter = dataset.profile['encoding'], dataset.profile['delimiter']
+    logging.info(f"Profiled dataset {dataset.id}: {dataset.profile['row_count']} rows, {len(dataset.profile['columns'])} columns.")
+    return dataset.profile
+
+def ensure_dataset_profile(dataset, upload_folder):
+    """
+    Returns the stored profile, computing it for datasets uploaded before profiles were
+    recorded. Returns True as the second item when the row changed and needs a commit.
+    """
+    if dataset.profile:
+        return dataset.profile, False
+    return profile_dataset(dataset, os.path.join(upload_folder, dataset.file_path)), True
+
+def read_dataset(dataset, upload_folder, **read_kwargs):
+    """
+    Reads an uploaded dataset into a DataFrame. CSV files are parsed with the encoding and
+    delimiter stored on the Dataset; rows uploaded before these were recorded are profiled once
+    and the result is stored on the row (the caller commits the session).
+    """
+    file_path = os.path.join(upload_folder, dataset.file_path)
+    if is_excel(dataset.name):
+        return pd.read_excel(file_path, **read_kwargs)
+
+    if not dataset.encoding:
+        profile_dataset(dataset, file_path)
+    return pd.read_csv(file_path, encoding=dataset.encoding, sep=dataset.delimiter or ',', **read_kwargs)
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from xgboost import XGBRegressor
+
+from .forecast_service import get_model_cache_folder
+
+HORIZON = 24
+# The extractor back-fills 前一天/前一周用水量 with the current value for each building's first week,
+# which would leak the target; those rows are excluded from training.
+WARMUP_HOURS = 24 * 7
+FEATURE_COLUMNS = ['小时', '星期', 'is_weekend', 'lag_24', 'lag_168', 'mean_24', 'mean_168', 'hour_mean_7']
+XGB_PARAMS = {
+    'n_estimators': 300,
+    'max_depth': 6,
+    'learning_rate': 0.05,
+    'subsample': 0.8,
+    'colsample_bytree': 0.9,
+    'tree_method': 'hist',
+}
+
+def _hourly_frame(df):
+    """Reindexes one building's converted CSV frame to whole days of contiguous hours."""
+    timestamps = pd.to_datetime(df['日期']) + pd.to_timedelta(df['小时'], unit='h')
+    frame = df[['用水量', '前一天用水量', '前一周用水量']].set_axis(timestamps)
+    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+    full_index = pd.date_range(frame.index[0].normalize(), frame.index[-1].normalize() + pd.Timedelta(hours=23), freq='h')
+    frame = frame.reindex(full_index)
+    frame['用水量'] = frame['用水量'].interpolate(limit_direction='both')
+    return frame
+
+def build_feature_frame(frames, horizon=HORIZON):
+    """
+    Builds the feature matrix for all buildings at once, including ``horizon`` future rows
+    per building whose features only reference data at least 24 hours old.
+
+    Args:
+        frames (dict[str, pd.DataFrame]): Converted CSV frames (see read_usage_csv) keyed by building.
+
+    Returns:
+        pd.DataFrame: One row per (building, hour) with FEATURE_COLUMNS, 'building', 'building_code',
+            '用水量' (NaN for future rows) and 'is_future'.
+    """
+    pieces = []
+    for code, name in enumerate(sorted(frames)):
+        frame = _hourly_frame(frames[name])
+        future_index = pd.date_range(frame.index[-1] + pd.Timedelta(hours=1), periods=horizon, freq='h')
+        frame = pd.concat([frame, pd.DataFrame(index=future_index, columns=frame.columns, dtype=float)])
+        frame['building'] = name
+        frame['building_code'] = code
+        frame['is_future'] = frame.index.isin(future_index)
+        pieces.append(frame)
+
+    data = pd.concat(pieces).rename_axis('timestamp').reset_index()
+    data['小时'] = data['timestamp'].dt.hour
+    data['星期'] = data['timestamp'].dt.dayofweek + 1
+    data['is_weekend'] = (data['星期'] >= 6).astype(int)
+
+    by_building = data.groupby('building_code', sort=False)['用水量']
+    # Historical rows keep the extractor's lag columns; future and re-indexed rows derive them by shifting.
+    data['lag_24'] = data['前一天用水量'].combine_first(by_building.shift(24))
+    data['lag_168'] = data['前一周用水量'].combine_first(by_building.shift(24 * 7))
+
+    data['_shift_24'] = by_building.shift(24)
+    shifted = data.groupby('building_code', sort=False)['_shift_24']
+    data['mean_24'] = shifted.rolling(24, min_periods=1).mean().reset_index(level=0, drop=True)
+    data['mean_168'] = shifted.rolling(24 * 7, min_periods=1).mean().reset_index(level=0, drop=True)
+
+    data['_prev_same_hour'] = data.groupby(['building_code', '小时'], sort=False)['用水量'].shift(1)
+    data['hour_mean_7'] = (
+        data.groupby(['building_code', '小时'], sort=False)['_prev_same_hour']
+        .rolling(7, min_periods=1).mean()
+        .reset_index(level=[0, 1], drop=True)
+    )
+    data['_position'] = data.groupby('building_code', sort=False).cumcount()
+    return data.drop(columns=['_shift_24', '_prev_same_hour', '前一天用水量', '前一周用水量'])
+
+def _training_rows(data):
+    return data[~data['is_future'] & data['用水量'].notna() & (data['_position'] >= WARMUP_HOURS)]
+
+def _fit_model(X, y, n_jobs):
+    """Fits one regressor. Runs in joblib workers for per-building models."""
+    model = XGBRegressor(n_jobs=n_jobs, **XGB_PARAMS)
+    model.fit(X, y)
+    return model
+
+def data_fingerprint(dataset_hashes):
+    """Combines per-building dataset hashes into one value that changes when any input changes."""
+    raw = json.dumps(sorted(dataset_hashes.items()))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _model_key(buildings, mode):
+    raw = json.dumps([sorted(buildings), mode])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _model_paths(key, mode, codes):
+    folder = get_model_cache_folder('xgboost')
+    meta_path = os.path.join(folder, f"{key}.meta.json")
+    if mode == 'global':
+        return meta_path, {None: os.path.join(folder, f"{key}.json")}
+    return meta_path, {code: os.path.join(folder, f"{key}_{code}.json") for code in codes}
+
+def _load_models(meta_path, model_paths, data_hash):
+    if not os.path.exists(meta_path) or not all(os.path.exists(p) for p in model_paths.values()):
+        return None, None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('data_hash') != data_hash:
+        return None, None
+    models = {}
+    for code, path in model_paths.items():
+        model = XGBRegressor()
+        model.load_model(path)
+        models[code] = model
+    return models, meta
+
+def _save_models(meta_path, model_paths, models, meta):
+    for code, path in model_paths.items():
+        models[code].save_model(path)
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, meta_path)
+
+def forecast_next_day(frames, dataset_hashes, mode='global', n_jobs=-1):
+    """
+    Produces 24-hour next-day usage forecasts for every building in a single call.
+
+    Models are persisted under model_cache/xgboost and reused until the input data changes.
+    In 'global' mode one model is trained on all buildings with the building as a feature;
+    in 'per_building' mode one model per building is trained in parallel.
+
+    Args:
+        frames (dict[str, pd.DataFrame]): Converted CSV frames keyed by building name.
+        dataset_hashes (dict[str, str]): Content fingerprint of each building's data.
+        mode (str): 'global' or 'per_building'.
+
+    Returns:
+        dict: {'mode', 'trained_at', 'cached', 'forecasts': {building: {timestamp: value}}}
+    """
+    if mode not in ('global', 'per_building'):
+        raise ValueError("mode must be 'global' or 'per_building'.")
+
+    data = build_feature_frame(frames)
+    codes = sorted(data['building_code'].unique().tolist())
+    features = FEATURE_COLUMNS + (['building_code'] if mode == 'global' else [])
+    data_hash = data_fingerprint(dataset_hashes)
+    meta_path, model_paths = _model_paths(_model_key(frames.keys(), mode), mode, codes)
+
+    models, meta = _load_models(meta_path, model_paths, data_hash)
+    cached = models is not None
+    if not cached:
+        train = _training_rows(data)
+        if train.empty:
+            raise ValueError(f"At least {WARMUP_HOURS // 24 + 1} days of data are required to train the forecaster.")
+        if mode == 'global':
+            models = {None: _fit_model(train[features], train['用水量'], n_jobs)}
+        else:
+            groups = [(code, group) for code, group in train.groupby('building_code') if not group.empty]
+            fitted = Parallel(n_jobs=n_jobs)(
+                delayed(_fit_model)(group[features], group['用水量'], 1) for _, group in groups
+            )
+            models = {code: model for (code, _), model in zip(groups, fitted)}
+            missing = [code for code in codes if code not in models]
+            if missing:
+                raise ValueError("Some buildings do not have enough data to train a model.")
+        meta = {
+            'data_hash': data_hash,
+            'mode': mode,
+            'buildings': sorted(frames),
+            'features': features,
+            'train_rows': int(len(train)),
+            'trained_at': datetime.utcnow().isoformat(),
+        }
+        _save_models(meta_path, model_paths, models, meta)
+        logging.info(f"Trained {mode} next-day forecaster on {len(train)} rows for {len(codes)} buildings.")
+
+    future = data[data['is_future']].copy()
+    if mode == 'global':
+        future['prediction'] = models[None].predict(future[features])
+    else:
+        future['prediction'] = np.nan
+        for code, model in models.items():
+            mask = future['building_code'] == code
+            future.loc[mask, 'prediction'] = model.predict(future.loc[mask, features])
+    future['prediction'] = future['prediction'].astype(float).clip(lower=0).round(3)
+
+    forecasts = {
+        building: dict(zip(group['timestamp'].map(pd.Timestamp.isoformat), group['prediction'].tolist()))
+        for building, group in future.groupby('building', sort=True)
+    }
+    return {'mode': mode, 'trained_at': meta['trained_at'], 'cached': cached, 'forecasts': forecasts}
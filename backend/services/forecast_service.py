@@ -0,0 +1,228 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from joblib import Parallel, delayed
+from statsmodels.tsa.arima.model import ARIMA, ARIMAResults
+from statsmodels.tsa.stattools import adfuller
+
+# Fitted models kept in memory on top of the on-disk cache.
+MEMORY_CACHE_SIZE = 32
+# An order-search level must improve the best AIC by more than this to continue searching.
+AIC_TOLERANCE = 2.0
+
+_memory_cache = OrderedDict()
+_memory_cache_lock = threading.Lock()
+_fingerprint_cache = {}
+
+def get_model_cache_folder(kind='arima'):
+    """Returns (and creates) the folder holding persisted fitted models of the given kind."""
+    project_root = os.path.abspath(os.path.join(current_app.root_path, '..'))
+    folder = os.path.join(project_root, 'model_cache', kind)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def file_fingerprint(file_path):
+    """SHA-256 of a file's content, memoized on (path, size, mtime) so unchanged files are hashed once."""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _fingerprint_cache:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        _fingerprint_cache[key] = digest.hexdigest()
+    return _fingerprint_cache[key]
+
+def hourly_usage_series(df):
+    """Builds an hourly 用水量 series indexed by timestamp from a converted building CSV frame."""
+    timestamps = pd.to_datetime(df['日期']) + pd.to_timedelta(df['小时'], unit='h')
+    series = pd.Series(df['用水量'].to_numpy(dtype=float), index=timestamps).sort_index()
+    series = series[~series.index.duplicated(keep='last')]
+    return series.asfreq('h').interpolate(limit_direction='both')
+
+def _cache_key(dataset_hash, column, order, history):
+    raw = json.dumps([dataset_hash, str(column), list(order), history])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _order_key(dataset_hash, column, history):
+    return _cache_key(dataset_hash, column, ('best',), history)
+
+def _cache_get(key):
+    with _memory_cache_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+    path = os.path.join(get_model_cache_folder(), f"{key}.pkl")
+    if not os.path.exists(path):
+        return None
+    result = ARIMAResults.load(path)
+    _cache_put(key, result, persist=False)
+    return result
+
+def _cache_put(key, result, persist=True):
+    with _memory_cache_lock:
+        _memory_cache[key] = result
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    if persist:
+        path = os.path.join(get_model_cache_folder(), f"{key}.pkl")
+        tmp_path = f"{path}.tmp"
+        result.save(tmp_path)
+        os.replace(tmp_path, path)
+
+def _load_best_order(key):
+    path = os.path.join(get_model_cache_folder(), f"{key}.json")
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return tuple(json.load(f)['order'])
+    return None
+
+def _save_best_order(key, order, aic):
+    path = os.path.join(get_model_cache_folder(), f"{key}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'order': list(order), 'aic': aic}, f)
+
+def select_differencing(values, max_d=2, alpha=0.05):
+    """Smallest d for which the ADF test rejects a unit root."""
+    series = np.asarray(values, dtype=float)
+    for d in range(max_d + 1):
+        if len(series) < 10 or np.ptp(series) == 0 or adfuller(series, autolag='AIC')[1] < alpha:
+            return d
+        series = np.diff(series)
+    return max_d
+
+def _fit_order(values, order):
+    """Fits one ARIMA order. Runs in joblib workers, so it must stay at module level."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            result = ARIMA(values, order=order).fit()
+            return order, float(result.aic), result
+        except Exception as e:
+            logging.debug(f"ARIMA{order} failed to fit: {e}")
+            return order, float('inf'), None
+
+def search_order(values, max_p=5, max_q=3, max_d=2, n_jobs=-1, aic_tolerance=AIC_TOLERANCE):
+    """
+    Searches ARIMA orders by AIC. d is chosen with an ADF test, then (p, q) orders are fitted
+    level by level in increasing p+q, each level in parallel. The search stops early once a level
+    fails to improve the best AIC by more than ``aic_tolerance``.
+
+    Returns:
+        tuple[tuple, float, ARIMAResults]: (best order, its AIC, its fitted result)
+    """
+    values = np.asarray(values, dtype=float)
+    d = select_differencing(values, max_d)
+    best = ((0, d, 0), float('inf'), None)
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for level in range(max_p + max_q + 1):
+            orders = [(p, d, level - p) for p in range(max(0, level - max_q), min(max_p, level) + 1)]
+            fits = parallel(delayed(_fit_order)(values, order) for order in orders)
+            level_best = min(fits, key=lambda fit: fit[1])
+            improved = level_best[1] < best[1] - aic_tolerance
+            if level_best[1] < best[1]:
+                best = level_best
+            if level > 0 and not improved:
+                logging.info(f"ARIMA order search stopped at p+q={level}, best order {best[0]} (AIC {best[1]:.2f}).")
+                break
+
+    if best[2] is None:
+        raise ValueError("No ARIMA order could be fitted to the series.")
+    return best
+
+def _search_or_fit(values, order, search_kwargs):
+    if order is not None:
+        fitted_order, aic, result = _fit_order(values, tuple(order))
+        if result is None:
+            raise ValueError(f"ARIMA{tuple(order)} could not be fitted to the series.")
+        return fitted_order, aic, result
+    return search_order(values, **search_kwargs)
+
+def _prepare(series, history):
+    series = series.dropna()
+    if history:
+        series = series.iloc[-history:]
+    if len(series) < 10:
+        raise ValueError("At least 10 observations are required for forecasting.")
+    return series
+
+def _cached_fit(dataset_hash, column, order, history):
+    """Returns (result, order) from the cache, or (None, order-or-None) on a miss."""
+    if order is None:
+        order = _load_best_order(_order_key(dataset_hash, column, history))
+        if order is None:
+            return None, None
+    return _cache_get(_cache_key(dataset_hash, column, order, history)), tuple(order)
+
+def _store_fit(dataset_hash, column, order, history, aic, result, searched):
+    _cache_put(_cache_key(dataset_hash, column, order, history), result)
+    if searched:
+        _save_best_order(_order_key(dataset_hash, column, history), order, aic)
+
+def _format_forecast(series, result, order, steps, cached):
+    values = result.forecast(steps=steps)
+    freq = series.index.freq or (pd.infer_freq(series.index) if isinstance(series.index, pd.DatetimeIndex) and len(series) > 2 else None)
+    if freq is not None:
+        index = pd.date_range(series.index[-1], periods=steps + 1, freq=freq)[1:]
+        labels = [ts.isoformat() for ts in index]
+    else:
+        labels = list(range(1, steps + 1))
+    return {
+        'order': list(order),
+        'aic': float(result.aic),
+        'cached': cached,
+        'forecast': dict(zip(labels, np.round(np.asarray(values, dtype=float), 4).tolist()))
+    }
+
+def forecast_many(series_map, steps, dataset_hashes, order=None, history=None, n_jobs=-1, **search_kwargs):
+    """
+    Forecasts several named series (columns or buildings) ``steps`` periods ahead.
+
+    Fitted models are cached per (dataset hash, name, order, history), so repeating a forecast or
+    asking for a longer horizon reuses the fit. Cache misses are fitted concurrently; a single miss
+    parallelizes its order search instead.
+
+    Args:
+        series_map (dict[str, pd.Series]): Series to forecast, keyed by column or building name.
+        dataset_hashes (dict[str, str]): Fingerprint of the dataset each series comes from.
+        order (tuple | None): Fixed (p, d, q) order; searched by AIC when omitted.
+        history (int | None): Only the most recent ``history`` observations are used when set.
+
+    Returns:
+        dict[str, dict]: Per name, the order, AIC, whether the fit was cached, and the forecast.
+    """
+    prepared = {name: _prepare(series, history) for name, series in series_map.items()}
+    results, misses = {}, []
+    for name, series in prepared.items():
+        result, known_order = _cached_fit(dataset_hashes[name], name, order, history)
+        if result is not None:
+            results[name] = _format_forecast(series, result, known_order, steps, cached=True)
+        else:
+            # A previously selected order whose model was evicted is refitted without a new search.
+            misses.append((name, known_order))
+
+    if len(misses) == 1:
+        name, known_order = misses[0]
+        fits = [_search_or_fit(prepared[name].to_numpy(), known_order, dict(search_kwargs, n_jobs=n_jobs))]
+    elif misses:
+        fits = Parallel(n_jobs=n_jobs)(
+            delayed(_search_or_fit)(prepared[name].to_numpy(), known_order, dict(search_kwargs, n_jobs=1))
+            for name, known_order in misses
+        )
+    else:
+        fits = []
+
+    for (name, known_order), (fitted_order, aic, result) in zip(misses, fits):
+        _store_fit(dataset_hashes[name], name, fitted_order, history, aic, result, searched=known_order is None)
+        results[name] = _format_forecast(prepared[name], result, fitted_order, steps, cached=False)
+    return results
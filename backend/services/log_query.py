@@ -0,0 +1,250 @@
+import os
+import json
+import glob
+import threading
+from datetime import datetime, timezone
+
+# Log files are read backwards in blocks of this size.
+READ_BLOCK_SIZE = 64 * 1024
+# Each offset index entry summarizes about this many bytes of whole lines.
+INDEX_BLOCK_SIZE = 64 * 1024
+
+class LogQueryError(ValueError):
+    pass
+
+class IndexBlock:
+    """Byte range [start, end) of whole lines, with the time span, levels and loggers in it."""
+    __slots__ = ('start', 'end', 't_min', 't_max', 'levels', 'loggers')
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        self.t_min = None
+        self.t_max = None
+        self.levels = set()
+        self.loggers = set()
+
+    def add(self, end, entry):
+        self.end = end
+        if entry is None:
+            return
+        timestamp = entry.get('timestamp')
+        if isinstance(timestamp, (int, float)):
+            self.t_min = timestamp if self.t_min is None else min(self.t_min, timestamp)
+            self.t_max = timestamp if self.t_max is None else max(self.t_max, timestamp)
+        self.levels.add(entry.get('level'))
+        self.loggers.add(entry.get('name'))
+
+class FileIndex:
+    """Offset index of one log file, extended as the file grows."""
+
+    def __init__(self):
+        self.indexed_size = 0
+        self.blocks = []
+
+    def extend(self, path):
+        size = os.path.getsize(path)
+        if size < self.indexed_size:
+            # Truncated or replaced: start over.
+            self.indexed_size, self.blocks = 0, []
+        if size == self.indexed_size:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self.indexed_size)
+            offset = self.indexed_size
+            block = IndexBlock(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # A line still being written is indexed on a later call.
+                    break
+                offset += len(line)
+                block.add(offset, _parse(line))
+                if block.end - block.start >= INDEX_BLOCK_SIZE:
+                    self.blocks.append(block)
+                    block = IndexBlock(offset)
+            if block.end > block.start:
+                self.blocks.append(block)
+        self.indexed_size = offset
+
+class LogFilter:
+    """Criteria on the JSON log fields. Empty criteria match every line."""
+
+    def __init__(self, levels=None, logger=None, since=None, until=None, text=None):
+        self.levels = {level.upper() for level in levels} if levels else None
+        self.logger = logger or None
+        self.since = since
+        self.until = until
+        self.text = text.lower() if text else None
+
+    @property
+    def uses_index(self):
+        return bool(self.levels or self.logger or self.since is not None or self.until is not None)
+
+    def may_match_block(self, block):
+        if self.levels and not (self.levels & block.levels):
+            return False
+        if self.logger and self.logger not in block.loggers:
+            return False
+        if self.since is not None and (block.t_max is None or block.t_max < self.since):
+            return False
+        if self.until is not None and (block.t_min is None or block.t_min > self.until):
+            return False
+        return True
+
+    def matches(self, line, entry):
+        if self.uses_index:
+            if entry is None:
+                return False
+            if self.levels and entry.get('level') not in self.levels:
+                return False
+            if self.logger and entry.get('name') != self.logger:
+                return False
+            timestamp = entry.get('timestamp')
+            if self.since is not None and not (isinstance(timestamp, (int, float)) and timestamp >= self.since):
+                return False
+            if self.until is not None and not (isinstance(timestamp, (int, float)) and timestamp <= self.until):
+                return False
+        return self.text is None or self._contains_text(line, entry)
+
+    def _contains_text(self, line, entry):
+        if self.text in line.lower():
+            return True
+        if self.text.isascii():
+            return False
+        # The JSON formatter escapes non-ASCII text, so compare against the decoded entry.
+        entry = entry if entry is not None else _parse(line)
+        return entry is not None and self.text in json.dumps(entry, ensure_ascii=False).lower()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _parse(line):
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+def parse_time(value):
+    """Parses a query time given as epoch seconds or ISO 8601 (naive values are UTC)."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise LogQueryError(f"Invalid time '{value}'; use ISO 8601 or epoch seconds")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def log_files(log_path):
+    """The active log file and its rotated backups, newest first."""
+    def rotation(path):
+        suffix = path[len(log_path) + 1:]
+        return int(suffix) if suffix.isdigit() else None
+
+    backups = [p for p in glob.glob(glob.escape(log_path) + '.*') if rotation(p) is not None]
+    backups.sort(key=rotation)
+    return [p for p in [log_path] + backups if os.path.isfile(p)]
+
+def _file_index(path):
+    # Keyed by inode, so a file keeps its index when rotation renames it.
+    stat = os.stat(path)
+    key = (stat.st_dev, stat.st_ino)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = FileIndex()
+        index.extend(path)
+        return index
+
+def _prune_indexes(files):
+    """Drops the indexes of files that rotated away."""
+    live = set()
+    for path in files:
+        stat = os.stat(path)
+        live.add((stat.st_dev, stat.st_ino))
+    with _indexes_lock:
+        for key in set(_indexes) - live:
+            del _indexes[key]
+
+def _lines_backwards(f, start, end):
+    """Yields (offset, line) for the whole lines in [start, end), last line first."""
+    position = end
+    tail = b''
+    while position > start:
+        read_from = max(start, position - READ_BLOCK_SIZE)
+        f.seek(read_from)
+        chunk = f.read(position - read_from) + tail
+        position = read_from
+        lines = chunk.split(b'\n')
+        # The first piece may continue in the previous block, unless the range starts here.
+        tail = lines.pop(0) if position > start else b''
+        offset = position + len(tail) + (1 if position > start else 0)
+        starts = []
+        for line in lines:
+            starts.append(offset)
+            offset += len(line) + 1
+        for line_start, line in zip(reversed(starts), reversed(lines)):
+            if line:
+                yield line_start, line
+
+def _candidate_ranges(path, log_filter, end):
+    """Byte ranges of ``path`` below ``end`` that can hold matching lines, newest first."""
+    if not log_filter.uses_index:
+        yield 0, end
+        return
+    index = _file_index(path)
+    for block in reversed(index.blocks):
+        if block.start >= end or not log_filter.may_match_block(block):
+            continue
+        yield block.start, min(block.end, end)
+
+def _encode_cursor(path, offset):
+    stat = os.stat(path)
+    return f"{stat.st_ino}:{offset}"
+
+def _decode_cursor(cursor, files):
+    """Maps a cursor to (position in ``files``, byte offset), following the file across rotations."""
+    try:
+        inode, offset = (int(part) for part in cursor.split(':'))
+    except ValueError:
+        raise LogQueryError("Invalid cursor")
+    for position, path in enumerate(files):
+        if os.stat(path).st_ino == inode:
+            return position, offset
+    return len(files), 0
+
+def query_logs(log_path, log_filter, limit=200, cursor=None):
+    """
+    Returns up to ``limit`` matching log lines, newest first, across the active file and its
+    rotated backups, plus a cursor for the next (older) page, or None when exhausted.
+
+    Files are read backwards from the end, so a plain tail only touches the last blocks. Level,
+    logger and time-range filters consult an in-memory offset index (built once per file and
+    extended as the active file grows) to skip blocks that cannot match.
+    """
+    files = log_files(log_path)
+    _prune_indexes(files)
+    first, end = 0, None
+    if cursor:
+        first, end = _decode_cursor(cursor, files)
+
+    lines = []
+    for position in range(first, len(files)):
+        path = files[position]
+        file_end = end if position == first and end is not None else os.path.getsize(path)
+        with open(path, 'rb') as f:
+            for start, range_end in _candidate_ranges(path, log_filter, file_end):
+                for offset, raw in _lines_backwards(f, start, range_end):
+                    line = raw.decode('utf-8', errors='replace')
+                    if not log_filter.matches(line, _parse(line) if log_filter.uses_index else None):
+                        continue
+                    lines.append(line)
+                    if len(lines) == limit:
+                        return lines, _encode_cursor(path, offset)
+    return lines, None
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+class OnlineCorrelation:
+    """
+    Accumulates a Pearson correlation matrix over row chunks with memory proportional to the
+    square of the column count. Missing values are handled pairwise, matching DataFrame.corr().
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        # For each pair (i, j), statistics over the rows where both columns are present.
+        self.n = np.zeros((k, k))
+        self.sum = np.zeros((k, k))      # sum of x_i
+        self.sum_sq = np.zeros((k, k))   # sum of x_i^2
+        self.cross = np.zeros((k, k))    # sum of x_i * x_j
+
+    def update(self, chunk):
+        """Adds a chunk of rows. Columns are coerced to float64; unparseable values count as missing."""
+        values = chunk[self.columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        if self.shift is None:
+            # Shifting by a rough mean keeps the sums small and avoids catastrophic cancellation.
+            with np.errstate(invalid='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+        centered = np.where(present, values - self.shift, 0.0)
+        mask = present.astype(np.float64)
+
+        self.n += mask.T @ mask
+        self.sum += centered.T @ mask
+        self.sum_sq += (centered ** 2).T @ mask
+        self.cross += centered.T @ centered
+        return self
+
+    def result(self, min_periods=1):
+        """Returns the correlation matrix as a DataFrame, NaN where it is undefined."""
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * self.cross - self.sum * self.sum.T
+            var_i = n * self.sum_sq - self.sum ** 2
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        corr[(n < max(min_periods, 2)) | (var_i <= 0) | (var_j <= 0)] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        diagonal_defined = (np.diag(n) >= max(min_periods, 2)) & (np.diag(var_i) > 0)
+        np.fill_diagonal(corr, np.where(diagonal_defined, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+def streaming_correlation(chunks, columns):
+    """Computes the Pearson correlation of ``columns`` over an iterable of DataFrame chunks."""
+    accumulator = OnlineCorrelation(columns)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.result()
@@ -0,0 +1,109 @@
+import json
+import queue
+import logging
+import threading
+import time
+from collections import deque
+from itertools import count
+
+# Recent events kept for clients reconnecting with Last-Event-ID.
+HISTORY_SIZE = 500
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+class ProgressEvent:
+    __slots__ = ('id', 'topic', 'data')
+
+    def __init__(self, event_id, topic, data):
+        self.id = event_id
+        self.topic = topic
+        self.data = data
+
+    def to_sse(self):
+        """Formats the event as a server-sent events message."""
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: {self.topic}\ndata: {payload}\n\n"
+
+class Subscription:
+    """A subscriber's queue of events. Iterate with get(); call close() when done."""
+
+    def __init__(self, broker, topics=None):
+        self.broker = broker
+        self.topics = set(topics) if topics else None
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def accepts(self, event):
+        return self.topics is None or event.topic in self.topics
+
+    def get(self, timeout=None):
+        """Returns the next event, or None if none arrived within ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class EventBroker:
+    """
+    In-process publish/subscribe hub. Worker threads publish task progress; each SSE
+    connection holds a Subscription. Only reaches subscribers in the same process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._ids = count(1)
+
+    def publish(self, topic, **data):
+        """Publishes an event to every subscriber of ``topic``. Never blocks the publisher."""
+        data.setdefault('timestamp', time.time())
+        with self._lock:
+            event = ProgressEvent(next(self._ids), topic, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.accepts(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # A stalled client must not hold back workers; it is dropped and will reconnect.
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+                logging.warning("Dropped a progress event subscriber whose queue was full.")
+        return event
+
+    def subscribe(self, topics=None, last_event_id=None):
+        """
+        Registers a subscriber. With ``last_event_id``, events published after that ID that
+        are still in the history are replayed first.
+        """
+        subscription = Subscription(self, topics)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event.id > last_event_id and subscription.accepts(event):
+                        subscription.queue.put_nowait(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+broker = EventBroker()
+
+def publish_conversion_progress(task, stage=None, progress=None, **extra):
+    """Publishes a ConversionTask's current status, with an optional stage name and 0-1 progress."""
+    broker.publish('conversion', task_id=task.id, status=task.status, stage=stage, progress=progress, **extra)
+
+def publish_analysis_progress(task_id, status, stage=None, progress=None, **extra):
+    """Publishes an analysis job's status, with an optional stage name and 0-1 progress."""
+    broker.publish('analysis', task_id=task_id, status=status, stage=stage, progress=progress, **extra)
+
+def publish_weather_progress(job_id, status, progress=None, **extra):
+    """Publishes the status of a weather backfill job, with optional 0-1 progress."""
+    broker.publish('weather', task_id=job_id, status=status, progress=progress, **extra)
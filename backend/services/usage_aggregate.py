@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+楼栋用水量的可合并累加器
+
+每个 UsageAggregate 按 (星期, 小时) 单元保存记录数、总和与平方和，
+按 0.001 T 的精度保存用水量取值计数（稀疏直方图），并保存 日期 × 小时 的日用水曲线。
+两个累加器可以直接合并，因此追加新数据时只需处理新增记录，
+统计量、高峰时段、图表与报告都可以由累加器重新生成，而无需重新读取历史CSV。
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+VALUE_RESOLUTION = 0.001  # 与 data_extractor 导出时 round(..., 3) 的精度一致
+N_WEEKDAYS = 7
+N_HOURS = 24
+N_CELLS = N_WEEKDAYS * N_HOURS
+
+# 每个 (星期, 小时) 单元对应的星期 (1-7)、小时 (0-23) 以及是否周末
+CELL_WEEKDAY = np.repeat(np.arange(1, N_WEEKDAYS + 1), N_HOURS)
+CELL_HOUR = np.tile(np.arange(N_HOURS), N_WEEKDAYS)
+CELL_IS_WEEKEND = np.isin(CELL_WEEKDAY, [6, 7])
+CELL_ALL = np.zeros(N_CELLS, dtype=np.int64)
+
+SUMMARY_COLUMNS = ['count', 'sum', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def read_usage_csv(file_path):
+    """读取 data_extractor 导出的楼栋CSV，并统一用水量列名与日期类型。"""
+    df = pd.read_csv(file_path, encoding='utf-8')
+    if '水流量' in df.columns and '用水量' not in df.columns:
+        df = df.rename(columns={'水流量': '用水量'})
+    df['日期'] = pd.to_datetime(df['日期'], format='%Y%m%d')
+    return df
+
+
+def _date_codes(dates):
+    """将日期序列转换为 YYYYMMDD 形式的整数编码。"""
+    dates = pd.to_datetime(dates)
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).to_numpy(dtype=np.int64)
+
+
+def _combine_hist(cells, codes, counts):
+    """合并相同 (单元, 取值) 的计数，返回按 (单元, 取值) 排序的稀疏直方图。"""
+    if len(cells) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    order = np.lexsort((codes, cells))
+    cells, codes, counts = cells[order], codes[order], counts[order]
+    boundary = np.ones(len(cells), dtype=bool)
+    boundary[1:] = (cells[1:] != cells[:-1]) | (codes[1:] != codes[:-1])
+    starts = np.flatnonzero(boundary)
+    return cells[starts], codes[starts], np.add.reduceat(counts, starts)
+
+
+def _combine_codes(codes, counts):
+    """合并相同取值的计数，返回按取值排序的 (codes, counts)。"""
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    return unique_codes, np.bincount(inverse, weights=counts, minlength=len(unique_codes)).astype(np.int64)
+
+
+def hist_quantiles(codes, counts, qs):
+    """由排好序的取值计数计算分位数，插值方式与 pandas 的 linear 一致。"""
+    cumulative = np.cumsum(counts)
+    positions = np.asarray(qs, dtype=float) * (cumulative[-1] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    lower_values = codes[np.searchsorted(cumulative, lower, side='right')]
+    upper_values = codes[np.searchsorted(cumulative, upper, side='right')]
+    return (lower_values + (upper_values - lower_values) * (positions - lower)) * VALUE_RESOLUTION
+
+
+def moments_to_mean_std(count, total, total_sq):
+    """由记录数、总和与平方和计算均值与样本标准差 (ddof=1)，可用于任意形状的数组。"""
+    count = np.asarray(count, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(count > 0, total / count, np.nan)
+        var = np.where(count > 1, (total_sq - total * mean) / (count - 1), np.nan)
+    return mean, np.sqrt(np.clip(var, 0, None))
+
+
+class UsageAggregate:
+    """
+    单个楼栋（或多个楼栋合并后）用水量的可合并累加器。
+    """
+
+    def __init__(self, building, count=None, total=None, total_sq=None,
+                 hist_cells=None, hist_codes=None, hist_counts=None,
+                 dates=None, daily_sum=None, daily_count=None):
+        self.building = building
+        self.count = np.zeros(N_CELLS, dtype=np.int64) if count is None else np.asarray(count, dtype=np.int64)
+        self.total = np.zeros(N_CELLS) if total is None else np.asarray(total, dtype=float)
+        self.total_sq = np.zeros(N_CELLS) if total_sq is None else np.asarray(total_sq, dtype=float)
+        self.hist_cells = np.zeros(0, dtype=np.int64) if hist_cells is None else np.asarray(hist_cells, dtype=np.int64)
+        self.hist_codes = np.zeros(0, dtype=np.int64) if hist_codes is None else np.asarray(hist_codes, dtype=np.int64)
+        self.hist_counts = np.zeros(0, dtype=np.int64) if hist_counts is None else np.asarray(hist_counts, dtype=np.int64)
+        self.dates = np.zeros(0, dtype=np.int64) if dates is None else np.asarray(dates, dtype=np.int64)
+        self.daily_sum = np.zeros((0, N_HOURS)) if daily_sum is None else np.asarray(daily_sum, dtype=float)
+        self.daily_count = np.zeros((0, N_HOURS), dtype=np.int64) if daily_count is None else np.asarray(daily_count, dtype=np.int64)
+
+    def __repr__(self):
+        return f'<UsageAggregate {self.building} ({self.total_count} records)>'
+
+    # --- 构建与合并 ---
+
+    @classmethod
+    def from_frame(cls, df, building):
+        """由楼栋用水数据 (日期, 星期, 小时, 用水量) 一次性构建累加器。"""
+        df = df.dropna(subset=['用水量'])
+        df = df[df['小时'].between(0, N_HOURS - 1)]
+        if df.empty:
+            return cls(building)
+
+        hours = df['小时'].to_numpy(dtype=np.int64)
+        weekdays = df['星期'].to_numpy(dtype=np.int64)
+        # 星期缺失 (data_extractor 中记为0) 时由日期推算
+        fallback = df['日期'].dt.dayofweek.to_numpy(dtype=np.int64) + 1
+        weekdays = np.where((weekdays >= 1) & (weekdays <= N_WEEKDAYS), weekdays, fallback)
+        values = df['用水量'].to_numpy(dtype=float)
+
+        cells = (weekdays - 1) * N_HOURS + hours
+        count = np.bincount(cells, minlength=N_CELLS)
+        total = np.bincount(cells, weights=values, minlength=N_CELLS)
+        total_sq = np.bincount(cells, weights=values ** 2, minlength=N_CELLS)
+
+        codes = np.rint(values / VALUE_RESOLUTION).astype(np.int64)
+        hist_cells, hist_codes, hist_counts = _combine_hist(cells, codes, np.ones(len(codes), dtype=np.int64))
+
+        dates, date_index = np.unique(_date_codes(df['日期']), return_inverse=True)
+        slots = date_index * N_HOURS + hours
+        daily_sum = np.bincount(slots, weights=values, minlength=len(dates) * N_HOURS).reshape(-1, N_HOURS)
+        daily_count = np.bincount(slots, minlength=len(dates) * N_HOURS).reshape(-1, N_HOURS)
+
+        return cls(building, count, total, total_sq, hist_cells, hist_codes, hist_counts, dates, daily_sum, daily_count)
+
+    def merge(self, other, building=None):
+        """合并两个累加器，返回新的累加器（不修改自身）。"""
+        return UsageAggregate.merge_all([self, other], building if building is not None else self.building)
+
+    @classmethod
+    def merge_all(cls, aggregates, building):
+        """一次性合并任意多个累加器。"""
+        aggregates = list(aggregates)
+        if not aggregates:
+            return cls(building)
+        hist_cells, hist_codes, hist_counts = _combine_hist(
+            np.concatenate([a.hist_cells for a in aggregates]),
+            np.concatenate([a.hist_codes for a in aggregates]),
+            np.concatenate([a.hist_counts for a in aggregates]),
+        )
+        dates = np.unique(np.concatenate([a.dates for a in aggregates]))
+        daily_sum = np.zeros((len(dates), N_HOURS))
+        daily_count = np.zeros((len(dates), N_HOURS), dtype=np.int64)
+        for part in aggregates:
+            rows = np.searchsorted(dates, part.dates)
+            daily_sum[rows] += part.daily_sum
+            daily_count[rows] += part.daily_count
+
+        return cls(
+            building,
+            np.sum([a.count for a in aggregates], axis=0),
+            np.sum([a.total for a in aggregates], axis=0),
+            np.sum([a.total_sq for a in aggregates], axis=0),
+            hist_cells, hist_codes, hist_counts,
+            dates, daily_sum, daily_count,
+        )
+
+    def append_frame(self, df):
+        """
+        追加新数据，只处理累加器中尚未有记录的 (日期, 小时) 单元，避免重复转换同一时间段时重复计数；
+        上一份导出在某天中途结束时，下一份导出中当天剩余的小时仍会被追加。
+        返回 (新的累加器, 新增记录数, 跳过的重复记录数)。
+        """
+        codes = _date_codes(df['日期'])
+        hours = df['小时'].to_numpy(dtype=np.int64)
+        rows = np.searchsorted(self.dates, codes)
+        known = (rows < len(self.dates)) & (hours >= 0) & (hours < N_HOURS)
+        known[known] = self.dates[rows[known]] == codes[known]
+        covered = np.zeros(len(df), dtype=bool)
+        covered[known] = self.daily_count[rows[known], hours[known]] > 0
+
+        skipped = int(covered.sum())
+        new_rows = df[~covered]
+        if new_rows.empty:
+            return self, 0, skipped
+        addition = UsageAggregate.from_frame(new_rows, self.building)
+        return self.merge(addition), addition.total_count, skipped
+
+    # --- 持久化 ---
+
+    def save(self, path):
+        """以压缩的 .npz 格式原子写入磁盘。"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                building=np.array(self.building),
+                count=self.count, total=self.total, total_sq=self.total_sq,
+                hist_cells=self.hist_cells, hist_codes=self.hist_codes, hist_counts=self.hist_counts,
+                dates=self.dates, daily_sum=self.daily_sum, daily_count=self.daily_count,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                str(data['building']),
+                data['count'], data['total'], data['total_sq'],
+                data['hist_cells'], data['hist_codes'], data['hist_counts'],
+                data['dates'], data['daily_sum'], data['daily_count'],
+            )
+
+    # --- 派生统计量 ---
+
+    @property
+    def total_count(self):
+        return int(self.count.sum())
+
+    @property
+    def start_date(self):
+        return pd.to_datetime(str(self.dates[0]), format='%Y%m%d') if len(self.dates) else None
+
+    @property
+    def end_date(self):
+        return pd.to_datetime(str(self.dates[-1]), format='%Y%m%d') if len(self.dates) else None
+
+    def summarize(self, *labels):
+        """
+        按单元标签分组汇总，labels 为一个或多个长度为 N_CELLS 的数组（值为 None/NaN 的单元不参与统计）。
+        返回包含 count, sum, mean, std, min, 25%, 50%, 75%, max 的 DataFrame，结果与 pandas 的 agg/describe 一致。
+        """
+        keys = [pd.Series(label).to_numpy() for label in labels]
+        moments = pd.DataFrame({'count': self.count, 'sum': self.total, 'sum_sq': self.total_sq}).groupby(keys).sum()
+        moments = moments[moments['count'] > 0]
+        mean, std = moments_to_mean_std(moments['count'].to_numpy(), moments['sum'].to_numpy(), moments['sum_sq'].to_numpy())
+        summary = pd.DataFrame({'count': moments['count'], 'sum': moments['sum'], 'mean': mean, 'std': std}, index=moments.index)
+
+        hist = pd.DataFrame({f'k{i}': key[self.hist_cells] for i, key in enumerate(keys)})
+        key_names = list(hist.columns)
+        hist['code'] = self.hist_codes
+        hist['n'] = self.hist_counts
+        hist = hist.groupby(key_names + ['code'])['n'].sum().reset_index()
+        quantiles = {}
+        for group, part in hist.groupby(key_names if len(key_names) > 1 else key_names[0]):
+            codes, counts = part['code'].to_numpy(), part['n'].to_numpy()
+            quantiles[group] = [codes[0] * VALUE_RESOLUTION, *hist_quantiles(codes, counts, [0.25, 0.5, 0.75]), codes[-1] * VALUE_RESOLUTION]
+        quantiles = pd.DataFrame.from_dict(quantiles, orient='index', columns=['min', '25%', '50%', '75%', 'max'])
+        if isinstance(summary.index, pd.MultiIndex):
+            quantiles.index = pd.MultiIndex.from_tuples(quantiles.index)
+        summary = summary.join(quantiles)
+        summary.index.names = [None] * summary.index.nlevels
+        return summary[SUMMARY_COLUMNS]
+
+    def _value_codes(self, cell_mask=None):
+        if cell_mask is None:
+            selected = np.ones(len(self.hist_cells), dtype=bool)
+        else:
+            selected = np.asarray(cell_mask)[self.hist_cells]
+        return _combine_codes(self.hist_codes[selected], self.hist_counts[selected])
+
+    def value_histogram(self, cell_mask=None):
+        """返回指定单元范围内的用水量取值及其计数 (values, counts)，按取值排序。"""
+        codes, counts = self._value_codes(cell_mask)
+        return codes * VALUE_RESOLUTION, counts
+
+    def box_stats(self, whis=1.5, max_fliers=200, seed=42):
+        """计算 Axes.bxp 所需的箱线图统计量，须线规则与 matplotlib boxplot 相同，异常点最多保留 max_fliers 个。"""
+        codes, counts = self._value_codes()
+        if not len(codes):
+            return None
+        values = codes * VALUE_RESOLUTION
+        q1, med, q3 = hist_quantiles(codes, counts, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        inside = (values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)
+        outside_values, outside_counts = values[~inside], counts[~inside]
+        if outside_counts.sum() > max_fliers:
+            rng = np.random.default_rng(seed)
+            fliers = rng.choice(outside_values, size=max_fliers, p=outside_counts / outside_counts.sum())
+        else:
+            fliers = np.repeat(outside_values, outside_counts)
+        return {
+            'label': self.building,
+            'q1': q1,
+            'med': med,
+            'q3': q3,
+            'whislo': values[inside].min() if inside.any() else q1,
+            'whishi': values[inside].max() if inside.any() else q3,
+            'fliers': fliers,
+        }
+
+    def daily_profiles(self):
+        """日期 × 小时 的平均用水量曲线，缺失的小时填0（与 pivot_table(fill_value=0) 一致）。"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profiles = np.where(self.daily_count > 0, self.daily_sum / self.daily_count, 0.0)
+        index = pd.to_datetime(self.dates.astype(str), format='%Y%m%d')
+        return pd.DataFrame(profiles, index=pd.Index(index, name='日期'), columns=pd.Index(range(N_HOURS), name='小时'))
+
+    def hourly_series(self):
+        """有记录的每个 (日期, 小时) 的平均用水量，返回按时间排序的 (时间, 小时, 用水量) 长表。"""
+        date_idx, hours = np.nonzero(self.daily_count > 0)
+        dates = pd.to_datetime(self.dates[date_idx].astype(str), format='%Y%m%d')
+        return pd.DataFrame({
+            '时间': dates + pd.to_timedelta(hours, unit='h'),
+            '小时': hours,
+            '用水量': self.daily_sum[date_idx, hours] / self.daily_count[date_idx, hours],
+        })
+
+
+def stack_moments(aggregates):
+    """将多个累加器的单元矩堆叠为 (楼栋数, N_CELLS) 的数组，便于对所有楼栋做向量化计算。"""
+    names = [aggregate.building for aggregate in aggregates]
+    count = np.vstack([aggregate.count for aggregate in aggregates]) if aggregates else np.zeros((0, N_CELLS), dtype=np.int64)
+    total = np.vstack([aggregate.total for aggregate in aggregates]) if aggregates else np.zeros((0, N_CELLS))
+    total_sq = np.vstack([aggregate.total_sq for aggregate in aggregates]) if aggregates else np.zeros((0, N_CELLS))
+    return names, count, total, total_sq
@@ -19,17 +19,34 @@ from collections import Counter
 from flask import current_app
 import matplotlib.font_manager as fm
 
+from .usage_aggregate import (
+    UsageAggregate, read_usage_csv, stack_moments, moments_to_mean_std,
+    CELL_HOUR, CELL_WEEKDAY, CELL_IS_WEEKEND, CELL_ALL, N_HOURS,
+)
+
+# 楼栋对齐到气温的用水小时占比低于该值时，不参与气温敏感性分析
+MIN_WEATHER_MATCH_RATE = 0.5
+
 class WaterHabitAnalyzer:
     """
     用水习惯分析器 - Web服务版
+
+    所有统计量均由各楼栋的可合并累加器 (UsageAggregate) 计算。既可以从CSV文件构建累加器，
+    也可以通过 building_aggregates 直接传入已持久化的累加器，从而无需重新读取历史数据。
+    传入 weather（包含 timestamp、temperature 列的逐小时天气）时，还会分析各楼栋用水量对气温的敏感性。
     """
     
-    def __init__(self, data_folder, filenames):
+    def __init__(self, data_folder=None, filenames=None, building_aggregates=None, weather=None):
         self.data_folder = data_folder
-        self.filenames = filenames
-        self.buildings_data = {}
-        self.combined_data = None
+        self.filenames = filenames or []
+        self.building_aggregates = {}
+        self.combined_aggregate = None
+        self.weather = None
         self.analysis_results = {}
+        if building_aggregates:
+            self.set_aggregates(building_aggregates)
+        if weather is not None:
+            self.set_weather(weather)
         self._configure_matplotlib()
         
     def _configure_matplotlib(self):
@@ -80,28 +97,34 @@ class WaterHabitAnalyzer:
             return None
 
     def load_data(self):
-        all_dfs = []
         csv_files = [os.path.join(self.data_folder, f) for f in self.filenames]
         if not csv_files:
             raise FileNotFoundError("没有提供任何数据文件。")
 
+        aggregates = []
         for file_path in csv_files:
             building_name = os.path.basename(file_path).replace('.csv', '').replace('_水流量数据', '')
-            df = pd.read_csv(file_path, encoding='utf-8')
-            df['日期'] = pd.to_datetime(df['日期'], format='%Y%m%d')
-            df['datetime'] = df['日期'] + pd.to_timedelta(df['小时'], unit='h')
-            df['月份'] = df['日期'].dt.month
-            df['日'] = df['日期'].dt.day
-            df['是否周末'] = df['星期'].isin([6, 7])
-            if '水流量' in df.columns and '用水量' not in df.columns:
-                 df.rename(columns={'水流量': '用水量'}, inplace=True)
-            df['时间段'] = df['小时'].apply(self._get_time_period)
-            df['楼栋'] = building_name
-            all_dfs.append(df)
-            self.buildings_data[building_name] = df
-        
-        if all_dfs:
-            self.combined_data = pd.concat(all_dfs, ignore_index=True)
+            aggregates.append(UsageAggregate.from_frame(read_usage_csv(file_path), building_name))
+        self.set_aggregates(aggregates)
+
+    def set_aggregates(self, aggregates):
+        """设置参与分析的楼栋累加器，同名楼栋会被合并。"""
+        grouped = {}
+        for aggregate in aggregates:
+            grouped.setdefault(aggregate.building, []).append(aggregate)
+        self.building_aggregates = {
+            building: parts[0] if len(parts) == 1 else UsageAggregate.merge_all(parts, building)
+            for building, parts in sorted(grouped.items())
+        }
+        self.combined_aggregate = UsageAggregate.merge_all(self.building_aggregates.values(), '全部楼栋')
+
+    def set_weather(self, weather):
+        """设置逐小时天气（timestamp、temperature 两列），缺少气温的小时被丢弃，同一时刻只保留最后一条。"""
+        weather = pd.DataFrame(weather, columns=['timestamp', 'temperature'])
+        weather['timestamp'] = pd.to_datetime(weather['timestamp'])
+        weather['temperature'] = pd.to_numeric(weather['temperature'], errors='coerce')
+        weather = weather.dropna().drop_duplicates('timestamp', keep='last').sort_values('timestamp')
+        self.weather = weather.rename(columns={'timestamp': '时间', 'temperature': '气温'}).reset_index(drop=True)
 
     def _get_time_period(self, hour):
         if 6 <= hour < 12: return '上午'
@@ -118,7 +141,8 @@ class WaterHabitAnalyzer:
         return img_str
 
     def analyze_hourly_patterns(self):
-        hourly_stats = self.combined_data.groupby('小时')['用水量'].agg(['mean', 'std', 'median', 'max', 'count']).round(4)
+        hourly_stats = self.combined_aggregate.summarize(CELL_HOUR).rename(columns={'50%': 'median'})
+        hourly_stats = hourly_stats[['mean', 'std', 'median', 'max', 'count']].round(4).rename_axis('小时')
         hourly_mean = hourly_stats['mean']
         peak_threshold = hourly_mean.mean() + hourly_mean.std()
         peak_hours = hourly_mean[hourly_mean > peak_threshold].index.tolist()
@@ -142,7 +166,7 @@ class WaterHabitAnalyzer:
             height = bar.get_height()
             if hourly_stats.index[i] in peak_hours:
                 axes[0, 0].text(bar.get_x() + bar.get_width()/2., height, f'{height:.3f}', ha='center', va='bottom', fontweight='bold', color='red')
-        building_hourly = self.combined_data.groupby(['楼栋', '小时'])['用水量'].mean().unstack(fill_value=0)
+        building_hourly = self._get_building_hourly_matrix().fillna(0)
         sns.heatmap(building_hourly, ax=axes[0, 1], cmap='YlOrRd', cbar_kws={'label': '用水量 (T)'}, annot=False)
         axes[0, 1].set_title('各楼栋每小时用水量热力图', fontsize=14, fontweight='bold')
         axes[0, 1].set_xlabel('小时')
@@ -168,12 +192,18 @@ class WaterHabitAnalyzer:
         return self._save_plot_to_base64(fig)
     
     def analyze_weekly_patterns(self):
-        daily_stats = self.combined_data.groupby('星期')['用水量'].agg(['mean', 'std', 'median', 'sum', 'count']).round(4)
-        weekday_data = self.combined_data[~self.combined_data['是否周末']]['用水量']
-        weekend_data = self.combined_data[self.combined_data['是否周末']]['用水量']
-        weekday_stats = weekday_data.describe()
-        weekend_stats = weekend_data.describe()
-        t_stat, p_value = stats.ttest_ind(weekday_data, weekend_data, equal_var=False)
+        daily_stats = self.combined_aggregate.summarize(CELL_WEEKDAY).rename(columns={'50%': 'median'})
+        daily_stats = daily_stats[['mean', 'std', 'median', 'sum', 'count']].round(4).rename_axis('星期')
+        describe_fields = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        split_stats = self.combined_aggregate.summarize(CELL_IS_WEEKEND).reindex([False, True])
+        split_stats['count'] = split_stats['count'].fillna(0)
+        weekday_stats = split_stats.loc[False, describe_fields]
+        weekend_stats = split_stats.loc[True, describe_fields]
+        t_stat, p_value = stats.ttest_ind_from_stats(
+            weekday_stats['mean'], weekday_stats['std'], weekday_stats['count'],
+            weekend_stats['mean'], weekend_stats['std'], weekend_stats['count'],
+            equal_var=False,
+        )
         self.analysis_results['daily_stats'] = daily_stats
         self.analysis_results['weekday_stats'] = weekday_stats
         self.analysis_results['weekend_stats'] = weekend_stats
@@ -194,10 +224,14 @@ class WaterHabitAnalyzer:
         for bar in bars:
             height = bar.get_height()
             axes[0, 0].text(bar.get_x() + bar.get_width()/2., height, f'{height:.3f}', ha='center', va='bottom')
-        weekday_data = self.combined_data[~self.combined_data['是否周末']]['用水量']
-        weekend_data = self.combined_data[self.combined_data['是否周末']]['用水量']
-        sns.histplot(weekday_data, bins=50, alpha=0.7, label='工作日', ax=axes[0, 1], kde=True)
-        sns.histplot(weekend_data, bins=50, alpha=0.7, label='周末', ax=axes[0, 1], kde=True)
+        distributions = self._compute_distribution_curves([
+            self.combined_aggregate.value_histogram(~CELL_IS_WEEKEND),
+            self.combined_aggregate.value_histogram(CELL_IS_WEEKEND),
+        ])
+        for label, (edges, counts, kde_x, kde_y) in zip(['工作日', '周末'], distributions):
+            _, _, patches = axes[0, 1].hist(edges[:-1], bins=edges, weights=counts, alpha=0.7, label=label)
+            if kde_x is not None:
+                axes[0, 1].plot(kde_x, kde_y, color=patches[0].get_facecolor(), alpha=1.0, linewidth=1.5)
         axes[0, 1].set_title('工作日vs周末用水量分布', fontsize=14, fontweight='bold')
         axes[0, 1].legend()
         axes[1, 0].plot(range(7), daily_stats['mean'].reindex(range(1,8)).fillna(0).values, 'o-', linewidth=2, markersize=8, color='green')
@@ -228,9 +262,47 @@ class WaterHabitAnalyzer:
         plt.tight_layout(rect=[0, 0, 1, 0.96])
         return self._save_plot_to_base64(fig)
     
+    def _compute_distribution_curves(self, histograms, bins=50, grid_points=200):
+        """
+        为多组 (取值, 计数) 直方图计算共享分箱的直方图与KDE曲线，开销不随原始记录数增长。
+
+        直方图通过 np.histogram 在统一分箱上计算；KDE 在 grid_points 个细分箱上做分箱估计，
+        带宽按 Scott 规则取原始记录数，并按 "计数 × 分箱宽度" 缩放，与 seaborn histplot(kde=True) 的显示方式一致。
+        返回与 histograms 对应的 (edges, counts, kde_x, kde_y) 列表，数据不足时 kde_x/kde_y 为 None。
+        """
+        non_empty = [values for values, counts in histograms if len(values)]
+        if not non_empty:
+            edges = np.linspace(0, 1, bins + 1)
+            return [(edges, np.zeros(bins), None, None) for _ in histograms]
+
+        low = min(values.min() for values in non_empty)
+        high = max(values.max() for values in non_empty)
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        bin_width = edges[1] - edges[0]
+        grid_edges = np.linspace(low, high, grid_points + 1)
+        grid = (grid_edges[:-1] + grid_edges[1:]) / 2
+
+        results = []
+        for values, weights in histograms:
+            counts, _ = np.histogram(values, bins=edges, weights=weights)
+            kde_x, kde_y = None, None
+            n = weights.sum()
+            if len(values) > 1 and n > 1:
+                grid_counts, _ = np.histogram(values, bins=grid_edges, weights=weights)
+                occupied = grid_counts > 0
+                if occupied.sum() > 1:
+                    kde = stats.gaussian_kde(grid[occupied], bw_method=n ** (-1 / 5), weights=grid_counts[occupied])
+                    kde_x, kde_y = grid, kde(grid) * n * bin_width
+            results.append((edges, counts, kde_x, kde_y))
+        return results
+
     def analyze_time_period_patterns(self):
-        period_stats = self.combined_data.groupby('时间段')['用水量'].agg(['mean', 'std', 'median', 'sum', 'count']).round(4)
-        period_weekday_weekend = self.combined_data.groupby(['时间段', '是否周末'])['用水量'].mean().unstack()
+        cell_periods = np.array([self._get_time_period(hour) for hour in CELL_HOUR])
+        period_stats = self.combined_aggregate.summarize(cell_periods).rename(columns={'50%': 'median'})
+        period_stats = period_stats[['mean', 'std', 'median', 'sum', 'count']].round(4).rename_axis('时间段')
+        period_weekday_weekend = self.combined_aggregate.summarize(cell_periods, CELL_IS_WEEKEND)['mean'].unstack()
         if not period_weekday_weekend.empty:
             period_weekday_weekend.columns = ['工作日', '周末']
         self.analysis_results['period_stats'] = period_stats
@@ -283,18 +355,77 @@ class WaterHabitAnalyzer:
         plt.tight_layout(rect=[0, 0, 1, 0.96])
         return self._save_plot_to_base64(fig)
 
+    def _get_building_moments(self):
+        """所有楼栋的 (星期, 小时) 单元矩，堆叠为 (楼栋数, 单元数) 的数组并缓存。"""
+        if 'building_moments' not in self.analysis_results:
+            self.analysis_results['building_moments'] = stack_moments(list(self.building_aggregates.values()))
+        return self.analysis_results['building_moments']
+
+    def _get_building_hourly_matrix(self):
+        """楼栋 × 小时 平均用水量矩阵，只计算一次并缓存在 analysis_results 中。缺失的小时为 NaN。"""
+        if 'building_hourly' not in self.analysis_results:
+            names, count, total, _ = self._get_building_moments()
+            hourly_count = count.reshape(len(names), -1, N_HOURS).sum(axis=1)
+            hourly_total = total.reshape(len(names), -1, N_HOURS).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                hourly_mean = np.where(hourly_count > 0, hourly_total / hourly_count, np.nan)
+            self.analysis_results['building_hourly'] = pd.DataFrame(hourly_mean, index=names, columns=range(N_HOURS))
+        return self.analysis_results['building_hourly']
+
     def analyze_building_differences(self):
-        building_stats = self.combined_data.groupby('楼栋')['用水量'].agg(['mean', 'std', 'median', 'max', 'sum', 'count']).round(4)
-        building_peak_hours = {}
-        for building, df in self.combined_data.groupby('楼栋'):
-            hourly_mean = df.groupby('小时')['用水量'].mean()
-            threshold = hourly_mean.mean() + hourly_mean.std()
-            peak_hours = hourly_mean[hourly_mean > threshold].index.tolist()
-            building_peak_hours[building] = peak_hours
+        building_stats = pd.DataFrame({
+            building: aggregate.summarize(CELL_ALL).iloc[0]
+            for building, aggregate in self.building_aggregates.items() if aggregate.total_count
+        }).T.rename(columns={'50%': 'median'})
+        building_stats = building_stats.reindex(columns=['mean', 'std', 'median', 'max', 'sum', 'count']).astype({'count': int}).round(4).rename_axis('楼栋')
+
+        # 基于楼栋×小时矩阵，按行一次性计算所有楼栋的高峰阈值与高峰掩码
+        building_hourly = self._get_building_hourly_matrix()
+        thresholds = building_hourly.mean(axis=1) + building_hourly.std(axis=1)
+        peak_mask = building_hourly.gt(thresholds, axis=0)
+        hours = building_hourly.columns.to_numpy()
+        building_peak_hours = {
+            building: hours[row].tolist()
+            for building, row in zip(peak_mask.index, peak_mask.to_numpy())
+            if building in building_stats.index
+        }
+
+        # 各楼栋工作日vs周末 Welch t检验：由同一组单元矩向量化计算
+        names, count, total, total_sq = self._get_building_moments()
+        weekday_n, weekend_n = count[:, ~CELL_IS_WEEKEND].sum(axis=1), count[:, CELL_IS_WEEKEND].sum(axis=1)
+        weekday_mean, weekday_std = moments_to_mean_std(weekday_n, total[:, ~CELL_IS_WEEKEND].sum(axis=1), total_sq[:, ~CELL_IS_WEEKEND].sum(axis=1))
+        weekend_mean, weekend_std = moments_to_mean_std(weekend_n, total[:, CELL_IS_WEEKEND].sum(axis=1), total_sq[:, CELL_IS_WEEKEND].sum(axis=1))
+        t_stats, p_values = stats.ttest_ind_from_stats(
+            weekday_mean, weekday_std, weekday_n, weekend_mean, weekend_std, weekend_n, equal_var=False,
+        )
+        building_weekday_weekend_test = pd.DataFrame({
+            '工作日均值': weekday_mean,
+            '周末均值': weekend_mean,
+            't_stat': t_stats,
+            'p_value': p_values,
+        }, index=names).loc[building_stats.index].round(4)
+
         self.analysis_results['building_stats'] = building_stats
         self.analysis_results['building_peak_hours'] = building_peak_hours
+        self.analysis_results['building_peak_mask'] = peak_mask
+        self.analysis_results['building_weekday_weekend_test'] = building_weekday_weekend_test
+        self.analysis_results['building_box_stats'] = self._compute_building_box_stats()
         return building_stats, building_peak_hours
 
+    def _compute_building_box_stats(self, whis=1.5, max_fliers=200):
+        """
+        由各楼栋的取值直方图计算箱线图统计量，供 Axes.bxp 直接绘制。
+
+        四分位数与须线的计算方式与 matplotlib boxplot 相同；异常点按固定随机种子最多保留
+        max_fliers 个，使绘图开销与内存不随数据量增长。
+        """
+        box_stats = {}
+        for building, aggregate in self.building_aggregates.items():
+            building_box = aggregate.box_stats(whis=whis, max_fliers=max_fliers)
+            if building_box is not None:
+                box_stats[building] = building_box
+        return box_stats
+
     def _plot_building_differences(self, building_stats, building_peak_hours):
         font_prop = self._get_font_prop()
         fig, axes = plt.subplots(2, 2, figsize=(16, 12))
@@ -306,24 +437,19 @@ class WaterHabitAnalyzer:
         axes[0, 0].set_title('各楼栋平均用水量对比', fontsize=14, fontweight='bold')
         axes[0, 0].tick_params(axis='x', rotation=45)
 
-        # 子图 2: 各楼栋用水量分布 (箱线图) - 增加更严格的数据验证
-        building_data_list = []
-        valid_building_labels = []
+        # 子图 2: 各楼栋用水量分布 (箱线图) - 使用预先计算的分位数统计量绘制
+        box_stats = self.analysis_results.get('building_box_stats')
+        if box_stats is None:
+            box_stats = self._compute_building_box_stats()
+        building_box_list = []
         for b in buildings:
-            # 确保楼栋数据存在，且 '用水量' 列存在且不为空
-            if b in self.buildings_data and '用水量' in self.buildings_data[b].columns:
-                # 移除NaN值并转换为numpy数组
-                data_series = self.buildings_data[b]['用水量'].dropna()
-                if not data_series.empty:
-                    building_data_list.append(data_series.values)
-                    valid_building_labels.append(b)
-                else:
-                    current_app.logger.warning(f"楼栋 '{b}' 的用水量数据为空或全是NaN，已在箱线图中跳过。")
+            if b in box_stats:
+                building_box_list.append(box_stats[b])
             else:
-                current_app.logger.warning(f"楼栋 '{b}' 的数据不存在或缺少'用水量'列，已在箱线图中跳过。")
+                current_app.logger.warning(f"楼栋 '{b}' 的用水量数据为空或全是NaN，已在箱线图中跳过。")
 
-        if building_data_list:
-            axes[0, 1].boxplot(building_data_list, labels=valid_building_labels, patch_artist=True)
+        if building_box_list:
+            axes[0, 1].bxp(building_box_list, patch_artist=True)
         else:
             axes[0, 1].text(0.5, 0.5, '无有效数据用于绘制箱线图', ha='center', va='center', fontproperties=font_prop)
         
@@ -336,9 +462,12 @@ class WaterHabitAnalyzer:
         axes[1, 0].tick_params(axis='x', rotation=45)
 
         # 子图 4: 各楼栋高峰时段分布 (热力图)
-        peak_hours_matrix = np.zeros((len(buildings), 24))
-        for i, building in enumerate(buildings):
-            if building in building_peak_hours:
+        peak_mask = self.analysis_results.get('building_peak_mask')
+        if peak_mask is not None:
+            peak_hours_matrix = peak_mask.reindex(index=buildings, columns=range(24), fill_value=False).to_numpy(dtype=float)
+        else:
+            peak_hours_matrix = np.zeros((len(buildings), 24))
+            for i, building in enumerate(buildings):
                 for hour in building_peak_hours.get(building, []):
                     peak_hours_matrix[i, hour] = 1
         im = axes[1, 1].imshow(peak_hours_matrix, cmap='Reds', aspect='auto')
@@ -379,7 +508,7 @@ class WaterHabitAnalyzer:
         return recommendations
 
     def perform_clustering(self):
-        daily_profiles = self.combined_data.pivot_table(index='日期', columns='小时', values='用水量', fill_value=0)
+        daily_profiles = self.combined_aggregate.daily_profiles()
         sse = {}
         optimal_k = 3
         if daily_profiles.shape[0] > 1:
@@ -434,6 +563,146 @@ class WaterHabitAnalyzer:
         plt.tight_layout(rect=[0, 0, 1, 0.95])
         return self._save_plot_to_base64(fig)
 
+    def _join_usage_weather(self, tolerance=pd.Timedelta(minutes=30)):
+        """
+        用 merge_asof 将所有楼栋的逐小时用水量与最近的整点天气对齐，返回包含 楼栋、时间、小时、用水量、气温
+        的长表；相差超过 tolerance 的小时气温为空。
+        """
+        frames = []
+        for building, aggregate in self.building_aggregates.items():
+            series = aggregate.hourly_series()
+            series.insert(0, '楼栋', building)
+            frames.append(series)
+        usage = pd.concat(frames, ignore_index=True).sort_values('时间', kind='stable')
+        return pd.merge_asof(usage, self.weather, on='时间', direction='nearest', tolerance=tolerance)
+
+    @staticmethod
+    def _grouped_regression(df, by, x, y):
+        """
+        对 df 按 by 分组，一次聚合 n、Σx、Σy、Σxy、Σx²、Σy² 后向量化地得到每组 y 对 x 的
+        最小二乘斜率、截距与相关系数。先减去全局均值，避免大数相减损失精度。
+        """
+        x_shift, y_shift = df[x].mean(), df[y].mean()
+        dx, dy = df[x] - x_shift, df[y] - y_shift
+        terms = pd.DataFrame({'x': dx, 'y': dy, 'xy': dx * dy, 'xx': dx * dx, 'yy': dy * dy, 'n': 1.0})
+        sums = terms.groupby(df[by], sort=True).sum()
+        n = sums['n']
+        sxy = sums['xy'] - sums['x'] * sums['y'] / n
+        sxx = sums['xx'] - sums['x'] ** 2 / n
+        syy = sums['yy'] - sums['y'] ** 2 / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (sxy / sxx).where(sxx > 0)
+            r = (sxy / np.sqrt(sxx * syy)).where((sxx > 0) & (syy > 0)).clip(-1, 1)
+        x_mean = sums['x'] / n + x_shift
+        y_mean = sums['y'] / n + y_shift
+        return pd.DataFrame({
+            'slope': slope, 'intercept': y_mean - slope * x_mean, 'r': r, 'n': n,
+            'x_mean': x_mean, 'y_mean': y_mean,
+        })
+
+    def analyze_temperature_sensitivity(self):
+        """
+        气温敏感性分析：将逐小时用水与逐小时天气对齐后，对所有楼栋一次分组计算
+        - 日均用水量对日均气温的回归斜率 (T/小时/°C)、相对敏感度 (%/°C)、相关系数及显著性；
+        - 扣除各楼栋每小时均值后的小时距平相关系数，反映同一时段内气温波动对用水的影响。
+        各楼栋的天气匹配率（对齐到气温的用水小时占比）记入 analysis_results['weather_match']，
+        匹配率低于 MIN_WEATHER_MATCH_RATE 的楼栋不参与分析。没有天气或没有楼栋达到匹配率时返回 None。
+        """
+        self.analysis_results['weather_match'] = None
+        if self.weather is None or self.weather.empty:
+            return None
+        joined = self._join_usage_weather()
+        matched = joined['气温'].notna()
+        match = pd.DataFrame({
+            '用水小时数': joined.groupby('楼栋').size(),
+            '匹配小时数': matched.groupby(joined['楼栋']).sum(),
+        })
+        match['匹配率'] = match['匹配小时数'] / match['用水小时数']
+        self.analysis_results['weather_match'] = {'rate': float(matched.mean()), 'by_building': match}
+
+        eligible = match.index[match['匹配率'] >= MIN_WEATHER_MATCH_RATE]
+        joined = joined[matched & joined['楼栋'].isin(eligible)].copy()
+        if joined.empty:
+            return None
+
+        joined['日期'] = joined['时间'].dt.normalize()
+        daily = joined.groupby(['楼栋', '日期'], sort=False)[['用水量', '气温']].mean().reset_index()
+        daily_fit = self._grouped_regression(daily, '楼栋', '气温', '用水量')
+
+        hourly_means = joined.groupby(['楼栋', '小时'])[['用水量', '气温']].transform('mean')
+        anomalies = pd.DataFrame({
+            '楼栋': joined['楼栋'],
+            '用水距平': joined['用水量'] - hourly_means['用水量'],
+            '气温距平': joined['气温'] - hourly_means['气温'],
+        })
+        hourly_fit = self._grouped_regression(anomalies, '楼栋', '气温距平', '用水距平')
+
+        dof = daily_fit['n'] - 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_stat = daily_fit['r'] * np.sqrt(dof / (1 - daily_fit['r'] ** 2))
+            relative = daily_fit['slope'] / daily_fit['y_mean'] * 100
+        p_value = pd.Series(2 * stats.t.sf(np.abs(t_stat), dof), index=daily_fit.index).where(dof > 0)
+
+        sensitivity = pd.DataFrame({
+            '斜率(T/小时/°C)': daily_fit['slope'],
+            '相对敏感度(%/°C)': relative.where(daily_fit['y_mean'] > 0),
+            '日相关系数': daily_fit['r'],
+            'p_value': p_value,
+            '小时距平相关系数': hourly_fit['r'],
+            '平均气温(°C)': daily_fit['x_mean'],
+            '天数': daily_fit['n'].astype(int),
+            '小时数': joined.groupby('楼栋').size(),
+            '匹配率': match['匹配率'].reindex(daily_fit.index),
+        }).rename_axis('楼栋')
+
+        self.analysis_results['temperature_sensitivity'] = sensitivity.round(4)
+        self.analysis_results['temperature_daily'] = daily
+        self.analysis_results['temperature_fit'] = daily_fit
+        return sensitivity
+
+    def _plot_temperature_sensitivity(self, sensitivity):
+        font_prop = self._get_font_prop()
+        daily = self.analysis_results['temperature_daily']
+        fit = self.analysis_results['temperature_fit']
+
+        match_rate = self.analysis_results['weather_match']['rate']
+        fig, axes = plt.subplots(1, 2, figsize=(18, 7))
+        fig.suptitle(f'气温与用水量关系分析（天气匹配率 {match_rate:.1%}）', fontsize=18, fontweight='bold', fontproperties=font_prop)
+
+        colors = plt.cm.tab10(np.linspace(0, 1, max(len(sensitivity), 1)))
+        for color, (building, group) in zip(colors, daily.groupby('楼栋', sort=True)):
+            axes[0].scatter(group['气温'], group['用水量'], s=18, alpha=0.6, color=color, label=building)
+            slope, intercept = fit.loc[building, ['slope', 'intercept']]
+            if pd.notna(slope):
+                x_line = np.array([group['气温'].min(), group['气温'].max()])
+                axes[0].plot(x_line, intercept + slope * x_line, color=color, linewidth=2)
+        axes[0].set_title('日均气温 vs 日均用水量（含线性拟合）', fontsize=14, fontproperties=font_prop)
+        axes[0].set_xlabel('日均气温 (°C)', fontproperties=font_prop)
+        axes[0].set_ylabel('日均用水量 (T/小时)', fontproperties=font_prop)
+        axes[0].legend(prop=font_prop, fontsize=9)
+        axes[0].grid(True, linestyle='--', alpha=0.6)
+
+        relative = sensitivity['相对敏感度(%/°C)'].fillna(0)
+        bars = axes[1].bar(relative.index, relative.values, color=np.where(relative.values < 0, '#4C72B0', '#C44E52'), alpha=0.8)
+        for bar, r in zip(bars, sensitivity['日相关系数']):
+            if pd.notna(r):
+                axes[1].annotate(f'r={r:.2f}', (bar.get_x() + bar.get_width() / 2, bar.get_height()),
+                                 ha='center', va='bottom' if bar.get_height() >= 0 else 'top', fontsize=9)
+        axes[1].axhline(0, color='black', linewidth=0.8)
+        axes[1].set_title('各楼栋相对气温敏感度', fontsize=14, fontproperties=font_prop)
+        axes[1].set_xlabel('楼栋', fontproperties=font_prop)
+        axes[1].set_ylabel('每升高1°C用水量变化 (%)', fontproperties=font_prop)
+        axes[1].tick_params(axis='x', rotation=45)
+        axes[1].grid(True, axis='y', linestyle='--', alpha=0.6)
+
+        for ax in axes:
+            for item in ([ax.title, ax.xaxis.label, ax.yaxis.label] + ax.get_xticklabels() + ax.get_yticklabels()):
+                if hasattr(item, 'set_fontproperties'):
+                    item.set_fontproperties(font_prop)
+
+        plt.tight_layout(rect=[0, 0, 1, 0.95])
+        return self._save_plot_to_base64(fig)
+
     def generate_analysis_report(self):
         """
         生成基于用户提供的模板的详细Markdown分析报告。
@@ -446,17 +715,20 @@ class WaterHabitAnalyzer:
         weekend_stats = self.analysis_results.get('weekend_stats')
         building_stats = self.analysis_results.get('building_stats')
         building_peak_hours = self.analysis_results.get('building_peak_hours', {})
+        building_weekday_weekend_test = self.analysis_results.get('building_weekday_weekend_test')
         pump_recommendations = self.analysis_results.get('pump_control_recommendations', {})
         p_value = self.analysis_results.get('weekday_weekend_test', {}).get('p_value', 1.0)
 
         # 准备报告中可能用到的变量，并设置默认值以防数据缺失
-        building_count = len(self.buildings_data)
-        start_date = self.combined_data['日期'].min().strftime('%Y-%m-%d') if not self.combined_data.empty else 'N/A'
-        end_date = self.combined_data['日期'].max().strftime('%Y-%m-%d') if not self.combined_data.empty else 'N/A'
-        record_count = len(self.combined_data)
-        mean_usage = self.combined_data['用水量'].mean() if not self.combined_data.empty else 0
-        max_usage = self.combined_data['用水量'].max() if not self.combined_data.empty else 0
-        zero_usage_ratio = (self.combined_data['用水量'] == 0).mean() * 100 if not self.combined_data.empty else 0
+        combined = self.combined_aggregate
+        building_count = len(self.building_aggregates)
+        record_count = combined.total_count
+        start_date = combined.start_date.strftime('%Y-%m-%d') if record_count else 'N/A'
+        end_date = combined.end_date.strftime('%Y-%m-%d') if record_count else 'N/A'
+        usage_values, usage_counts = combined.value_histogram()
+        mean_usage = combined.total.sum() / record_count if record_count else 0
+        max_usage = usage_values.max() if record_count else 0
+        zero_usage_ratio = usage_counts[usage_values == 0].sum() / record_count * 100 if record_count else 0
         
         peak_mean = hourly_stats.loc[peak_hours, 'mean'].mean() if hourly_stats is not None and peak_hours else 0
         non_peak_mean = hourly_stats.loc[~hourly_stats.index.isin(peak_hours), 'mean'].mean() if hourly_stats is not None else 0
@@ -475,6 +747,52 @@ class WaterHabitAnalyzer:
         p_test_result = '显著' if p_value < 0.05 else '不显著'
 
         building_peak_hours_str = "\n".join([f"- {building}: {', '.join(map(str, hours))}" for building, hours in building_peak_hours.items()])
+        if building_weekday_weekend_test is not None and not building_weekday_weekend_test.empty:
+            building_test_str = "\n".join([
+                f"- {building}: 工作日 {row['工作日均值']:.4f} / 周末 {row['周末均值']:.4f} T/小时，"
+                f"差异{'显著' if row['p_value'] < 0.05 else '不显著'} (p={row['p_value']:.4f})"
+                for building, row in building_weekday_weekend_test.iterrows()
+            ])
+        else:
+            building_test_str = "N/A"
+
+        temperature_sensitivity = self.analysis_results.get('temperature_sensitivity')
+        weather_match = self.analysis_results.get('weather_match')
+        if weather_match is not None:
+            match = weather_match['by_building']
+            match_str = (
+                f"**天气匹配率**: {weather_match['rate']:.1%}（{int(match['匹配小时数'].sum())}/{int(match['用水小时数'].sum())} "
+                f"个用水小时对齐到观测气温；匹配率低于 {MIN_WEATHER_MATCH_RATE:.0%} 的楼栋不参与分析）\n"
+                + "\n".join(f"- {building}: {row['匹配率']:.1%}" for building, row in match.iterrows())
+            )
+        if temperature_sensitivity is not None and not temperature_sensitivity.empty:
+            significant = temperature_sensitivity[temperature_sensitivity['p_value'] < 0.05]
+            temperature_str = "\n".join([
+                f"- {building}: 气温每升高1°C，日均用水量变化 {row['斜率(T/小时/°C)']:+.4f} T/小时"
+                f" ({row['相对敏感度(%/°C)']:+.2f}%)，日相关系数 r={row['日相关系数']:.3f}，"
+                f"{'显著' if row['p_value'] < 0.05 else '不显著'} (p={row['p_value']:.4f}, {row['天数']:.0f}天)"
+                for building, row in temperature_sensitivity.iterrows()
+            ])
+            temperature_section = f"""{match_str}
+
+### 6.1 各楼栋气温敏感度
+{temperature_str}
+
+### 6.2 敏感度统计
+```
+{temperature_sensitivity.to_string()}
+```
+- **日相关系数**: 日均用水量与日均气温的相关性
+- **小时距平相关系数**: 扣除各楼栋每小时平均水平后，气温波动与用水波动的相关性"""
+            temperature_finding = (
+                f"5. **气温影响**: {len(significant)}/{len(temperature_sensitivity)} 个楼栋的用水量与气温显著相关"
+            )
+        elif weather_match is not None:
+            temperature_section = f"{match_str}\n\n没有楼栋达到所需的天气匹配率，跳过气温敏感性分析。"
+            temperature_finding = ""
+        else:
+            temperature_section = "未获取到与分析时间范围对应的逐小时观测天气数据，跳过气温敏感性分析。"
+            temperature_finding = ""
 
         # 使用 f-string 和模板生成报告
         report = f"""
@@ -540,6 +858,9 @@ class WaterHabitAnalyzer:
 ### 4.2 各楼栋高峰时段
 {building_peak_hours_str}
 
+### 4.3 各楼栋工作日vs周末差异
+{building_test_str}
+
 ## 5. 增压泵控制建议
 
 ### 5.1 运行时间建议
@@ -559,21 +880,26 @@ class WaterHabitAnalyzer:
 - **成本节约**: 预计年节约电费 30-50%
 - **设备保护**: 减少无效运行，延长设备寿命
 
-## 6. 主要发现与结论
+## 6. 气温敏感性分析
+
+{temperature_section}
+
+## 7. 主要发现与结论
 
-### 6.1 主要发现
+### 7.1 主要发现
 1. **用水高峰集中**: 用水主要集中在 {', '.join(map(str, peak_hours))} 时段
 2. **工作日周末差异**: 工作日与周末用水模式存在{p_test_result}差异
 3. **楼栋差异明显**: 不同楼栋的用水习惯存在差异
 4. **节能潜力巨大**: 通过智能控制可实现显著节能效果
+{temperature_finding}
 
-### 6.2 应用价值
+### 7.2 应用价值
 1. **增压泵控制**: 为增压泵智能控制提供科学依据
 2. **热水系统优化**: 支持热水系统整体节能优化
 3. **运维管理**: 提升系统运维管理效率
 4. **成本控制**: 显著降低运行成本
 
-### 6.3 优化建议
+### 7.3 优化建议
 1. **数据扩充**: 收集更长时间跨度的数据
 2. **实时监控**: 建立实时数据监控系统
 3. **智能控制**: 开发智能控制算法
@@ -586,10 +912,17 @@ class WaterHabitAnalyzer:
         self.analysis_results['full_report'] = report
         return report
 
-    def run_complete_analysis(self):
-        self.load_data()
+    def run_complete_analysis(self, progress_callback=None):
+        """执行完整分析流程。progress_callback(stage, progress) 在每个阶段完成后被调用，progress 取值 0-1。"""
+        def report_progress(stage, progress):
+            if progress_callback is not None:
+                progress_callback(stage, progress)
+
+        if self.combined_aggregate is None:
+            self.load_data()
+        report_progress('load_data', 0.1)
         
-        if self.combined_data is None or self.combined_data.empty:
+        if self.combined_aggregate is None or self.combined_aggregate.total_count == 0:
             report_text = "错误: 未加载任何有效数据，无法进行分析。"
             return {"report": report_text, "charts": []}
 
@@ -597,22 +930,34 @@ class WaterHabitAnalyzer:
         
         hourly_stats, peak_hours, peak_threshold = self.analyze_hourly_patterns()
         charts.append({'title': '每小时用水模式分析', 'image_base64': self._plot_hourly_patterns(hourly_stats, peak_hours, peak_threshold)})
+        report_progress('hourly_patterns', 0.25)
         
         daily_stats, weekday_stats, weekend_stats = self.analyze_weekly_patterns()
         charts.append({'title': '每周用水模式分析', 'image_base64': self._plot_weekly_patterns(daily_stats, weekday_stats, weekend_stats)})
+        report_progress('weekly_patterns', 0.4)
 
         period_stats, period_weekday_weekend = self.analyze_time_period_patterns()
         charts.append({'title': '分时段用水模式分析', 'image_base64': self._plot_time_period_patterns(period_stats, period_weekday_weekend)})
+        report_progress('time_period_patterns', 0.55)
         
         building_stats, building_peak_hours = self.analyze_building_differences()
         charts.append({'title': '楼栋用水差异分析', 'image_base64': self._plot_building_differences(building_stats, building_peak_hours)})
+        report_progress('building_differences', 0.7)
 
         # NEW: Run pump control analysis
         self.analyze_pump_control()
+        report_progress('pump_control', 0.75)
 
         daily_profiles, optimal_k = self.perform_clustering()
         charts.append({'title': '典型日用水模式聚类', 'image_base64': self._plot_clustering_patterns(daily_profiles, optimal_k)})
+        report_progress('clustering', 0.85)
+
+        sensitivity = self.analyze_temperature_sensitivity()
+        if sensitivity is not None:
+            charts.append({'title': '气温与用水量关系分析', 'image_base64': self._plot_temperature_sensitivity(sensitivity)})
+        report_progress('temperature_sensitivity', 0.9)
 
         report = self.generate_analysis_report()
+        report_progress('report', 1.0)
         
         return {"report": report, "charts": charts}
\ No newline at end of file
@@ -0,0 +1,158 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app
+
+# Weather API URLs from APISpace
+HOURLY_WEATHER_URL = "https://eolink.o.apispace.com/456456/weather/v001/hour"
+CITY_SEARCH_URL = "https://eolink.o.apispace.com/456456/function/v001/city"
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+DEFAULT_HOURLY_TTL = 600
+DEFAULT_SEARCH_TTL = 24 * 3600
+CACHE_MAX_ENTRIES = 1024
+
+class WeatherAPIError(Exception):
+    """The upstream failed or answered with an error; ``status`` is the HTTP status to return."""
+
+    def __init__(self, msg, status=502):
+        super().__init__(msg)
+        self.status = status
+
+class APISpaceUpstream:
+    """
+    Calls the APISpace weather API over a pooled requests.Session with timeouts and retries of
+    transient failures. Any object with the same search_city()/hourly() methods returning the
+    decoded JSON payload can replace it, e.g. a local stub in tests.
+    """
+
+    def __init__(self, api_key, timeout=DEFAULT_TIMEOUT, pool_size=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['X-APISpace-Token'] = api_key or ''
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _get(self, url, params):
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            raise WeatherAPIError(f"Error calling weather API: {e}")
+        except ValueError:
+            raise WeatherAPIError("Weather API returned an invalid response")
+        logging.info(f"Weather API {url} answered {response.status_code} in {time.perf_counter() - started:.2f}s")
+        return data
+
+    def search_city(self, location):
+        return self._get(CITY_SEARCH_URL, {"location": location, "area": "china", "items": 10})
+
+    def hourly(self, areacode, hours):
+        return self._get(HOURLY_WEATHER_URL, {"areacode": areacode, "hours": hours})
+
+class _Call:
+    """A request in flight that identical concurrent requests wait on."""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class WeatherClient:
+    """
+    Weather lookups with a TTL cache and single-flight coalescing: concurrent identical requests
+    share one upstream call. Only successful answers are cached.
+    """
+
+    def __init__(self, upstream, hourly_ttl=DEFAULT_HOURLY_TTL, search_ttl=DEFAULT_SEARCH_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.upstream = upstream
+        self.hourly_ttl = hourly_ttl
+        self.search_ttl = search_ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, ttl, fetch):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fetch()
+            with self._lock:
+                self._cache[key] = (time.monotonic() + ttl, call.value)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def search_city(self, city_name):
+        """Returns the APISpace area list matching ``city_name``."""
+        def fetch():
+            data = self.upstream.search_city(city_name)
+            if data.get("status") == 0 and "areaList" in data:
+                return data["areaList"]
+            raise WeatherAPIError(data.get("message", "Failed to find city."), status=500)
+        return self._cached(('search', city_name), self.search_ttl, fetch)
+
+    def hourly(self, areacode, hours=24):
+        """Returns the hourly forecast of ``areacode`` for the next ``hours`` hours."""
+        def fetch():
+            data = self.upstream.hourly(areacode, hours)
+            if data.get("status") == 0 and "result" in data:
+                return data["result"]
+            raise WeatherAPIError(data.get("message", "Failed to fetch weather data from external source."), status=500)
+        return self._cached(('hourly', areacode, hours), self.hourly_ttl, fetch)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+def get_weather_client(app=None):
+    """
+    Returns the application's WeatherClient, creating it on first use. Its upstream is
+    ``WEATHER_UPSTREAM`` from the config when set (e.g. a stub in tests), else APISpace.
+    """
+    app = app or current_app._get_current_object()
+    client = app.extensions.get('weather_client')
+    if client is None:
+        config = app.config
+        upstream = config.get('WEATHER_UPSTREAM') or APISpaceUpstream(
+            config.get('API_SPACES_API_KEY'), timeout=config.get('WEATHER_TIMEOUT', DEFAULT_TIMEOUT)
+        )
+        client = app.extensions['weather_client'] = WeatherClient(
+            upstream,
+            hourly_ttl=config.get('WEATHER_HOURLY_TTL', DEFAULT_HOURLY_TTL),
+            search_ttl=config.get('WEATHER_SEARCH_TTL', DEFAULT_SEARCH_TTL)
+        )
+    return client
@@ -0,0 +1,284 @@
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+
+import httpx
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from ..extensions import db
+from ..models.weather import WeatherHourly
+from .progress_events import publish_weather_progress
+
+# Open-Meteo's reanalysis archive: observed hourly weather by coordinates, no API key. The
+# APISpace API behind /api/weather/hourly only serves forecasts, so it cannot fill history.
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+ARCHIVE_TIMEZONE = 'Asia/Shanghai'
+# Archive variable -> WeatherHourly column
+ARCHIVE_VARIABLES = {'temperature_2m': 'temperature', 'relative_humidity_2m': 'humidity', 'precipitation': 'precipitation'}
+OBSERVED = 'observed'
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE_PER_SECOND = 5.0
+MAX_ATTEMPTS = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+TIME_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M')
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_time(value):
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    return None
+
+def parse_archive_records(payload):
+    """
+    Converts an Open-Meteo archive payload into row dicts, one per hour. Hours without a
+    parseable time or with every variable null (not published yet) are skipped; repeated
+    hours keep the last value.
+    """
+    hourly = (payload or {}).get('hourly') or {}
+    columns = {field: hourly.get(name) or [] for name, field in ARCHIVE_VARIABLES.items()}
+    rows = {}
+    for i, value in enumerate(hourly.get('time') or []):
+        timestamp = _parse_time(value)
+        if timestamp is None:
+            continue
+        values = {field: _to_float(column[i]) if i < len(column) else None for field, column in columns.items()}
+        if all(v is None for v in values.values()):
+            continue
+        rows[timestamp] = dict(timestamp=timestamp, source=OBSERVED, **values)
+    return list(rows.values())
+
+def store_hourly(areacode, rows):
+    """
+    Upserts hourly rows of one areacode, deduplicated on (areacode, timestamp): hours already
+    stored are updated with the newer values. The caller commits.
+
+    Returns:
+        tuple[int, int]: (inserted, updated)
+    """
+    if not rows:
+        return 0, 0
+    timestamps = [row['timestamp'] for row in rows]
+    existing = {
+        record.timestamp: record for record in WeatherHourly.query.filter(
+            WeatherHourly.areacode == areacode,
+            WeatherHourly.timestamp.between(min(timestamps), max(timestamps))
+        )
+    }
+    inserted = updated = 0
+    for row in rows:
+        record = existing.get(row['timestamp'])
+        if record is None:
+            db.session.add(WeatherHourly(areacode=areacode, **row))
+            inserted += 1
+        else:
+            for field, value in row.items():
+                setattr(record, field, value)
+            updated += 1
+    return inserted, updated
+
+def find_gaps(areacode, start, end):
+    """
+    Hour ranges in [start, end) without a stored observed hour of ``areacode``, as
+    (gap_start, gap_end) pairs with gap_end exclusive, oldest first. ``start`` is floored to
+    the hour.
+    """
+    start = pd.Timestamp(start).floor('h')
+    expected = pd.date_range(start, end, freq='h', inclusive='left')
+    stored = db.session.query(WeatherHourly.timestamp).filter(
+        WeatherHourly.areacode == areacode,
+        WeatherHourly.source == OBSERVED,
+        WeatherHourly.timestamp >= start.to_pydatetime(),
+        WeatherHourly.timestamp < end
+    )
+    missing = expected.difference(pd.DatetimeIndex([timestamp for (timestamp,) in stored]))
+    if missing.empty:
+        return []
+    breaks = np.flatnonzero(np.diff(missing.asi8) != pd.Timedelta(hours=1).value)
+    firsts, lasts = np.r_[0, breaks + 1], np.r_[breaks, len(missing) - 1]
+    return [
+        (missing[first].to_pydatetime(), (missing[last] + pd.Timedelta(hours=1)).to_pydatetime())
+        for first, last in zip(firsts, lasts)
+    ]
+
+def query_history(areacode, start, end):
+    """Stored hours of ``areacode`` with start <= timestamp < end, oldest first."""
+    return WeatherHourly.query.filter(
+        WeatherHourly.areacode == areacode,
+        WeatherHourly.timestamp >= start,
+        WeatherHourly.timestamp < end
+    ).order_by(WeatherHourly.timestamp).all()
+
+def load_temperature_frame(areacode, start, end):
+    """
+    Stored observed hourly temperatures of ``areacode`` with start <= timestamp < end as a
+    DataFrame with ``timestamp`` and ``temperature`` columns, oldest first. Forecast rows are
+    left out. Only those two columns are selected, so long ranges stay cheap to load.
+    """
+    rows = db.session.query(WeatherHourly.timestamp, WeatherHourly.temperature).filter(
+        WeatherHourly.areacode == areacode,
+        WeatherHourly.source == OBSERVED,
+        WeatherHourly.timestamp >= start,
+        WeatherHourly.timestamp < end,
+        WeatherHourly.temperature.isnot(None)
+    ).order_by(WeatherHourly.timestamp).all()
+    return pd.DataFrame(rows, columns=['timestamp', 'temperature'])
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across all tasks of an event loop."""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def _fetch_archive(http, limiter, url, params):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        await limiter.wait()
+        try:
+            response = await http.get(url, params=params)
+        except httpx.TransportError as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            logging.warning(f"Weather archive request {params} failed ({e}); retrying.")
+            await asyncio.sleep(2 ** (attempt - 1))
+            continue
+        if response.status_code in RETRY_STATUSES and attempt < MAX_ATTEMPTS:
+            retry_after = _to_float(response.headers.get('Retry-After'))
+            await asyncio.sleep(retry_after if retry_after is not None else 2 ** (attempt - 1))
+            continue
+        if response.status_code == 400:
+            # Open-Meteo explains rejected parameters in 'reason'
+            raise ValueError(response.json().get('reason', 'Weather archive rejected the request'))
+        response.raise_for_status()
+        return response.json()
+
+def _gap_params(coordinates, gap, timezone):
+    latitude, longitude = coordinates
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'start_date': gap[0].date().isoformat(),
+        'end_date': (gap[1] - pd.Timedelta(hours=1)).date().isoformat(),
+        'hourly': ','.join(ARCHIVE_VARIABLES),
+        'timezone': timezone,
+    }
+
+async def _backfill(plans, url, timezone, concurrency, rate_per_second, transport, on_result):
+    limiter = RateLimiter(rate_per_second)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=3.05), limits=limits, transport=transport) as http:
+        async def run(areacode, coordinates, gaps):
+            rows = []
+            try:
+                for gap in gaps:
+                    async with semaphore:
+                        payload = await _fetch_archive(http, limiter, url, _gap_params(coordinates, gap, timezone))
+                    # The archive answers whole days; only the missing hours are kept
+                    rows += [row for row in parse_archive_records(payload) if gap[0] <= row['timestamp'] < gap[1]]
+                return areacode, rows, None
+            except Exception as e:
+                return areacode, None, e
+
+        tasks = [run(areacode, coordinates, gaps) for areacode, (coordinates, gaps) in plans.items()]
+        for finished in asyncio.as_completed(tasks):
+            on_result(*(await finished))
+
+def backfill_weather(areacodes, start, end, concurrency=None, rate_per_second=None, transport=None, job_id=None):
+    """
+    Fills the observed hourly weather of many areacodes for [start, end) from the Open-Meteo
+    archive, at the coordinates configured in WEATHER_AREA_COORDINATES. Only gaps (hours
+    without an observed row) are requested, so re-running a backfill is cheap and idempotent.
+    Areacodes are fetched concurrently with httpx, at most ``concurrency`` requests in flight
+    and ``rate_per_second`` request starts per second, retrying throttled and failed calls.
+    Each areacode's hours are stored as soon as they arrive. Pass an httpx transport (e.g.
+    httpx.MockTransport) to run against a local fake upstream. Requires an application context.
+
+    Returns:
+        dict: Per areacode, the number of gaps and of inserted and updated hours, or the error.
+    """
+    config = current_app.config
+    concurrency = concurrency or config.get('WEATHER_BACKFILL_CONCURRENCY', DEFAULT_CONCURRENCY)
+    rate_per_second = rate_per_second or config.get('WEATHER_BACKFILL_RATE', DEFAULT_RATE_PER_SECOND)
+    coordinates = config.get('WEATHER_AREA_COORDINATES') or {}
+    areacodes = list(dict.fromkeys(areacodes))
+    summary, plans = {}, {}
+
+    def finish(areacode, counts):
+        summary[areacode] = counts
+        if job_id is not None:
+            publish_weather_progress(job_id, 'running', progress=len(summary) / len(areacodes),
+                                     areacode=areacode, **counts)
+
+    for areacode in areacodes:
+        if areacode not in coordinates:
+            finish(areacode, {'error': 'No coordinates configured in WEATHER_AREA_COORDINATES'})
+            continue
+        gaps = find_gaps(areacode, start, end)
+        if gaps:
+            plans[areacode] = (coordinates[areacode], gaps)
+        else:
+            finish(areacode, {'gaps': 0, 'inserted': 0, 'updated': 0})
+
+    def on_result(areacode, rows, error):
+        if error is not None:
+            logging.error(f"Weather backfill for areacode {areacode} failed: {error}")
+            finish(areacode, {'error': str(error)})
+            return
+        try:
+            inserted, updated = store_hourly(areacode, rows)
+            db.session.commit()
+            finish(areacode, {'gaps': len(plans[areacode][1]), 'inserted': inserted, 'updated': updated})
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Storing weather for areacode {areacode} failed: {e}", exc_info=True)
+            finish(areacode, {'error': str(e)})
+
+    if plans:
+        asyncio.run(_backfill(
+            plans, config.get('WEATHER_ARCHIVE_URL', ARCHIVE_URL), config.get('WEATHER_ARCHIVE_TIMEZONE', ARCHIVE_TIMEZONE),
+            concurrency, rate_per_second, transport, on_result
+        ))
+    failed = sum('error' in counts for counts in summary.values())
+    logging.info(f"Weather backfill finished for {len(areacodes)} areacodes ({failed} failed).")
+    if job_id is not None:
+        publish_weather_progress(job_id, 'failed' if failed == len(areacodes) else 'completed',
+                                 progress=1.0, failed=failed)
+    return summary
+
+def start_backfill_job(areacodes, start, end, job_id):
+    """Runs backfill_weather() in a background thread with its own application context."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                backfill_weather(areacodes, start, end, transport=app.config.get('WEATHER_BACKFILL_TRANSPORT'), job_id=job_id)
+            except Exception as e:
+                logging.error(f"Weather backfill job {job_id} failed: {e}", exc_info=True)
+                publish_weather_progress(job_id, 'failed', error=str(e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask_jwt_extended import create_access_token
+
+from backend.app import create_app
+from backend.extensions import db as _db
+from backend.models.user import User
+from backend.models.dataset import Dataset
+from backend.models.conversion import ConversionTask, ConvertedDataset
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a throwaway SQLite database whose project root (logs, aggregates, caches) is tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_app()
+    app.config.update(
+        TESTING=True, UPLOAD_FOLDER=str(tmp_path / 'uploads'), GENERATED_FILES_FOLDER=str(tmp_path / 'generated_files')
+    )
+    # Folders derived from the project root resolve under tmp_path instead of the checkout
+    app.root_path = str(tmp_path / 'backend')
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(db):
+    user = User(username='admin', email='admin@example.com', role='admin')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(admin):
+    return {'Authorization': f'Bearer {create_access_token(identity=admin.id)}'}
+
+
+def make_usage_frame(start='2025-04-01', days=14, seed=0):
+    """Hourly usage rows shaped like a data_extractor CSV after read_usage_csv."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(start, periods=days * 24, freq='h')
+    return pd.DataFrame({
+        '日期': timestamps.normalize(),
+        '星期': timestamps.dayofweek + 1,
+        '小时': timestamps.hour,
+        '用水量': np.round(rng.gamma(2.0, 0.4, len(timestamps)), 3),
+    })
+
+
+def write_usage_csv(path, **kwargs):
+    """Writes make_usage_frame(**kwargs) as a data_extractor CSV and returns the frame."""
+    frame = make_usage_frame(**kwargs)
+    csv_frame = frame.assign(日期=frame['日期'].dt.strftime('%Y%m%d'))
+    csv_frame.to_csv(path, index=False, encoding='utf-8')
+    return frame
+
+
+@pytest.fixture
+def usage_frame():
+    return make_usage_frame()
+
+
+@pytest.fixture
+def converted_dataset_factory(db, admin, tmp_path):
+    """Creates ConvertedDatasets backed by a usage CSV, each under a new conversion task unless one is given."""
+    def create(name='1栋', task=None, status='completed', **frame_kwargs):
+        if task is None:
+            original = Dataset(name='flow.xlsx', file_path='flow.xlsx', file_size=1, user_id=admin.id)
+            db.session.add(original)
+            db.session.flush()
+            task = ConversionTask(original_dataset_id=original.id, status=status)
+            db.session.add(task)
+            db.session.flush()
+        folder = tmp_path / 'converted_datasets' / str(task.id)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f'{name}.csv'
+        write_usage_csv(path, **frame_kwargs)
+        converted = ConvertedDataset(name=name, file_path=str(path), file_size=path.stat().st_size, task_id=task.id)
+        db.session.add(converted)
+        db.session.commit()
+        return converted
+    return create
+
+
+@pytest.fixture
+def inline_tasks(monkeypatch):
+    """Runs run_governed() targets in the test process, against the test app and database."""
+    from backend.core import task_runner
+    monkeypatch.setattr(task_runner, '_process_context', lambda: None)
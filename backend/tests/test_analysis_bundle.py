@@ -0,0 +1,48 @@
+import io
+import tempfile
+import zipfile
+
+import pytest
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    folder = tmp_path / 'tmp'
+    folder.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(folder))
+    return folder
+
+
+def test_bundle_is_built_in_a_task_process_and_streamed(client, auth_headers, converted_dataset_factory, temp_dir):
+    dataset = converted_dataset_factory('1栋', days=21)
+
+    response = client.get(f'/api/analysis/datasets/{dataset.id}/bundle', headers=auth_headers)
+    body = response.data
+    response.close()
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert "filename*=UTF-8''1%E6%A0%8B_analysis_results.zip" in response.headers['Content-Disposition']
+    with zipfile.ZipFile(io.BytesIO(body)) as bundle:
+        entries = {info.filename: info for info in bundle.infolist()}
+        assert sorted(entries) == ['analysis_report.txt', 'clustering_patterns.png', 'hourly_patterns.png', 'weekly_patterns.png']
+        # PNGs are stored, the report is deflated
+        assert entries['hourly_patterns.png'].compress_type == zipfile.ZIP_STORED
+        assert entries['analysis_report.txt'].compress_type == zipfile.ZIP_DEFLATED
+        assert '用水习惯分析报告 - 1栋' in bundle.read('analysis_report.txt').decode('utf-8')
+    assert list(temp_dir.glob('analysis_bundle_*')) == []
+
+
+def test_bundle_reports_unreadable_data(client, auth_headers, converted_dataset_factory, temp_dir, inline_tasks):
+    dataset = converted_dataset_factory('1栋')
+    with open(dataset.file_path, 'w', encoding='utf-8') as f:
+        f.write('a,b\n1,2\n')
+
+    response = client.get(f'/api/analysis/datasets/{dataset.id}/bundle', headers=auth_headers)
+
+    assert response.status_code == 422
+    assert list(temp_dir.glob('analysis_bundle_*')) == []
+
+
+def test_bundle_of_unknown_dataset(client, auth_headers):
+    assert client.get('/api/analysis/datasets/missing/bundle', headers=auth_headers).status_code == 404
@@ -0,0 +1,24 @@
+import pytest
+
+from backend.routes import analysis
+
+
+def test_datasets_are_listed_page_by_page(client, auth_headers, converted_dataset_factory, monkeypatch):
+    completed = [converted_dataset_factory(name=f'{n}栋', days=2) for n in range(5)]
+    converted_dataset_factory(name='pending', status='processing', days=2)
+    monkeypatch.setattr(analysis, 'DATASETS_PAGE_SIZE', 2)
+
+    ids, offset = [], 0
+    while offset is not None:
+        page = client.get(f'/api/analysis/datasets?offset={offset}', headers=auth_headers).get_json()
+        assert page['total'] == 5 and page['limit'] == 2 and len(page['items']) <= 2
+        ids += [item['id'] for item in page['items']]
+        offset = page['next_offset']
+
+    # Newest conversion task first
+    assert ids == [ds.id for ds in reversed(completed)]
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=501', 'offset=-1'])
+def test_datasets_reject_out_of_range_pages(client, auth_headers, query):
+    assert client.get(f'/api/analysis/datasets?{query}', headers=auth_headers).status_code == 400
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models.analysis import AnalysisResult
+from backend.models.conversion import ConversionTask
+from backend.models.dataset import Dataset
+
+
+@pytest.fixture
+def results(db, admin):
+    dataset = Dataset(name='flow.xlsx', file_path='flow.xlsx', file_size=1, user_id=admin.id)
+    db.session.add(dataset)
+    db.session.flush()
+    tasks = [ConversionTask(original_dataset_id=dataset.id, status='completed') for _ in range(2)]
+    db.session.add_all(tasks)
+    db.session.flush()
+    created = datetime(2025, 4, 1)
+    rows = []
+    for n in range(7):
+        # Pairs of results share a timestamp, so the id breaks the ties
+        rows.append(AnalysisResult(
+            id=f'{n:02d}-result', name=f'分析 {n}' + (' 50%_off' if n == 3 else ''),
+            task_id=tasks[n % 2].id, created_at=created + timedelta(minutes=n // 2)
+        ))
+    db.session.add_all(rows)
+    db.session.commit()
+    return tasks, rows
+
+
+def _pages(client, headers, query=''):
+    pages, cursor = [], None
+    while True:
+        url = f'/api/analysis/history?limit=2{query}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append([item['id'] for item in body['items']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_history_pages_cover_every_result_once_newest_first(client, auth_headers, results):
+    pages = _pages(client, auth_headers)
+    assert pages == [['06-result', '05-result'], ['04-result', '03-result'], ['02-result', '01-result'], ['00-result']]
+
+
+def test_history_cursor_is_stable_under_inserts(db, client, auth_headers, results):
+    tasks, _ = results
+    first = client.get('/api/analysis/history?limit=3', headers=auth_headers).get_json()
+    db.session.add(AnalysisResult(id='99-result', name='新分析', task_id=tasks[0].id, created_at=datetime(2025, 5, 1)))
+    db.session.commit()
+
+    second = client.get(f"/api/analysis/history?limit=3&cursor={first['next_cursor']}", headers=auth_headers).get_json()
+    assert [item['id'] for item in second['items']] == ['03-result', '02-result', '01-result']
+
+
+def test_history_filters(client, auth_headers, results):
+    tasks, _ = results
+    pages = _pages(client, auth_headers, f'&task_id={tasks[1].id}')
+    assert sum(pages, []) == ['05-result', '03-result', '01-result']
+    # % and _ are matched literally
+    assert _pages(client, auth_headers, '&name=50%25_OFF') == [['03-result']]
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=101', 'cursor=not-a-cursor', 'cursor=bm9waXBl'])
+def test_history_rejects_bad_pages(client, auth_headers, results, query):
+    assert client.get(f'/api/analysis/history?{query}', headers=auth_headers).status_code == 400
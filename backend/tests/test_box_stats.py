@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from matplotlib import cbook
+
+from backend.services.usage_aggregate import UsageAggregate
+from backend.services.water_habit_analysis import WaterHabitAnalyzer
+from .conftest import make_usage_frame
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_box_stats_match_matplotlib(seed):
+    frame = make_usage_frame(seed=seed)
+    box = UsageAggregate.from_frame(frame, 'A').box_stats(max_fliers=10_000)
+    expected, = cbook.boxplot_stats(frame['用水量'].to_numpy(), whis=1.5)
+    for key in ('q1', 'med', 'q3', 'whislo', 'whishi'):
+        assert box[key] == pytest.approx(expected[key])
+    np.testing.assert_allclose(np.sort(box['fliers']), np.sort(expected['fliers']))
+    assert box['label'] == 'A'
+
+
+def test_box_stats_cap_outliers():
+    frame = make_usage_frame(days=60)
+    box = UsageAggregate.from_frame(frame, 'A').box_stats(max_fliers=20)
+    expected, = cbook.boxplot_stats(frame['用水量'].to_numpy(), whis=1.5)
+    assert len(expected['fliers']) > 20
+    assert len(box['fliers']) == 20
+    assert set(np.round(box['fliers'], 3)) <= set(np.round(expected['fliers'], 3))
+    # A fixed seed keeps the chart stable between runs
+    np.testing.assert_array_equal(box['fliers'], UsageAggregate.from_frame(frame, 'A').box_stats(max_fliers=20)['fliers'])
+
+
+def test_building_box_stats_cover_buildings_with_data():
+    analyzer = WaterHabitAnalyzer(building_aggregates=[
+        UsageAggregate.from_frame(make_usage_frame(seed=3), '1栋'),
+        UsageAggregate.from_frame(make_usage_frame(seed=4), '2栋'),
+        UsageAggregate('空楼'),
+    ])
+    box_stats = analyzer._compute_building_box_stats()
+    assert sorted(box_stats) == ['1栋', '2栋']
+    analyzer.analyze_building_differences()
+    assert analyzer.analysis_results['building_box_stats'].keys() == box_stats.keys()
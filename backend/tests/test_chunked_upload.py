@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from backend.models.dataset import Dataset
+from backend.services import chunked_upload
+from backend.services.chunked_upload import MIN_CHUNK_SIZE, UploadError, append_chunk, partial_path
+
+CHUNK = MIN_CHUNK_SIZE
+
+
+@pytest.fixture
+def payload(tmp_path):
+    """A CSV a little over two chunks long."""
+    lines = ['日期,小时,用水量'] + [f'20250401,{n % 24},{n / 7:.3f}' for n in range(8000)]
+    data = ('\n'.join(lines) + '\n').encode('utf-8')
+    assert 2 * CHUNK < len(data) < 3 * CHUNK
+    return data
+
+
+def _start(client, headers, payload, sha256=None):
+    response = client.post('/api/datasets/uploads', headers=headers, json={
+        'filename': 'usage.csv', 'size': len(payload), 'chunk_size': CHUNK,
+        'sha256': sha256 or hashlib.sha256(payload).hexdigest()
+    })
+    assert response.status_code == 201
+    return response.get_json()['upload_id']
+
+
+def _put(client, headers, upload_id, payload, index):
+    return client.put(f'/api/datasets/uploads/{upload_id}/chunks/{index}', headers=headers,
+                      data=payload[index * CHUNK:(index + 1) * CHUNK])
+
+
+def test_upload_resumes_after_a_restart_and_verifies_the_hash(app, client, auth_headers, payload):
+    upload_id = _start(client, auth_headers, payload)
+    assert _put(client, auth_headers, upload_id, payload, 0).get_json()['received_chunks'] == 1
+
+    # A restarted server has lost the running hashes; the client asks where to resume
+    chunked_upload._hashers.clear()
+    status = client.get(f'/api/datasets/uploads/{upload_id}', headers=auth_headers).get_json()
+    assert status['received_chunks'] == 1 and status['total_chunks'] == 3
+
+    # A chunk re-sent after a dropped response is acknowledged without being stored twice
+    assert _put(client, auth_headers, upload_id, payload, 0).get_json()['duplicate'] is True
+    for index in (1, 2):
+        assert _put(client, auth_headers, upload_id, payload, index).get_json()['duplicate'] is False
+
+    response = client.post(f'/api/datasets/uploads/{upload_id}/complete', headers=auth_headers)
+    assert response.status_code == 201
+    dataset = Dataset.query.get(response.get_json()['id'])
+    assert dataset.content_hash == hashlib.sha256(payload).hexdigest()
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], dataset.file_path), 'rb') as f:
+        assert f.read() == payload
+    assert dataset.profile['row_count'] == 8000
+    assert client.get(f'/api/datasets/uploads/{upload_id}', headers=auth_headers).status_code == 404
+
+
+def test_chunks_must_arrive_in_order_and_complete(client, auth_headers, payload):
+    upload_id = _start(client, auth_headers, payload)
+    response = _put(client, auth_headers, upload_id, payload, 1)
+    assert response.status_code == 409 and response.get_json()['expected_chunk'] == 0
+
+    short = client.put(f'/api/datasets/uploads/{upload_id}/chunks/0', headers=auth_headers, data=payload[:100])
+    assert short.status_code == 400
+
+    _put(client, auth_headers, upload_id, payload, 0)
+    incomplete = client.post(f'/api/datasets/uploads/{upload_id}/complete', headers=auth_headers)
+    assert incomplete.status_code == 409 and incomplete.get_json()['expected_chunk'] == 1
+
+
+def test_checksum_mismatch_discards_the_upload(app, client, auth_headers, payload):
+    upload_id = _start(client, auth_headers, payload, sha256='0' * 64)
+    for index in range(3):
+        _put(client, auth_headers, upload_id, payload, index)
+
+    response = client.post(f'/api/datasets/uploads/{upload_id}/complete', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['sha256'] == hashlib.sha256(payload).hexdigest()
+    assert client.get(f'/api/datasets/uploads/{upload_id}', headers=auth_headers).status_code == 404
+    assert Dataset.query.count() == 0
+
+
+def test_interrupted_chunk_is_dropped_and_can_be_resent(app, client, auth_headers, payload):
+    upload_id = _start(client, auth_headers, payload)
+    _put(client, auth_headers, upload_id, payload, 0)
+    upload = chunked_upload.UploadSession.query.get(upload_id)
+    folder = app.config['UPLOAD_FOLDER']
+
+    with pytest.raises(UploadError) as excinfo:
+        append_chunk(upload, 1, io.BytesIO(payload[CHUNK:CHUNK + 1000]), CHUNK, folder)
+    assert excinfo.value.details == {'expected_chunk': 1}
+    assert os.path.getsize(partial_path(upload, folder)) == CHUNK
+
+    for index in (1, 2):
+        _put(client, auth_headers, upload_id, payload, index)
+    response = client.post(f'/api/datasets/uploads/{upload_id}/complete', headers=auth_headers)
+    assert response.status_code == 201
+    assert response.get_json()['content_hash'] == hashlib.sha256(payload).hexdigest()
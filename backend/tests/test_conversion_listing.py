@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models.conversion import ConversionTask
+from backend.models.dataset import Dataset
+from backend.routes import conversion
+
+NOW = datetime(2025, 4, 1, 12)
+
+
+@pytest.fixture
+def tasks(db, admin):
+    dataset = Dataset(name='flow.xlsx', file_path='flow.xlsx', file_size=1, user_id=admin.id)
+    db.session.add(dataset)
+    db.session.flush()
+    rows = [
+        ConversionTask(original_dataset_id=dataset.id, status='completed' if n % 2 else 'pending',
+                       created_at=NOW + timedelta(minutes=n), updated_at=NOW + timedelta(minutes=n))
+        for n in range(5)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def _get(client, headers, query='', **extra):
+    return client.get(f'/api/conversion/tasks{query}', headers={**headers, **extra})
+
+
+def test_listing_pages_newest_first(client, auth_headers, tasks):
+    body = _get(client, auth_headers, '?page=2&per_page=2').get_json()
+    assert [item['id'] for item in body['items']] == [tasks[2].id, tasks[1].id]
+    assert body['total'] == 5
+    assert body['since'] == (NOW + timedelta(minutes=4)).isoformat()
+
+    completed = _get(client, auth_headers, '?status=completed').get_json()
+    assert [item['id'] for item in completed['items']] == [tasks[3].id, tasks[1].id]
+
+
+def test_unchanged_listing_is_answered_with_304(db, client, auth_headers, tasks):
+    first = _get(client, auth_headers)
+    etag = first.headers['ETag']
+    assert _get(client, auth_headers, If_None_Match=etag).status_code == 304
+
+    tasks[0].status = 'failed'
+    tasks[0].updated_at = NOW + timedelta(hours=1)
+    db.session.commit()
+    changed = _get(client, auth_headers, If_None_Match=etag)
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+
+def test_since_returns_tasks_updated_after_the_cursor(db, client, auth_headers, tasks):
+    since = _get(client, auth_headers).get_json()['since']
+    tasks[0].status = 'completed'
+    tasks[0].updated_at = NOW + timedelta(hours=1)
+    db.session.commit()
+
+    body = _get(client, auth_headers, f'?since={since}').get_json()
+    # The overlap window re-sends the task updated just before the cursor; clients merge by id
+    assert [item['id'] for item in body['items']] == [tasks[0].id, tasks[4].id]
+    assert body['since'] == (NOW + timedelta(hours=1)).isoformat() and body['reset'] is False
+
+    assert _get(client, auth_headers, f"?since={body['since']}").get_json()['items'] == [
+        next(item for item in body['items'] if item['id'] == tasks[0].id)
+    ]
+
+
+def test_since_asks_for_a_reset_when_too_many_tasks_changed(client, auth_headers, tasks, monkeypatch):
+    monkeypatch.setattr(conversion, 'TASKS_MAX_PAGE_SIZE', 2)
+    body = _get(client, auth_headers, f'?per_page=2&since={(NOW - timedelta(days=1)).isoformat()}').get_json()
+    assert len(body['items']) == 2 and body['reset'] is True
+
+
+@pytest.mark.parametrize('query', ['?page=0', '?per_page=101', '?since=yesterday'])
+def test_listing_rejects_bad_parameters(client, auth_headers, query):
+    assert _get(client, auth_headers, query).status_code == 400
@@ -0,0 +1,78 @@
+import glob
+import os
+
+import pytest
+
+from backend.models.aggregate import BuildingAggregate
+from backend.models.conversion import ConversionTask, ConvertedDataset
+from backend.models.dataset import Dataset
+from backend.services import conversion_service
+from backend.services.aggregate_service import get_aggregates_folder
+from backend.services.usage_aggregate import UsageAggregate
+from .conftest import write_usage_csv
+
+
+@pytest.fixture
+def conversion_task(db, admin, monkeypatch):
+    def fake_extract(source, output_dir):
+        write_usage_csv(os.path.join(output_dir, '1栋.csv'), seed=1)
+        write_usage_csv(os.path.join(output_dir, '2栋.csv'), seed=2)
+        return True
+
+    monkeypatch.setattr(conversion_service, 'extract_water_flow_data', fake_extract)
+    dataset = Dataset(name='flow.xlsx', file_path='flow.xlsx', file_size=1, user_id=admin.id)
+    db.session.add(dataset)
+    db.session.commit()
+    task = ConversionTask(original_dataset_id=dataset.id, status='pending')
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+
+def run_conversion(app, db, task):
+    conversion_service.run_conversion_in_thread(app, task.id)
+    db.session.expire_all()
+    return db.session.get(ConversionTask, task.id)
+
+
+def test_conversion_stores_datasets_and_aggregates(app, db, conversion_task):
+    task = run_conversion(app, db, conversion_task)
+
+    assert task.status == 'completed'
+    datasets = ConvertedDataset.query.filter_by(task_id=task.id).order_by(ConvertedDataset.name).all()
+    assert [d.name for d in datasets] == ['1栋', '2栋']
+    assert all(os.path.exists(d.aggregate_path) for d in datasets)
+    buildings = {b.building: b for b in BuildingAggregate.query.all()}
+    assert sorted(buildings) == ['1栋', '2栋']
+    assert UsageAggregate.load(buildings['1栋'].file_path).total_count == 14 * 24
+
+
+def test_failed_partial_aggregate_leaves_no_orphan_file(app, db, conversion_task, monkeypatch):
+    def failing_build(converted_dataset, df=None):
+        converted_dataset.aggregate_path = os.path.join(get_aggregates_folder('datasets'), f'{converted_dataset.id}.npz')
+        UsageAggregate('x').save(converted_dataset.aggregate_path)
+        raise OSError('disk full')
+
+    monkeypatch.setattr(conversion_service, 'build_dataset_aggregate', failing_build)
+    task = run_conversion(app, db, conversion_task)
+
+    assert task.status == 'completed'
+    datasets = ConvertedDataset.query.filter_by(task_id=task.id).all()
+    assert len(datasets) == 2 and all(d.aggregate_path is None for d in datasets)
+    assert glob.glob(os.path.join(get_aggregates_folder('datasets'), '*.npz')) == []
+    assert BuildingAggregate.query.count() == 2
+
+
+def test_failed_building_aggregate_fails_task_but_keeps_datasets(app, db, conversion_task, monkeypatch):
+    def failing_update(building, csv_path, task_id=None, df=None):
+        raise RuntimeError('aggregate update failed')
+
+    monkeypatch.setattr(conversion_service, 'update_building_aggregate', failing_update)
+    task = run_conversion(app, db, conversion_task)
+
+    assert task.status == 'failed'
+    stored = ConvertedDataset.query.filter_by(task_id=task.id).all()
+    assert len(stored) == 1
+    # The committed dataset keeps its cached partial aggregate, nothing else is left behind
+    files = glob.glob(os.path.join(get_aggregates_folder('datasets'), '*.npz'))
+    assert files == [stored[0].aggregate_path]
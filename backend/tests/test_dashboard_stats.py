@@ -0,0 +1,67 @@
+from sqlalchemy import delete, update
+
+from backend.models.conversion import ConversionTask
+from backend.models.dataset import Dataset
+from backend.models.stats import DashboardCounter
+from backend.services.dashboard_stats import get_dashboard_stats, rebuild_dashboard_stats, VERSION_KEY
+
+
+def _add_dataset(db, admin, status='pending'):
+    dataset = Dataset(name='flow.xlsx', file_path='flow.xlsx', file_size=1, user_id=admin.id)
+    db.session.add(dataset)
+    db.session.flush()
+    db.session.add(ConversionTask(original_dataset_id=dataset.id, status=status))
+    db.session.commit()
+    return dataset
+
+
+def test_counters_follow_flushed_changes(db, admin):
+    rebuild_dashboard_stats()
+    dataset = _add_dataset(db, admin)
+    dataset.conversion_tasks[0].status = 'completed'
+    _add_dataset(db, admin)
+    db.session.commit()
+
+    stats = get_dashboard_stats()
+    assert stats['users'] == 1 and stats['datasets'] == 2 and stats['total_tasks'] == 2
+    assert stats['tasks_by_status'] == {'pending': 1, 'processing': 0, 'completed': 1, 'failed': 0}
+
+    db.session.delete(dataset)
+    db.session.commit()
+    assert get_dashboard_stats()['datasets'] == 1
+
+
+def test_counters_without_version_marker_are_rebuilt(db, admin):
+    # Deltas flushed into an unseeded table only cover rows added since
+    _add_dataset(db, admin)
+    assert db.session.get(DashboardCounter, VERSION_KEY) is None
+
+    stats = get_dashboard_stats()
+    assert stats['users'] == 1 and stats['datasets'] == 1 and stats['total_tasks'] == 1
+    assert db.session.get(DashboardCounter, VERSION_KEY) is not None
+
+
+def test_bulk_writes_invalidate_counters(db, admin):
+    for _ in range(3):
+        _add_dataset(db, admin)
+    rebuild_dashboard_stats()
+
+    db.session.execute(update(ConversionTask).values(status='failed'))
+    db.session.commit()
+    assert get_dashboard_stats()['tasks_by_status']['failed'] == 3
+
+    ConversionTask.query.filter(ConversionTask.status == 'failed').delete()
+    db.session.execute(delete(Dataset))
+    db.session.commit()
+    stats = get_dashboard_stats()
+    assert stats['datasets'] == 0 and stats['total_tasks'] == 0 and stats['tasks_by_status']['failed'] == 0
+
+
+def test_bulk_write_rolled_back_keeps_counters(db, admin):
+    _add_dataset(db, admin)
+    rebuild_dashboard_stats()
+
+    db.session.execute(delete(Dataset))
+    db.session.rollback()
+    assert db.session.get(DashboardCounter, VERSION_KEY) is not None
+    assert get_dashboard_stats()['datasets'] == 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models.dataset import Dataset
+
+
+@pytest.fixture
+def blob_dataset(app, db, admin):
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({
+        'flow': np.concatenate([rng.normal(1, 0.1, 300), rng.normal(5, 0.1, 200)]),
+        'pressure': np.concatenate([rng.normal(3, 0.1, 300), rng.normal(1, 0.1, 200)]),
+        'meter': 'A',
+    })
+    frame.loc[7, 'flow'] = np.nan
+    frame.to_csv(f"{app.config['UPLOAD_FOLDER']}/blobs.csv", index=False)
+    dataset = Dataset(name='blobs.csv', file_path='blobs.csv', file_size=1, user_id=admin.id)
+    db.session.add(dataset)
+    db.session.commit()
+    return dataset
+
+
+@pytest.mark.parametrize('minibatch', [False, True])
+def test_clustering_endpoint_and_label_pages(client, auth_headers, blob_dataset, inline_tasks, minibatch):
+    response = client.post(f'/api/datasets/{blob_dataset.id}/clustering', headers=auth_headers,
+                           json={'n_clusters': 2, 'minibatch': minibatch, 'batch_size': 64, 'job_id': 'clu-1'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['algorithm'] == ('MiniBatchKMeans' if minibatch else 'KMeans')
+    assert body['columns'] == ['flow', 'pressure']
+    assert sorted(body['counts']) == [200, 299]
+    assert body['n_unlabeled'] == 1
+    assert body['labels_url'] == '/api/analysis/jobs/clu-1/clusters/labels'
+
+    labels = []
+    offset = 0
+    while offset is not None:
+        page = client.get(f"{body['labels_url']}?offset={offset}&limit=200", headers=auth_headers).get_json()
+        assert page['total'] == 500
+        labels += page['labels']
+        offset = page['next_offset']
+    assert len(labels) == 500
+    assert labels[7] == -1
+    assert len(set(labels[:7] + labels[8:300])) == 1 and len(set(labels[300:])) == 1
+
+
+@pytest.mark.parametrize('params, message', [
+    ({'n_clusters': 1}, "'n_clusters' must be an integer between 2 and 50."),
+    ({'n_clusters': 'many'}, "'n_clusters' must be an integer"),
+    ({'batch_size': 0}, "'batch_size' must be an integer"),
+    ({'minibatch': 'yes'}, "'minibatch' must be true, false or null."),
+    ({'columns': ['meter']}, 'not numeric: meter'),
+])
+def test_clustering_rejects_invalid_parameters(client, auth_headers, blob_dataset, params, message):
+    response = client.post(f'/api/datasets/{blob_dataset.id}/clustering', headers=auth_headers, json=params)
+    assert response.status_code == 400
+    assert message in response.get_json()['msg']
+
+
+def test_labels_of_unknown_job(client, auth_headers):
+    assert client.get('/api/analysis/jobs/missing/clusters/labels', headers=auth_headers).status_code == 404
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models.dataset import Dataset
+from backend.services.online_correlation import streaming_correlation
+
+
+@pytest.fixture
+def meter_frame():
+    rng = np.random.default_rng(7)
+    flow = rng.gamma(2.0, 0.5, 5000)
+    frame = pd.DataFrame({
+        'flow': flow,
+        'pressure': 3 - 0.4 * flow + rng.normal(0, 0.2, len(flow)),
+        'temperature': rng.normal(55, 3, len(flow)),
+        'meter': rng.choice(['A', 'B'], len(flow)),
+    })
+    frame.loc[frame.sample(frac=0.05, random_state=1).index, 'temperature'] = np.nan
+    return frame
+
+
+@pytest.fixture
+def meter_dataset(app, db, admin, meter_frame):
+    path = f"{app.config['UPLOAD_FOLDER']}/meters.csv"
+    meter_frame.to_csv(path, index=False, sep=';', encoding='gb18030')
+    dataset = Dataset(name='meters.csv', file_path='meters.csv', file_size=1, user_id=admin.id)
+    db.session.add(dataset)
+    db.session.commit()
+    return dataset
+
+
+def test_streaming_correlation_matches_pandas(meter_frame):
+    numeric = ['flow', 'pressure', 'temperature']
+    chunks = (meter_frame.iloc[start:start + 700] for start in range(0, len(meter_frame), 700))
+    pd.testing.assert_frame_equal(streaming_correlation(chunks, numeric), meter_frame[numeric].corr())
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_correlation_endpoint(client, auth_headers, meter_dataset, meter_frame, inline_tasks, app, streaming):
+    app.config['CORRELATION_CHUNK_ROWS'] = 1000
+    response = client.post(f'/api/datasets/{meter_dataset.id}/correlation', headers=auth_headers,
+                           json={'streaming': streaming, 'job_id': 'corr-1'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['job_id'] == 'corr-1'
+    assert body['streaming'] is streaming
+    assert body['columns'] == ['flow', 'pressure', 'temperature']
+    expected = meter_frame[body['columns']].corr()
+    pd.testing.assert_frame_equal(pd.DataFrame(body['correlation_matrix']).loc[body['columns'], body['columns']], expected)
+
+
+@pytest.mark.parametrize('columns, message', [
+    (['flow', 'meter'], 'not numeric: meter'),
+    (['flow', 'level'], 'not found in the dataset: level'),
+    (['flow'], 'at least two numeric columns'),
+    ('flow', 'must be a list'),
+])
+def test_correlation_rejects_invalid_columns(client, auth_headers, meter_dataset, columns, message):
+    response = client.post(f'/api/datasets/{meter_dataset.id}/correlation', headers=auth_headers, json={'columns': columns})
+    assert response.status_code == 400
+    assert message in response.get_json()['msg']
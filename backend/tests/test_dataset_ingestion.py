@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from backend.services import dataset_ingestion
+from backend.services.dataset_ingestion import scan_csv
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        '楼栋': ['1栋', '2栋', '3栋'] * 400,
+        '用水量': [0.5, 1.25, 2.0] * 400,
+        '备注': ['正常', '含,逗号', '跨\n两行'] * 400,
+    })
+
+
+@pytest.fixture
+def no_file_reads_by_pandas(monkeypatch):
+    """Fails if the profile re-reads the file with pandas instead of using the scan's sample."""
+    read_csv = pd.read_csv
+
+    def guarded(source, *args, **kwargs):
+        assert not isinstance(source, str), 'the file was read a second time'
+        return read_csv(source, *args, **kwargs)
+
+    monkeypatch.setattr(dataset_ingestion.pd, 'read_csv', guarded)
+
+
+@pytest.mark.parametrize('encoding, expected, sep', [
+    ('utf-8', 'utf-8', ','),
+    ('utf-8-sig', 'utf-8-sig', ';'),
+    ('gb18030', 'gb18030', '\t'),
+])
+def test_scan_detects_format_and_profiles_in_one_pass(tmp_path, frame, no_file_reads_by_pandas, encoding, expected, sep):
+    path = tmp_path / 'usage.csv'
+    frame.to_csv(path, index=False, encoding=encoding, sep=sep)
+
+    profile = scan_csv(str(path))
+
+    assert (profile['encoding'], profile['delimiter']) == (expected, sep)
+    assert profile['row_count'] == len(frame)
+    assert profile['columns'] == ['楼栋', '用水量', '备注']
+    assert profile['dtypes'] == {'楼栋': 'object', '用水量': 'float64', '备注': 'object'}
+
+
+def test_utf8_files_skip_the_statistical_detector(tmp_path, frame, monkeypatch):
+    path = tmp_path / 'usage.csv'
+    frame.to_csv(path, index=False)
+    monkeypatch.setattr(dataset_ingestion, '_detect_encoding', lambda file_path: pytest.fail('detector ran'))
+    assert scan_csv(str(path))['encoding'] == 'utf-8'
+
+
+def test_blank_lines_are_not_counted(tmp_path):
+    path = tmp_path / 'usage.csv'
+    path.write_text('a,b\n1,2\n\n3,4\n\n', encoding='utf-8')
+    profile = scan_csv(str(path))
+    assert profile['row_count'] == len(pd.read_csv(path)) == 2
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_bytes(b'')
+    assert scan_csv(str(path))['row_count'] == 0
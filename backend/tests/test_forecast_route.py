@@ -0,0 +1,33 @@
+import pytest
+
+from backend.routes import analysis
+
+
+@pytest.mark.parametrize('order', [[1, 0], [1, 0, -1], [1, 'x', 0], [True, 0, 0], '1,0,0', [1, 0, 99]])
+def test_forecast_rejects_malformed_order(client, auth_headers, converted_dataset_factory, order):
+    dataset = converted_dataset_factory()
+    response = client.post('/api/analysis/forecast', headers=auth_headers,
+                           json={'dataset_ids': [dataset.id], 'order': order})
+    assert response.status_code == 400
+    assert "'order'" in response.get_json()['msg']
+
+
+def test_forecast_fits_fixed_order_with_capped_workers(app, client, auth_headers, converted_dataset_factory, monkeypatch):
+    dataset = converted_dataset_factory()
+    calls = []
+    real_forecast_many = analysis.forecast_many
+
+    def recording_forecast_many(*args, **kwargs):
+        calls.append(kwargs)
+        return real_forecast_many(*args, **kwargs)
+
+    monkeypatch.setattr(analysis, 'forecast_many', recording_forecast_many)
+    app.config['FORECAST_N_JOBS'] = 1
+    response = client.post('/api/analysis/forecast', headers=auth_headers,
+                           json={'dataset_ids': [dataset.id], 'order': [1, 0, 0], 'steps': 6, 'history': 72})
+
+    assert response.status_code == 200
+    forecast = response.get_json()['forecasts'][dataset.name]
+    assert forecast['order'] == [1, 0, 0]
+    assert len(forecast['forecast']) == 6
+    assert calls == [{'order': (1, 0, 0), 'history': 72, 'n_jobs': 1}]
@@ -0,0 +1,114 @@
+import json
+import logging
+import logging.handlers
+import os
+
+import pytest
+
+from backend.services import log_query
+from backend.services.log_query import LogFilter, LogQueryError, log_files, query_logs
+
+
+def _entry(n, level='INFO', name='app', message=None):
+    return json.dumps({'timestamp': 1_700_000_000 + n, 'level': level, 'name': name,
+                       'message': message or f'line {n}'}) + '\n'
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    # Small index blocks, so the filters have blocks to skip
+    monkeypatch.setattr(log_query, 'INDEX_BLOCK_SIZE', 512)
+    monkeypatch.setattr(log_query, '_indexes', {})
+    return str(tmp_path / 'app.log')
+
+
+def _write_rotated(log_path, per_file=30, files=3):
+    """Writes entries 0.. oldest first into app.log.<files-1> ... app.log."""
+    n = 0
+    for suffix in range(files - 1, -1, -1):
+        path = log_path if suffix == 0 else f'{log_path}.{suffix}'
+        with open(path, 'w') as f:
+            for _ in range(per_file):
+                f.write(_entry(n, level='ERROR' if n % 10 == 0 else 'INFO'))
+                n += 1
+    return n
+
+
+def _numbers(lines):
+    return [json.loads(line)['timestamp'] - 1_700_000_000 for line in lines]
+
+
+def _all_pages(log_path, log_filter, limit):
+    numbers, cursor = [], None
+    while True:
+        lines, cursor = query_logs(log_path, log_filter, limit=limit, cursor=cursor)
+        numbers += _numbers(lines)
+        if cursor is None:
+            return numbers
+
+
+def test_pages_run_newest_first_across_rotated_files(log_path):
+    total = _write_rotated(log_path)
+    with open(f'{log_path}.backup', 'w') as f:
+        f.write(_entry(999))
+    assert log_files(log_path) == [log_path, f'{log_path}.1', f'{log_path}.2']
+    assert _all_pages(log_path, LogFilter(), limit=7) == list(range(total - 1, -1, -1))
+
+
+def test_indexed_filters_match_a_full_scan(log_path):
+    _write_rotated(log_path)
+    errors = LogFilter(levels=['error'], since=1_700_000_015, until=1_700_000_075)
+    assert _all_pages(log_path, errors, limit=2) == [70, 60, 50, 40, 30, 20]
+    assert _numbers(query_logs(log_path, LogFilter(text='LINE 4'), limit=100)[0]) == [49, 48, 47, 46, 45, 44, 43, 42, 41, 40, 4]
+
+
+def test_cursor_follows_its_file_through_a_rotation(log_path):
+    _write_rotated(log_path, files=2)
+    first, cursor = query_logs(log_path, LogFilter(levels=['INFO', 'ERROR']), limit=10)
+    assert _numbers(first) == list(range(59, 49, -1))
+    indexed = set(log_query._indexes)
+
+    # The handler rotates between two page requests
+    os.rename(f'{log_path}.1', f'{log_path}.2')
+    os.rename(log_path, f'{log_path}.1')
+    with open(log_path, 'w') as f:
+        f.write(_entry(60) + _entry(61))
+
+    rest = []
+    while cursor is not None:
+        lines, cursor = query_logs(log_path, LogFilter(levels=['INFO', 'ERROR']), limit=10, cursor=cursor)
+        rest += _numbers(lines)
+    assert rest == list(range(49, -1, -1))
+    # The renamed files kept their indexes
+    assert indexed <= set(log_query._indexes)
+
+
+def test_reads_files_written_by_the_rotating_handler(log_path):
+    handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=2000, backupCount=5, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.Logger('rotation-test')
+    logger.addHandler(handler)
+    for n in range(80):
+        logger.info(_entry(n, message='用水量 超限' if n == 3 else None).rstrip('\n'))
+    handler.close()
+
+    assert len(log_files(log_path)) > 2
+    assert _all_pages(log_path, LogFilter(), limit=9) == list(range(79, -1, -1))
+    # Non-ASCII text is matched although the message was written as a JSON escape
+    assert _numbers(query_logs(log_path, LogFilter(text='超限'), limit=5)[0]) == [3]
+
+
+def test_line_being_written_is_indexed_once_complete(log_path):
+    with open(log_path, 'w') as f:
+        f.write(_entry(0, level='ERROR') + _entry(1, level='ERROR').rstrip('\n'))
+    errors = LogFilter(levels=['ERROR'])
+    assert _numbers(query_logs(log_path, errors)[0]) == [0]
+    with open(log_path, 'a') as f:
+        f.write('\n' + _entry(2, level='ERROR'))
+    assert _numbers(query_logs(log_path, errors)[0]) == [2, 1, 0]
+
+
+def test_invalid_cursor(log_path):
+    _write_rotated(log_path, files=1)
+    with pytest.raises(LogQueryError):
+        query_logs(log_path, LogFilter(), cursor='not-a-cursor')
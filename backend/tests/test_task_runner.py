@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from backend.core import task_runner
+from backend.core.task_runner import (
+    run_governed, cancellable, cancel_job, report_progress, JobConflictError, TaskCancelledError
+)
+
+
+def _log_handlers():
+    return sorted(type(handler).__name__ for handler in logging.getLogger().handlers)
+
+
+def _report_steps(steps):
+    for step in range(steps):
+        report_progress(f'step {step}', step / steps)
+    return steps
+
+
+def _wait_for_cancel():
+    for step in range(600):
+        report_progress('waiting', step)
+        time.sleep(0.05)
+    return 'not cancelled'
+
+
+def test_child_logs_to_console_only(app):
+    assert 'RotatingFileHandler' in _log_handlers()
+    handlers, usage = run_governed(app, _log_handlers, timeout=60)
+    assert handlers == ['StreamHandler']
+    assert usage['governed'] is True
+
+
+def test_progress_is_relayed_to_the_caller(app):
+    seen = []
+    result, _ = run_governed(app, _report_steps, args=(3,), timeout=60, progress_callback=lambda *step: seen.append(step))
+    assert result == 3
+    assert seen == [('step 0', 0.0), ('step 1', 1 / 3), ('step 2', 2 / 3)]
+
+
+def test_cancel_job_stops_a_governed_task(app):
+    started = threading.Event()
+    with cancellable('job-1') as cancel_event:
+        threading.Timer(0.5, cancel_job, args=('job-1',)).start()
+        with pytest.raises(TaskCancelledError):
+            run_governed(app, _wait_for_cancel, timeout=60, cancel_event=cancel_event,
+                         progress_callback=lambda *step: started.set())
+    assert started.is_set()
+    assert not cancel_job('job-1')
+
+
+def test_cancel_job_without_child_process(app, monkeypatch):
+    monkeypatch.setattr(task_runner, '_process_context', lambda: None)
+    with cancellable('job-2') as cancel_event:
+        threading.Timer(0.2, cancel_job, args=('job-2',)).start()
+        with pytest.raises(TaskCancelledError):
+            run_governed(app, _wait_for_cancel, cancel_event=cancel_event)
+
+
+def test_job_ids_are_unique_while_running():
+    with cancellable('job-3'):
+        with pytest.raises(JobConflictError):
+            with cancellable('job-3'):
+                pass
+    with cancellable('job-3'):
+        pass
+
+
+def test_cancel_endpoint(client, auth_headers):
+    response = client.post('/api/analysis/jobs/missing/cancel', headers=auth_headers)
+    assert response.status_code == 404
+
+    with cancellable('job-4') as cancel_event:
+        response = client.post('/api/analysis/jobs/job-4/cancel', headers=auth_headers)
+        assert response.status_code == 202
+        assert cancel_event.is_set()
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models.weather import WeatherHourly
+from backend.services.usage_aggregate import UsageAggregate
+from backend.services.water_habit_analysis import WaterHabitAnalyzer
+from backend.services.weather_history import load_temperature_frame
+from .conftest import make_usage_frame
+
+
+def _temperature(timestamps):
+    return 10 + 0.5 * (timestamps.dayofyear % 7) + 3 * np.sin(timestamps.hour / 24 * 2 * np.pi)
+
+
+def _weather(start, days):
+    timestamps = pd.date_range(start, periods=days * 24, freq='h')
+    return pd.DataFrame({'timestamp': timestamps, 'temperature': _temperature(timestamps)})
+
+
+def _sensitive_aggregate(building, start, days, slope=0.2):
+    frame = make_usage_frame(start=start, days=days)
+    timestamps = frame['日期'] + pd.to_timedelta(frame['小时'], unit='h')
+    frame['用水量'] = 1 + slope * _temperature(pd.DatetimeIndex(timestamps))
+    return UsageAggregate.from_frame(frame, building)
+
+
+@pytest.fixture(autouse=True)
+def no_font(monkeypatch):
+    monkeypatch.setattr(WaterHabitAnalyzer, '_configure_matplotlib', lambda self: None)
+
+
+def test_sensitivity_reports_match_rate_and_skips_poorly_matched_buildings():
+    # Weather covers 1栋 entirely but only 5 of 15 days of 2栋
+    aggregates = [_sensitive_aggregate('1栋', '2025-04-01', 14), _sensitive_aggregate('2栋', '2025-04-10', 15, slope=-0.1)]
+    analyzer = WaterHabitAnalyzer(building_aggregates=aggregates, weather=_weather('2025-04-01', 14))
+
+    sensitivity = analyzer.analyze_temperature_sensitivity()
+
+    match = analyzer.analysis_results['weather_match']
+    assert match['by_building']['匹配率'].round(4).to_dict() == {'1栋': 1.0, '2栋': round(5 / 15, 4)}
+    assert match['rate'] == pytest.approx((14 + 5) / (14 + 15))
+    assert list(sensitivity.index) == ['1栋']
+    assert sensitivity.loc['1栋', '斜率(T/小时/°C)'] == pytest.approx(0.2)
+    assert sensitivity.loc['1栋', '日相关系数'] == pytest.approx(1.0)
+    assert sensitivity.loc['1栋', '匹配率'] == 1.0
+    assert analyzer._plot_temperature_sensitivity(sensitivity)
+
+    report = analyzer.generate_analysis_report()
+    assert '天气匹配率**: 65.5%（456/696' in report
+    assert '- 2栋: 33.3%' in report
+
+
+def test_sensitivity_is_skipped_without_matching_weather():
+    analyzer = WaterHabitAnalyzer(
+        building_aggregates=[_sensitive_aggregate('1栋', '2025-04-01', 14)], weather=_weather('2025-06-01', 3)
+    )
+    assert analyzer.analyze_temperature_sensitivity() is None
+    assert analyzer.analysis_results['weather_match']['rate'] == 0
+    assert '没有楼栋达到所需的天气匹配率' in analyzer.generate_analysis_report()
+
+    analyzer = WaterHabitAnalyzer(building_aggregates=[_sensitive_aggregate('1栋', '2025-04-01', 14)])
+    assert analyzer.analyze_temperature_sensitivity() is None
+    assert '未获取到与分析时间范围对应的逐小时观测天气数据' in analyzer.generate_analysis_report()
+
+
+def test_only_observed_temperatures_feed_the_analysis(db):
+    start = datetime(2025, 4, 1)
+    db.session.add_all([
+        WeatherHourly(areacode='101010100', timestamp=start, temperature=12.0, source='observed'),
+        WeatherHourly(areacode='101010100', timestamp=start.replace(hour=1), temperature=13.0, source='forecast'),
+    ])
+    db.session.commit()
+
+    frame = load_temperature_frame('101010100', start, start.replace(day=2))
+    assert frame.to_dict('records') == [{'timestamp': pd.Timestamp(start), 'temperature': 12.0}]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from backend.services.usage_aggregate import UsageAggregate, CELL_IS_WEEKEND, CELL_WEEKDAY
+from backend.services.water_habit_analysis import WaterHabitAnalyzer
+from .conftest import make_usage_frame
+
+
+def assert_same_aggregate(left, right):
+    for field in ('count', 'hist_cells', 'hist_codes', 'hist_counts', 'dates', 'daily_count'):
+        np.testing.assert_array_equal(getattr(left, field), getattr(right, field))
+    for field in ('total', 'total_sq', 'daily_sum'):
+        np.testing.assert_allclose(getattr(left, field), getattr(right, field))
+
+
+def test_merged_partials_equal_aggregate_of_whole_frame(usage_frame):
+    parts = np.array_split(usage_frame, 3)
+    merged = UsageAggregate.merge_all([UsageAggregate.from_frame(part, 'A') for part in parts], 'A')
+    assert_same_aggregate(merged, UsageAggregate.from_frame(usage_frame, 'A'))
+
+
+def test_append_frame_skips_hours_already_covered(usage_frame):
+    cut = len(usage_frame) // 2 + 5
+    aggregate = UsageAggregate.from_frame(usage_frame.iloc[:cut], 'A')
+    appended, added, skipped = aggregate.append_frame(usage_frame.iloc[cut - 10:])
+    assert (added, skipped) == (len(usage_frame) - cut, 10)
+    assert_same_aggregate(appended, UsageAggregate.from_frame(usage_frame, 'A'))
+    assert appended.append_frame(usage_frame)[1:] == (0, len(usage_frame))
+
+
+def test_save_and_load_round_trip(tmp_path, usage_frame):
+    aggregate = UsageAggregate.from_frame(usage_frame, '1栋')
+    aggregate.save(tmp_path / 'a.npz')
+    loaded = UsageAggregate.load(tmp_path / 'a.npz')
+    assert loaded.building == '1栋'
+    assert_same_aggregate(loaded, aggregate)
+
+
+def test_summarize_matches_pandas_describe(usage_frame):
+    summary = UsageAggregate.from_frame(usage_frame, 'A').summarize(CELL_WEEKDAY)
+    expected = usage_frame.groupby('星期')['用水量'].describe()
+    expected['sum'] = usage_frame.groupby('星期')['用水量'].sum()
+    pd.testing.assert_frame_equal(summary, expected[summary.columns], check_names=False, check_dtype=False, check_index_type=False)
+
+
+def test_value_histogram_counts_raw_values(usage_frame):
+    aggregate = UsageAggregate.from_frame(usage_frame, 'A')
+    values, counts = aggregate.value_histogram(CELL_IS_WEEKEND)
+    weekend = usage_frame.loc[usage_frame['星期'] >= 6, '用水量']
+    expected_values, expected_counts = np.unique(weekend, return_counts=True)
+    np.testing.assert_allclose(values, expected_values)
+    np.testing.assert_array_equal(counts, expected_counts)
+
+
+def test_distribution_curves_match_raw_histogram_and_kde():
+    weekday = make_usage_frame(seed=1)['用水量'].to_numpy()
+    weekend = np.round(make_usage_frame(seed=2, days=4)['用水量'].to_numpy() * 1.5, 3)
+    histograms = [np.unique(values, return_counts=True) for values in (weekday, weekend)]
+
+    curves = WaterHabitAnalyzer._compute_distribution_curves(None, histograms, bins=50)
+
+    edges = np.linspace(min(weekday.min(), weekend.min()), max(weekday.max(), weekend.max()), 51)
+    bin_width = edges[1] - edges[0]
+    for raw, (curve_edges, counts, kde_x, kde_y) in zip((weekday, weekend), curves):
+        np.testing.assert_allclose(curve_edges, edges)
+        np.testing.assert_array_equal(counts, np.histogram(raw, bins=edges)[0])
+        # Binned KDE scaled to counts, as histplot(kde=True) draws it over the raw values
+        expected = stats.gaussian_kde(raw, bw_method='scott')(kde_x) * len(raw) * bin_width
+        assert np.abs(kde_y - expected).max() <= 0.05 * expected.max()
+
+
+def test_distribution_curves_without_data():
+    empty = (np.zeros(0), np.zeros(0, dtype=np.int64))
+    (edges, counts, kde_x, kde_y), = WaterHabitAnalyzer._compute_distribution_curves(None, [empty], bins=10)
+    assert len(edges) == 11 and not counts.any()
+    assert kde_x is None and kde_y is None
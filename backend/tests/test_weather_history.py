@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pandas as pd
+import pytest
+
+from backend.models.weather import WeatherHourly
+from backend.routes import weather
+from backend.services.weather_history import backfill_weather, find_gaps, store_hourly
+
+START = datetime(2025, 4, 1)
+
+
+class FakeArchive:
+    """Serves Open-Meteo archive answers for whole days; ``failures`` are answered first, in order."""
+
+    def __init__(self, failures=(), null_hours=()):
+        self.failures = list(failures)
+        self.null_hours = set(null_hours)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(dict(request.url.params))
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        params = request.url.params
+        hours = pd.date_range(params['start_date'], pd.Timestamp(params['end_date']) + pd.Timedelta(days=1),
+                              freq='h', inclusive='left')
+        temperatures = [None if hour in self.null_hours else 10 + hour.hour / 2 for hour in hours]
+        return httpx.Response(200, json={'hourly': {
+            'time': [hour.strftime('%Y-%m-%dT%H:%M') for hour in hours],
+            'temperature_2m': temperatures,
+            'relative_humidity_2m': [None if t is None else 60.0 for t in temperatures],
+            'precipitation': [None if t is None else 0.0 for t in temperatures],
+        }})
+
+
+@pytest.fixture
+def archive(app):
+    app.config['WEATHER_AREA_COORDINATES'] = {'101010100': [39.9, 116.41]}
+    return FakeArchive()
+
+
+def _backfill(fake, start=START, end=START + timedelta(days=2), areacodes=('101010100',)):
+    return backfill_weather(list(areacodes), start, end, rate_per_second=1000, transport=httpx.MockTransport(fake))
+
+
+def test_backfill_is_idempotent(archive):
+    assert _backfill(archive) == {'101010100': {'gaps': 1, 'inserted': 48, 'updated': 0}}
+    assert archive.requests[0]['start_date'] == '2025-04-01' and archive.requests[0]['end_date'] == '2025-04-02'
+    assert archive.requests[0]['latitude'] == '39.9'
+
+    assert _backfill(archive) == {'101010100': {'gaps': 0, 'inserted': 0, 'updated': 0}}
+    assert len(archive.requests) == 1
+    assert WeatherHourly.query.count() == 48
+    record = WeatherHourly.query.filter_by(timestamp=START + timedelta(hours=5)).one()
+    assert (record.temperature, record.source) == (12.5, 'observed')
+
+
+def test_only_gaps_are_fetched(db, archive):
+    _backfill(archive)
+    stored = WeatherHourly.query.filter(WeatherHourly.timestamp.in_([
+        START + timedelta(hours=3), START + timedelta(hours=4), START + timedelta(hours=30)
+    ])).all()
+    for record in stored:
+        db.session.delete(record)
+    # Hours kept from the forecast are not history
+    forecast = WeatherHourly.query.filter_by(timestamp=START + timedelta(hours=40)).one()
+    forecast.source = 'forecast'
+    db.session.commit()
+
+    end = START + timedelta(days=2)
+    assert find_gaps('101010100', START, end) == [
+        (START + timedelta(hours=3), START + timedelta(hours=5)),
+        (START + timedelta(hours=30), START + timedelta(hours=31)),
+        (START + timedelta(hours=40), START + timedelta(hours=41)),
+    ]
+    assert find_gaps('101010100', START, end + timedelta(hours=2))[-1] == (end, end + timedelta(hours=2))
+
+    archive.requests.clear()
+    assert _backfill(archive) == {'101010100': {'gaps': 3, 'inserted': 3, 'updated': 1}}
+    assert [(r['start_date'], r['end_date']) for r in archive.requests] == [
+        ('2025-04-01', '2025-04-01'), ('2025-04-02', '2025-04-02'), ('2025-04-02', '2025-04-02')
+    ]
+    assert find_gaps('101010100', START, end) == []
+    assert WeatherHourly.query.filter_by(source='forecast').count() == 0
+
+
+def test_unpublished_hours_stay_gaps(archive):
+    archive.null_hours = {pd.Timestamp(START + timedelta(hours=47))}
+    assert _backfill(archive)['101010100']['inserted'] == 47
+    assert find_gaps('101010100', START, START + timedelta(days=2)) == [
+        (START + timedelta(hours=47), START + timedelta(days=2))
+    ]
+
+
+def test_backfill_retries_throttled_and_failed_requests(archive):
+    archive.failures = [
+        httpx.Response(503, headers={'Retry-After': '0'}),
+        httpx.ConnectError('connection refused'),
+    ]
+    assert _backfill(archive) == {'101010100': {'gaps': 1, 'inserted': 48, 'updated': 0}}
+    assert len(archive.requests) == 3
+
+
+def test_backfill_reports_errors_per_areacode(app, archive):
+    archive.failures = [httpx.Response(400, json={'error': True, 'reason': 'Parameter latitude is invalid'})]
+    summary = _backfill(archive, areacodes=['101010100', '101020100'])
+    assert summary['101010100'] == {'error': 'Parameter latitude is invalid'}
+    assert summary['101020100'] == {'error': 'No coordinates configured in WEATHER_AREA_COORDINATES'}
+    assert WeatherHourly.query.count() == 0
+
+
+def test_store_hourly_upserts_on_areacode_and_timestamp(db):
+    rows = [{'timestamp': START, 'temperature': 1.0, 'source': 'observed'}]
+    assert store_hourly('101010100', rows) == (1, 0)
+    db.session.commit()
+    assert store_hourly('101010100', [dict(rows[0], temperature=2.0)]) == (0, 1)
+    assert store_hourly('101020100', rows) == (1, 0)
+    db.session.commit()
+    assert WeatherHourly.query.filter_by(areacode='101010100').one().temperature == 2.0
+
+
+def test_backfill_route_validates_areacodes_and_range(app, client, auth_headers, archive, monkeypatch):
+    jobs = []
+    monkeypatch.setattr(weather, 'start_backfill_job', lambda *args: jobs.append(args))
+
+    response = client.post('/api/weather/history/backfill', headers=auth_headers, json={'areacodes': ['999']})
+    assert response.status_code == 400 and '999' in response.get_json()['error']
+    response = client.post('/api/weather/history/backfill', headers=auth_headers,
+                           json={'areacodes': ['101010100'], 'start': '2025-04-03', 'end': '2025-04-01'})
+    assert response.status_code == 400
+
+    response = client.post('/api/weather/history/backfill', headers=auth_headers,
+                           json={'areacodes': ['101010100'], 'start': '2025-04-01', 'end': '2025-04-03'})
+    assert response.status_code == 202
+    assert jobs == [(['101010100'], START, START + timedelta(days=2), response.get_json()['job_id'])]
@@ -1,17 +1,43 @@
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, g
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from ..models.user import User
 
+def role_claims(user):
+    """Claims embedded in a user's access token. Informational for clients: authorization reads the database."""
+    return {"role": user.role}
+
+def get_current_user():
+    """
+    Returns the User for the request's JWT identity, or None if it no longer exists.
+    The user is loaded at most once per request and cached on ``flask.g``.
+    """
+    if 'current_user' not in g:
+        g.current_user = User.query.get(get_jwt_identity())
+    return g.current_user
+
+def get_current_role():
+    """
+    Returns the role of the requesting user, or None if the user no longer exists or was
+    deactivated. Read from the cached user rather than the token's claims, so a demotion
+    takes effect on the next request instead of when the token expires.
+    """
+    user = get_current_user()
+    return user.role if user and user.is_active else None
+
+def _inactive_response():
+    return jsonify(msg="User account is deactivated"), 403
+
 def token_required(fn):
     """A decorator to protect routes with JWT and pass the user object."""
     @wraps(fn)
     def decorator(*args, **kwargs):
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             return jsonify(msg="User not found"), 404
+        if not user.is_active:
+            return _inactive_response()
         # Pass the user object to the decorated route function
         return fn(user, *args, **kwargs)
     return decorator
@@ -22,12 +48,14 @@ def login_required(fn):
     def decorator(*args, **kwargs):
         try:
             verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            if not User.query.get(user_id):
+            user = get_current_user()
+            if not user:
                  return jsonify(msg="Token is valid, but user not found."), 404
         except Exception as e:
             return jsonify(msg=f"JWT verification failed: {str(e)}"), 401
-        
+        if not user.is_active:
+            return _inactive_response()
+
         return fn(*args, **kwargs)
     return decorator
 
@@ -37,13 +65,11 @@ def admin_required():
         @wraps(fn)
         def decorator(*args, **kwargs):
             verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            # This decorator does not pass the user object,
-            # but checks for admin role.
-            if user and user.role == 'admin':
+            # This decorator does not pass the user object, but checks the current
+            # role and active status of the (per-request cached) user.
+            if get_current_role() == 'admin':
                 return fn(*args, **kwargs)
             else:
                 return jsonify(msg="Admins access required"), 403
         return decorator
-    return wrapper 
\ No newline at end of file
+    return wrapper
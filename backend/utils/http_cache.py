@@ -0,0 +1,45 @@
+import gzip
+import json
+import hashlib
+from flask import request, current_app
+
+# Bodies smaller than this are sent uncompressed; gzip overhead outweighs the savings.
+GZIP_MIN_SIZE = 1024
+
+def make_etag(*parts):
+    """Builds an ETag value from the parts that identify a representation's version."""
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+def is_fresh(etag):
+    """True if the client's If-None-Match already names this ETag, i.e. a 304 can be sent."""
+    return request.if_none_match.contains_weak(etag)
+
+def not_modified(etag, max_age=0):
+    """A 304 response for callers that checked is_fresh() before building the body."""
+    return cached_response(None, etag, None, max_age=max_age)
+
+def cached_response(body, etag, mimetype, max_age=0, compress=True):
+    """
+    Returns a response for ``body`` carrying a weak ETag, answering 304 Not Modified when the
+    client already holds this version. Text bodies are gzip-compressed when the client accepts it.
+    """
+    if body is None or is_fresh(etag):
+        response = current_app.response_class(status=304)
+    else:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        response = current_app.response_class(body, mimetype=mimetype)
+        if compress and len(body) >= GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+            response.set_data(gzip.compress(body, compresslevel=6))
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+
+    # Weak, since the compressed and uncompressed bodies share it.
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = f"private, max-age={max_age}, must-revalidate" if max_age else 'private, no-cache'
+    return response
+
+def cached_json(payload, etag, max_age=0):
+    """JSON variant of cached_response()."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return cached_response(body, etag, 'application/json', max_age=max_age)
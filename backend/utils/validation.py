@@ -0,0 +1,11 @@
+def bounded_int(value, name, minimum, maximum):
+    """Parses a JSON parameter as an integer in [minimum, maximum]; raises ValueError with a client-facing message."""
+    try:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError
+        number = int(value)
+        if not minimum <= number <= maximum:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer between {minimum} and {maximum}.") from None
+    return number
@@ -12,7 +12,8 @@ export interface DatasetForAnalysis {
 export interface AnalysisChart {
     id: number;
     title: string;
-    image_base64: string; // This will be a data URL: "data:image/png;base64,..."
+    url: string; // API path of the PNG image
+    image_src?: string; // Object URL of the fetched image, set by getAnalysisResult
 }
 
 // Interface for the full analysis results object
@@ -28,15 +29,36 @@ export interface AnalysisResult {
 export interface AnalysisHistoryItem {
     id: string;
     name: string;
+    task_id: number;
     created_at: string;
 }
 
+// One page of GET /analysis/datasets; pass next_offset as offset to fetch the following page
+interface DatasetsForAnalysisPage {
+    items: DatasetForAnalysis[];
+    total: number;
+    next_offset: number | null;
+}
+
+// One page of the analysis history; pass next_cursor to fetch the following page
+export interface AnalysisHistoryPage {
+    items: AnalysisHistoryItem[];
+    next_cursor: string | null;
+}
+
 /**
  * Fetches all successfully converted datasets suitable for analysis.
  */
 export const getDatasetsForAnalysis = async (): Promise<DatasetForAnalysis[]> => {
-  const response = await api.get('/analysis/datasets');
-  return response.data;
+  const datasets: DatasetForAnalysis[] = [];
+  let offset: number | null = 0;
+  while (offset !== null) {
+    const response = await api.get('/analysis/datasets', { params: { offset } });
+    const page: DatasetsForAnalysisPage = response.data;
+    datasets.push(...page.items);
+    offset = page.next_offset;
+  }
+  return datasets;
 };
 
 /**
@@ -56,14 +78,30 @@ export const runAnalysis = async (datasetIds: string[]): Promise<{ result_id: st
  */
 export const getAnalysisResult = async (resultId: string): Promise<AnalysisResult> => {
     const response = await api.get(`/analysis/results/${resultId}`);
-    return response.data;
+    const result: AnalysisResult = response.data;
+    // Chart images are served separately; fetch them in parallel
+    const images = await Promise.all(result.charts.map(chart => getAnalysisChartImage(resultId, chart.id)));
+    result.charts = result.charts.map((chart, i) => ({ ...chart, image_src: images[i] }));
+    return result;
+};
+
+/**
+ * Fetches one chart image of an analysis result.
+ * @returns An object URL for the PNG; revoke it with URL.revokeObjectURL when no longer shown.
+ */
+export const getAnalysisChartImage = async (resultId: string, chartId: number): Promise<string> => {
+    const response = await api.get(`/analysis/results/${resultId}/charts/${chartId}`, {
+        responseType: 'blob',
+    });
+    return window.URL.createObjectURL(response.data);
 };
 
 /**
- * Fetches the list of historical analysis results.
+ * Fetches one page of historical analysis results, newest first.
+ * @param cursor The next_cursor of the previous page; omit for the first page.
  */
-export const getAnalysisHistory = async (): Promise<AnalysisHistoryItem[]> => {
-    const response = await api.get('/analysis/history');
+export const getAnalysisHistory = async (cursor?: string, limit: number = 20): Promise<AnalysisHistoryPage> => {
+    const response = await api.get('/analysis/history', { params: { cursor, limit } });
     return response.data;
 };
 
@@ -13,13 +13,36 @@ export interface ConversionTask {
   original_dataset_id: string;
   status: 'pending' | 'processing' | 'completed' | 'failed';
   created_at: string;
+  updated_at: string | null;
   converted_datasets: ConvertedDataset[];
 }
 
-// Fetch all conversion tasks
-export const getConversionTasks = async (): Promise<ConversionTask[]> => {
+export interface ConversionTaskPage {
+  items: ConversionTask[];
+  total: number;
+  page: number;
+  per_page: number;
+  since: string | null; // Cursor for getConversionTaskChanges
+}
+
+export interface ConversionTaskChanges {
+  items: ConversionTask[];
+  total: number;
+  since: string | null;
+  reset: boolean; // Too many changes; reload the list instead of merging
+}
+
+// Fetch one page of conversion tasks, newest first
+export const getConversionTasks = async (page: number = 1, perPage: number = 20): Promise<ConversionTaskPage> => {
   // Token is handled by the interceptor in api/index.ts
-  const response = await api.get('/conversion/tasks');
+  const response = await api.get('/conversion/tasks', { params: { page, per_page: perPage } });
+  return response.data;
+};
+
+// Fetch only the tasks updated since the cursor of a previous response.
+// Unchanged lists are revalidated by the browser via ETag and cost almost nothing.
+export const getConversionTaskChanges = async (since: string): Promise<ConversionTaskChanges> => {
+  const response = await api.get('/conversion/tasks', { params: { since } });
   return response.data;
 };
 
@@ -1,5 +1,5 @@
 import api from './';
-import { Dataset } from '../types/dataset';
+import { Dataset, DataPreview } from '../types/dataset';
 
 const API_URL = '/datasets/';
 
@@ -8,7 +8,68 @@ export const getDatasets = async (): Promise<Dataset[]> => {
     return response.data;
 };
 
+// Files above this size use the resumable chunked upload protocol.
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const CHUNK_RETRIES = 3;
+
+interface UploadSession {
+    upload_id: string;
+    chunk_size: number;
+    total_chunks: number;
+    received_chunks: number;
+}
+
+const uploadSessionKey = (file: File) => `chunked-upload:${file.name}:${file.size}:${file.lastModified}`;
+
+// Resumes the upload of this file started earlier, or starts a new one.
+const openUploadSession = async (file: File): Promise<UploadSession> => {
+    const key = uploadSessionKey(file);
+    const savedId = localStorage.getItem(key);
+    if (savedId) {
+        try {
+            const response = await api.get(`${API_URL}uploads/${savedId}`);
+            return response.data;
+        } catch {
+            localStorage.removeItem(key);
+        }
+    }
+    const response = await api.post(`${API_URL}uploads`, { filename: file.name, size: file.size });
+    localStorage.setItem(key, response.data.upload_id);
+    return response.data;
+};
+
+const uploadDatasetChunked = async (file: File, onUploadProgress: (progressEvent: any) => void): Promise<Dataset> => {
+    const session = await openUploadSession(file);
+    let index = session.received_chunks;
+    let retries = 0;
+    while (index < session.total_chunks) {
+        const start = index * session.chunk_size;
+        const chunk = file.slice(start, Math.min(start + session.chunk_size, file.size));
+        try {
+            await api.put(`${API_URL}uploads/${session.upload_id}/chunks/${index}`, chunk, {
+                headers: { 'Content-Type': 'application/octet-stream' },
+                onUploadProgress: (event) => onUploadProgress({ loaded: start + event.loaded, total: file.size }),
+            });
+            index += 1;
+            retries = 0;
+        } catch (error: any) {
+            const expected = error.response?.data?.expected_chunk;
+            if (retries >= CHUNK_RETRIES) throw error;
+            retries += 1;
+            // The server names the chunk it needs next when the sequence was interrupted.
+            if (typeof expected === 'number') index = expected;
+        }
+    }
+    const response = await api.post(`${API_URL}uploads/${session.upload_id}/complete`);
+    localStorage.removeItem(uploadSessionKey(file));
+    return response.data;
+};
+
 export const uploadDataset = async (file: File, onUploadProgress: (progressEvent: any) => void): Promise<Dataset> => {
+    if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        return uploadDatasetChunked(file, onUploadProgress);
+    }
+
     const formData = new FormData();
     formData.append('file', file);
 
@@ -29,3 +90,8 @@ export const getDatasetColumns = async (datasetId: string): Promise<string[]> =>
     const response = await api.get(`${API_URL}${datasetId}/columns`);
     return response.data.columns;
 };
+
+export const getDatasetPreview = async (datasetId: string, rows = 20, sheet?: string): Promise<DataPreview> => {
+    const response = await api.get(`${API_URL}${datasetId}/preview`, { params: { rows, sheet } });
+    return response.data;
+};
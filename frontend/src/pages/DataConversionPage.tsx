@@ -1,8 +1,8 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Button, Select, Table, message, Tag, Space, Popconfirm, Card, Typography, Tooltip } from 'antd';
 import { UploadOutlined, DownloadOutlined, DeleteOutlined, SyncOutlined } from '@ant-design/icons';
 import { getDatasets } from '../api/dataset';
-import { getConversionTasks, runConversion, deleteConvertedDataset, downloadConvertedDataset, ConversionTask, ConvertedDataset } from '../api/conversion';
+import { getConversionTasks, getConversionTaskChanges, runConversion, deleteConvertedDataset, downloadConvertedDataset, ConversionTask, ConvertedDataset } from '../api/conversion';
 import { Dataset } from '../types/dataset';
 import { filesize } from 'filesize';
 
@@ -13,21 +13,55 @@ const DataConversionPage: React.FC = () => {
     const [datasets, setDatasets] = useState<Dataset[]>([]);
     const [selectedDataset, setSelectedDataset] = useState<string | null>(null);
     const [tasks, setTasks] = useState<ConversionTask[]>([]);
+    const [pagination, setPagination] = useState({ current: 1, pageSize: 20, total: 0 });
     const [loading, setLoading] = useState(false);
     const [runLoading, setRunLoading] = useState(false);
 
+    const { current, pageSize } = pagination;
+    // Cursor and total of the last load, used to poll for changes only
+    const sinceRef = useRef<string | null>(null);
+    const totalRef = useRef(0);
     const fetchTasks = useCallback(async () => {
         setLoading(true);
         try {
-            const fetchedTasks = await getConversionTasks();
-            setTasks(fetchedTasks);
+            const taskPage = await getConversionTasks(current, pageSize);
+            setTasks(taskPage.items);
+            setPagination(prev => ({ ...prev, total: taskPage.total }));
+            sinceRef.current = taskPage.since;
+            totalRef.current = taskPage.total;
         } catch (error) {
             message.error('加载转换任务失败');
             console.error(error);
         } finally {
             setLoading(false);
         }
-    }, []);
+    }, [current, pageSize]);
+
+    const tasksRef = useRef<ConversionTask[]>([]);
+    tasksRef.current = tasks;
+    const pollTasks = useCallback(async () => {
+        if (!sinceRef.current) {
+            fetchTasks();
+            return;
+        }
+        try {
+            const changes = await getConversionTaskChanges(sinceRef.current);
+            const shownIds = new Set(tasksRef.current.map(t => t.id));
+            const hasNewTasks = changes.items.some(t => !shownIds.has(t.id));
+            // New or deleted tasks shift the pages; reload the current page in that case
+            if (changes.reset || changes.total !== totalRef.current || (hasNewTasks && current === 1)) {
+                fetchTasks();
+                return;
+            }
+            sinceRef.current = changes.since;
+            if (changes.items.length > 0) {
+                const changed = new Map(changes.items.map(t => [t.id, t]));
+                setTasks(prev => prev.map(t => changed.get(t.id) ?? t));
+            }
+        } catch (error) {
+            console.error(error);
+        }
+    }, [fetchTasks, current]);
 
     const fetchOriginalDatasets = useCallback(async () => {
         try {
@@ -43,9 +77,9 @@ const DataConversionPage: React.FC = () => {
     useEffect(() => {
         fetchOriginalDatasets();
         fetchTasks();
-        const interval = setInterval(fetchTasks, 10000); // Poll every 10 seconds
+        const interval = setInterval(pollTasks, 10000); // Poll for changes every 10 seconds
         return () => clearInterval(interval);
-    }, [fetchOriginalDatasets, fetchTasks]);
+    }, [fetchOriginalDatasets, fetchTasks, pollTasks]);
 
     const handleRunConversion = async () => {
         if (!selectedDataset) {
@@ -174,6 +208,8 @@ const DataConversionPage: React.FC = () => {
                     rowKey="id"
                     loading={loading}
                     expandable={{ expandedRowRender }}
+                    pagination={pagination}
+                    onChange={({ current = 1, pageSize = 20 }) => setPagination(prev => ({ ...prev, current, pageSize }))}
                     title={() => (
                         <Button onClick={fetchTasks} icon={<SyncOutlined />} loading={loading}>
                             刷新
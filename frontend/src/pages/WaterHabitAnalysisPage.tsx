@@ -41,6 +41,7 @@ const WaterHabitAnalysisPage: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [analysisResult, setAnalysisResult] = useState<AnalysisResult | null>(null);
   const [history, setHistory] = useState<AnalysisHistoryItem[]>([]);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
   const [isLoadingHistory, setIsLoadingHistory] = useState(false);
 
 
@@ -56,11 +57,13 @@ const WaterHabitAnalysisPage: React.FC = () => {
     }
   }, []);
 
-  const fetchHistory = useCallback(async () => {
+  // Loads the first page, or appends the page after `cursor` when given
+  const fetchHistory = useCallback(async (cursor?: string) => {
     setIsLoadingHistory(true);
     try {
-      const historyData = await getAnalysisHistory();
-      setHistory(historyData);
+      const page = await getAnalysisHistory(cursor);
+      setHistory(prev => (cursor ? [...prev, ...page.items] : page.items));
+      setHistoryCursor(page.next_cursor);
     } catch (err: any) {
       message.error(err.response?.data?.msg || '加载分析历史失败');
     } finally {
@@ -73,6 +76,13 @@ const WaterHabitAnalysisPage: React.FC = () => {
     fetchHistory();
   }, [fetchDatasets, fetchHistory]);
 
+  // Release chart object URLs when the displayed result changes
+  useEffect(() => {
+    return () => {
+      analysisResult?.charts.forEach(chart => chart.image_src && URL.revokeObjectURL(chart.image_src));
+    };
+  }, [analysisResult]);
+
   const handleStartAnalysis = async () => {
     if (selectedDatasets.length === 0) {
       message.warning('请至少选择一个数据集');
@@ -192,6 +202,11 @@ const WaterHabitAnalysisPage: React.FC = () => {
                     <List
                         loading={isLoadingHistory}
                         dataSource={history}
+                        loadMore={historyCursor && (
+                            <div style={{ textAlign: 'center', marginTop: 12 }}>
+                                <Button onClick={() => fetchHistory(historyCursor)} loading={isLoadingHistory}>加载更多</Button>
+                            </div>
+                        )}
                         renderItem={item => (
                             <List.Item
                                 actions={[
@@ -242,7 +257,7 @@ const WaterHabitAnalysisPage: React.FC = () => {
                         {analysisResult.charts.map(chart => (
                         <Col xs={24} lg={24} key={chart.id}>
                             <Card title={chart.title} bordered={false} hoverable>
-                            <img src={chart.image_base64} alt={chart.title} style={{ width: '100%', height: 'auto' }}/>
+                            <img src={chart.image_src} alt={chart.title} style={{ width: '100%', height: 'auto' }}/>
                             </Card>
                         </Col>
                         ))}
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useCallback } from 'react';
-import { Card, List, Button, Spin, Alert, message, Typography, Tag } from 'antd';
+import { Card, List, Button, Spin, Alert, message, Typography, Tag, Select, Input, Space } from 'antd';
 import { SyncOutlined } from '@ant-design/icons';
 import api from '../../api';
 
@@ -9,22 +9,29 @@ const LogViewerPage = () => {
     const [logs, setLogs] = useState([]);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState(null);
+    const [levels, setLevels] = useState([]);
+    const [query, setQuery] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
 
-    const fetchLogs = useCallback(async () => {
+    // Without a cursor the list is reloaded from the newest entry; with one, older entries are appended.
+    const fetchLogs = useCallback(async (cursor = null) => {
         setLoading(true);
         setError(null);
         try {
-            const response = await api.get('/admin/logs');
+            const params = { level: levels.join(',') || undefined, q: query || undefined, cursor: cursor || undefined };
+            const response = await api.get('/admin/logs', { params });
             // Each item in response.data.logs is a JSON string, so we need to parse it.
             const parsedLogs = response.data.logs.map((logString, index) => {
+                const id = `${cursor || 'head'}-${index}`;
                 try {
-                    return { id: index, ...JSON.parse(logString) };
+                    return { id, ...JSON.parse(logString) };
                 } catch (e) {
                     // Handle cases where a line is not valid JSON
-                    return { id: index, level: 'ERROR', message: `Unparsable log entry: ${logString}` };
+                    return { id, level: 'ERROR', message: `Unparsable log entry: ${logString}` };
                 }
             });
-            setLogs(parsedLogs);
+            setLogs(prev => (cursor ? [...prev, ...parsedLogs] : parsedLogs));
+            setNextCursor(response.data.next_cursor);
         } catch (err) {
             const errorMessage = err.response?.data?.error || '无法加载日志';
             setError(errorMessage);
@@ -33,7 +40,7 @@ const LogViewerPage = () => {
         } finally {
             setLoading(false);
         }
-    }, []);
+    }, [levels, query]);
 
     useEffect(() => {
         fetchLogs();
@@ -56,12 +63,24 @@ const LogViewerPage = () => {
         <Card
             title="系统日志查看器"
             extra={
-                <Button icon={<SyncOutlined />} onClick={fetchLogs} loading={loading}>
-                    刷新
-                </Button>
+                <Space>
+                    <Select
+                        mode="multiple"
+                        allowClear
+                        placeholder="日志级别"
+                        style={{ minWidth: 180 }}
+                        value={levels}
+                        onChange={setLevels}
+                        options={['INFO', 'WARNING', 'ERROR', 'CRITICAL'].map(level => ({ label: level, value: level }))}
+                    />
+                    <Input.Search allowClear placeholder="搜索日志内容" onSearch={setQuery} style={{ width: 220 }} />
+                    <Button icon={<SyncOutlined />} onClick={() => fetchLogs()} loading={loading}>
+                        刷新
+                    </Button>
+                </Space>
             }
         >
-            <Title level={4}>最近 200 条日志记录</Title>
+            <Title level={4}>最近的日志记录</Title>
             {error && <Alert message={error} type="error" showIcon style={{ marginBottom: 16 }} />}
             <Spin spinning={loading}>
                 <List
@@ -79,6 +98,11 @@ const LogViewerPage = () => {
                         </List.Item>
                     )}
                     style={{ background: '#f5f5f5', maxHeight: '70vh', overflowY: 'auto' }}
+                    loadMore={nextCursor && (
+                        <div style={{ textAlign: 'center', margin: 12 }}>
+                            <Button onClick={() => fetchLogs(nextCursor)} loading={loading}>加载更早的日志</Button>
+                        </div>
+                    )}
                 />
             </Spin>
         </Card>
@@ -9,6 +9,8 @@ export interface Dataset {
     created_at: string;
     user_id: string;
     description?: string;
+    row_count?: number | null;
+    content_hash?: string | null;
 }
   
 export interface UploadProgress {